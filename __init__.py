@@ -9,11 +9,13 @@ optimal moves based on game state.
 __version__ = "1.0.0"
 __author__ = "Clasher Engine Team"
 
-from card import Card, CardType, Rarity, TargetType, CARD_POOL
+from card import Card, CardType, Rarity, TargetType, CARD_POOL, CardRegistry, CARD_REGISTRY
 from board import Board, Position, Side
 from move import Move
 from player import Player
 from engine import ClashRoyaleEngine
+from batch import BatchEvaluator, BatchResult
+from weights import EvalWeights
 
 __all__ = [
     'Card',
@@ -26,5 +28,10 @@ __all__ = [
     'Move',
     'Player',
     'ClashRoyaleEngine',
-    'CARD_POOL'
+    'BatchEvaluator',
+    'BatchResult',
+    'EvalWeights',
+    'CARD_POOL',
+    'CardRegistry',
+    'CARD_REGISTRY'
 ]
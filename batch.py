@@ -0,0 +1,501 @@
+"""
+Batch evaluation: vectorized move scoring and many-state analysis.
+
+The scalar evaluation in ``ClashRoyaleEngine.evaluate_move`` scores one move
+at a time. The ``BatchEvaluator`` here turns card attributes and deployment
+positions into NumPy arrays and scores a whole card x position grid at once.
+Every component is computed with the same floating point operations, in the
+same order, as the scalar path so that both produce identical scores.
+
+``BatchResult`` and ``find_best_moves_chunk`` back the engine's many-state
+API (``find_best_moves_batch`` / ``analyze_many``), which does not need NumPy.
+``worker_engine`` keeps one engine per tower state in each worker process of
+the analysis server and the replay annotator.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from card import CARD_REGISTRY, Card, CardRegistry, CardType, TargetType
+from board import Board, Position, Side
+from weights import DEFAULT_WEIGHTS, EvalWeights
+
+
+def require_numpy():
+    """Raise an informative error if NumPy is not installed."""
+    if np is None:
+        raise ImportError(
+            "NumPy is required for vectorized evaluation "
+            "(pip install numpy)"
+        )
+
+
+class CardColumns:
+    """Card attributes laid out as parallel NumPy arrays."""
+
+    def __init__(self, cards: Sequence[Card]):
+        """
+        Build columns for a sequence of cards.
+
+        Stats are gathered by card ID from the struct-of-arrays storage in
+        CARD_REGISTRY rather than read from each Card object.
+
+        Args:
+            cards: Cards to convert (order is preserved)
+        """
+        registry = CARD_REGISTRY
+        ids = np.fromiter((c.card_id for c in cards), dtype=np.intp, count=len(cards))
+        card_type = np.asarray(registry.card_type)[ids]
+        target_type = np.asarray(registry.target_type)[ids]
+
+        self.ids = ids
+        self.elixir_cost = np.asarray(registry.elixir_cost, dtype=np.float64)[ids]
+        self.damage = np.asarray(registry.damage, dtype=np.float64)[ids]
+        self.range = np.asarray(registry.range)[ids]
+        self.area_damage = np.asarray(registry.area_damage, dtype=bool)[ids]
+        self.is_troop = card_type == CardRegistry.CARD_TYPES.index(CardType.TROOP)
+        self.is_spell = card_type == CardRegistry.CARD_TYPES.index(CardType.SPELL)
+        self.is_building = card_type == CardRegistry.CARD_TYPES.index(CardType.BUILDING)
+        self.targets_buildings = target_type == CardRegistry.TARGET_TYPES.index(TargetType.BUILDINGS)
+
+    def __len__(self) -> int:
+        return len(self.elixir_cost)
+
+
+class BatchEvaluator:
+    """
+    Scores many moves at once with NumPy array operations.
+
+    Results match ``ClashRoyaleEngine.evaluate_move`` exactly.
+    """
+
+    def __init__(self, board: Board, weights: Optional[EvalWeights] = None, counter_matrix=None):
+        """
+        Initialize the evaluator.
+
+        Args:
+            board: Board whose tower state is used for positioning
+            weights: Evaluation weights (defaults if None)
+            counter_matrix: CounterMatrix for the same weights (built if None)
+        """
+        require_numpy()
+        self.board = board
+        self.weights = weights if weights is not None else DEFAULT_WEIGHTS
+        if counter_matrix is None:
+            from counters import CounterMatrix
+            counter_matrix = CounterMatrix(self.weights)
+        self.counter_matrix = counter_matrix
+
+    def score_grid(
+        self,
+        cards: Sequence[Card],
+        positions: Sequence[Position],
+        player_side: Side,
+        opponent_cards: Optional[List[Card]] = None
+    ):
+        """
+        Score every card at every position.
+
+        Args:
+            cards: Cards to evaluate
+            positions: Positions to evaluate
+            player_side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+
+        Returns:
+            Array of shape (len(cards), len(positions)) with move scores
+        """
+        columns = CardColumns(cards)
+        x = np.array([p.x for p in positions], dtype=np.float64)[np.newaxis, :]
+        y = np.array([p.y for p in positions], dtype=np.float64)[np.newaxis, :]
+        counters = self._counters(columns, opponent_cards) if opponent_cards else None
+        return self._score(columns, x, y, player_side, counters, column_axis=True)
+
+    def score_moves(
+        self,
+        moves: Sequence,
+        player_side: Side,
+        opponent_cards: Optional[List[Card]] = None
+    ):
+        """
+        Score an arbitrary list of moves.
+
+        Args:
+            moves: Moves to evaluate
+            player_side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+
+        Returns:
+            Array of shape (len(moves),) with move scores
+        """
+        columns = CardColumns([m.card for m in moves])
+        x = np.array([m.position.x for m in moves], dtype=np.float64)
+        y = np.array([m.position.y for m in moves], dtype=np.float64)
+        counters = self._counters(columns, opponent_cards) if opponent_cards else None
+        return self._score(columns, x, y, player_side, counters, column_axis=False)
+
+    def score_components(
+        self,
+        moves: Sequence,
+        player_side: Side,
+        opponent_cards: Optional[List[Card]] = None
+    ):
+        """
+        Score an arbitrary list of moves, keeping each score component.
+
+        Args:
+            moves: Moves to evaluate
+            player_side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+
+        Returns:
+            Array of shape (len(moves), len(Move.COMPONENTS)); columns are
+            the elixir, positioning, card type, counter and strategy terms
+        """
+        columns = CardColumns([m.card for m in moves])
+        x = np.array([m.position.x for m in moves], dtype=np.float64)
+        y = np.array([m.position.y for m in moves], dtype=np.float64)
+        counters = self._counters(columns, opponent_cards) if opponent_cards else None
+        terms = self._terms(columns, x, y, player_side, counters, column_axis=False)
+        if terms[3] is None:
+            terms[3] = 0.0
+        return np.stack(np.broadcast_arrays(*terms), axis=1)
+
+    @staticmethod
+    def sum_components(components):
+        """
+        Total score of each row of a score_components array.
+
+        Adds the columns in evaluate_move's order, so every total equals
+        score_moves (and evaluate_move) for the same move.
+
+        Args:
+            components: Array from score_components
+
+        Returns:
+            Array of shape (len(components),) with move scores
+        """
+        score = 0.0 + components[:, 0]
+        for column in range(1, components.shape[1]):
+            score = score + components[:, column]
+        return score
+
+    def _terms(self, columns: CardColumns, x, y, player_side: Side, counters, column_axis: bool) -> list:
+        """Every evaluation component (counters stays None if not given)."""
+
+        def card_col(values):
+            # Cards run along axis 0 in grid mode, or align with positions
+            return values[:, np.newaxis] if column_axis else values
+
+        weights = self.weights
+        return [
+            (weights.elixir_base - card_col(columns.elixir_cost)) * weights.elixir_scale,
+            self._positioning(columns, x, y, player_side, card_col),
+            card_col(self._card_type(columns)),
+            card_col(counters) if counters is not None else None,
+            self._strategy(x, y, player_side),
+        ]
+
+    def _score(self, columns: CardColumns, x, y, player_side: Side, counters, column_axis: bool):
+        """Combine all evaluation components in the scalar path's order."""
+        base, positioning, card_type, counters, strategy = self._terms(
+            columns, x, y, player_side, counters, column_axis
+        )
+        score = 0.0 + base
+        score = score + positioning
+        score = score + card_type
+        if counters is not None:
+            score = score + counters
+        score = score + strategy
+        return score
+
+    def _nearest_tower_distance(self, x, y, enemy_side: Side):
+        """Distance from each position to the nearest alive tower (None if no tower stands)."""
+        board = self.board
+        if enemy_side == Side.FRIENDLY:
+            alive = board.friendly_towers
+            towers = [
+                (alive['left'], board.FRIENDLY_LEFT_TOWER),
+                (alive['right'], board.FRIENDLY_RIGHT_TOWER),
+                (alive['king'], board.FRIENDLY_KING_TOWER),
+            ]
+        else:
+            alive = board.enemy_towers
+            towers = [
+                (alive['left'], board.ENEMY_LEFT_TOWER),
+                (alive['right'], board.ENEMY_RIGHT_TOWER),
+                (alive['king'], board.ENEMY_KING_TOWER),
+            ]
+
+        nearest = None
+        for is_alive, tower in towers:
+            if not is_alive:
+                continue
+            dx = x - tower.x
+            dy = y - tower.y
+            distance = np.sqrt(dx * dx + dy * dy)
+            nearest = distance if nearest is None else np.minimum(nearest, distance)
+        return nearest
+
+    def _positioning(self, columns: CardColumns, x, y, player_side: Side, card_col):
+        """Vectorized ``ClashRoyaleEngine._evaluate_positioning``."""
+        enemy_side = Side.ENEMY if player_side == Side.FRIENDLY else Side.FRIENDLY
+        distance = self._nearest_tower_distance(x, y, enemy_side)
+
+        weights = self.weights
+        is_troop = card_col(columns.is_troop)
+        if distance is None:
+            tower_score = np.zeros(np.broadcast(is_troop, x).shape)
+        else:
+            rusher = is_troop & card_col(columns.targets_buildings)
+            tower_score = np.where(
+                rusher,
+                np.maximum(0.0, weights.rush_base - distance * weights.rush_falloff),
+                np.where(
+                    card_col(columns.is_building),
+                    distance * weights.building_distance,
+                    np.where(card_col(columns.is_spell), weights.spell_base, 0.0)
+                )
+            )
+
+        if player_side == Side.FRIENDLY:
+            is_bridge = y >= 14
+        else:
+            is_bridge = y <= 18
+
+        return tower_score + np.where(is_bridge & is_troop, weights.bridge_troop, 0.0)
+
+    def _card_type(self, columns: CardColumns):
+        """Vectorized ``ClashRoyaleEngine._evaluate_card_type``."""
+        weights = self.weights
+        score = np.where(columns.damage > 200, weights.high_damage, 0.0)
+        score = score + np.where(columns.area_damage, weights.area_damage, 0.0)
+        score = score + np.where(columns.range > 5.0, weights.long_range, 0.0)
+        score = score + np.where(columns.is_building, weights.building_value, 0.0)
+        return score
+
+    def _counters(self, columns: CardColumns, opponent_cards: List[Card]):
+        """Vectorized ``ClashRoyaleEngine._evaluate_counters``."""
+        from opponent import CardDistribution
+        if isinstance(opponent_cards, CardDistribution):
+            return self.counter_matrix.expected_scores(opponent_cards, columns.ids)
+        return self.counter_matrix.scores(opponent_cards, columns.ids)
+
+    def _strategy(self, x, y, player_side: Side):
+        """Vectorized ``ClashRoyaleEngine._evaluate_strategy``."""
+        weights = self.weights
+        score = np.where((x < 7) | (x > 11), weights.side_lane, weights.center_lane)
+        if player_side == Side.FRIENDLY:
+            aggressive = y > 10
+        else:
+            aggressive = y < 22
+        return score + np.where(aggressive, weights.aggressive, 0.0)
+
+
+class BatchResult:
+    """
+    Best moves for many game states, stored column by column.
+
+    Moves of all states are concatenated into flat arrays; the moves of
+    state ``i`` occupy ``offsets[i]:offsets[i + 1]``, best first. Per-state
+    columns hold the player name, elixir, number of playable cards and the
+    card IDs in hand (HAND_SIZE per state).
+
+    Card IDs are only meaningful in the registry of the process that made
+    them: a spawned worker registers custom cards in its own order. A
+    pickled result therefore carries the cards its IDs refer to, and
+    unpickling remaps the IDs to the receiving process's registry.
+    """
+
+    HAND_SIZE = 4
+
+    def __init__(self):
+        """Initialize an empty result."""
+        self.offsets = array('I', [0])
+        self.card_id = array('i')
+        self.x = array('d')
+        self.y = array('d')
+        self.score = array('d')
+        self.sides: List[Side] = []
+        self.players: List[str] = []
+        self.elixir = array('d')
+        self.playable = array('b')
+        self.hand_ids = array('i')
+
+    def append(self, player, side: Side, moves: Sequence):
+        """
+        Add one state's results.
+
+        Args:
+            player: Player the moves were found for
+            side: Which side the player is on
+            moves: Best moves, highest score first
+        """
+        for move in moves:
+            self.card_id.append(move.card.card_id)
+            self.x.append(move.position.x)
+            self.y.append(move.position.y)
+            self.score.append(move.score)
+        self.offsets.append(len(self.score))
+        self.sides.append(side)
+        self.players.append(player.name)
+        self.elixir.append(player.elixir)
+        self.playable.append(len(player.get_playable_cards()))
+        hand = player.hand_ids()
+        self.hand_ids.extend(hand[:self.HAND_SIZE])
+        self.hand_ids.extend([-1] * (self.HAND_SIZE - len(hand)))
+
+    def extend(self, other: 'BatchResult'):
+        """Append every state of another result, preserving order."""
+        base = self.offsets[-1]
+        self.offsets.extend(offset + base for offset in other.offsets[1:])
+        self.card_id.extend(other.card_id)
+        self.x.extend(other.x)
+        self.y.extend(other.y)
+        self.score.extend(other.score)
+        self.sides.extend(other.sides)
+        self.players.extend(other.players)
+        self.elixir.extend(other.elixir)
+        self.playable.extend(other.playable)
+        self.hand_ids.extend(other.hand_ids)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        ids = set(self.card_id)
+        ids.update(self.hand_ids)
+        ids.discard(-1)
+        # Cards pickle by signature, so they re-register on the other side
+        state['cards'] = {card_id: CARD_REGISTRY.get(card_id) for card_id in ids}
+        return state
+
+    def __setstate__(self, state: dict):
+        cards = state.pop('cards')
+        self.__dict__.update(state)
+        remap = {old: card.card_id for old, card in cards.items() if old != card.card_id}
+        if remap:
+            for column in (self.card_id, self.hand_ids):
+                for i, card_id in enumerate(column):
+                    column[i] = remap.get(card_id, card_id)
+
+    def moves(self, index: int) -> List:
+        """
+        Rebuild the Move objects of one state.
+
+        Args:
+            index: State index
+
+        Returns:
+            Best moves of that state, highest score first
+        """
+        from move import Move
+        side = self.sides[index]
+        return [
+            Move(CARD_REGISTRY.get(self.card_id[i]),
+                 Position.intern(self.x[i], self.y[i], side),
+                 self.score[i])
+            for i in range(self.offsets[index], self.offsets[index + 1])
+        ]
+
+    def analysis(self, index: int) -> dict:
+        """
+        Build the analyze_position style dictionary of one state.
+
+        Args:
+            index: State index
+
+        Returns:
+            Dictionary with analysis results
+        """
+        moves = self.moves(index)
+        hand = self.hand_ids[index * self.HAND_SIZE:(index + 1) * self.HAND_SIZE]
+        return {
+            'player': self.players[index],
+            'elixir': self.elixir[index],
+            'playable_cards': self.playable[index],
+            'hand': [str(CARD_REGISTRY.get(card_id)) for card_id in hand if card_id >= 0],
+            'best_moves': [
+                {
+                    'card': move.card.name,
+                    'position': f"({move.position.x:.0f}, {move.position.y:.0f})",
+                    'score': round(move.score, 2),
+                    'elixir_cost': move.card.elixir_cost
+                }
+                for move in moves
+            ],
+            'recommendation': str(moves[0]) if moves else "No moves available"
+        }
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __repr__(self) -> str:
+        return f"BatchResult({len(self)} states, {len(self.score)} moves)"
+
+
+def find_best_moves_chunk(
+    board: Board,
+    states: Sequence[tuple],
+    top_n: int,
+    weights: Optional[EvalWeights] = None
+) -> BatchResult:
+    """
+    Find the best moves for a chunk of states with one shared engine.
+
+    The engine uses score tables, so the static evaluation terms are
+    computed once per card and tower state for the whole chunk.
+
+    Args:
+        board: Board (tower state) shared by the states
+        states: (player, side, opponent_cards) tuples
+        top_n: Number of top moves per state
+        weights: Evaluation weights (defaults if None)
+
+    Returns:
+        Columnar result in input order
+    """
+    from engine import ClashRoyaleEngine
+    engine = ClashRoyaleEngine(board, use_tables=True, tt_bytes=0, weights=weights)
+    result = BatchResult()
+    for player, side, opponent_cards in states:
+        result.append(player, side, engine.find_best_move(player, side, opponent_cards, top_n))
+    return result
+
+
+def _run_chunk(args) -> BatchResult:
+    """Process pool entry point for find_best_moves_chunk."""
+    return find_best_moves_chunk(*args)
+
+
+# Engines of a worker process, keyed by (friendly, enemy) tower state
+_WORKER_ENGINES: Dict[Tuple[int, int], object] = {}
+
+
+def worker_engine(towers: Tuple[int, int]):
+    """
+    Get (or build) a table-backed, caching engine for a tower state.
+
+    Engines live for the whole process, so the score tables and result
+    cache are shared by every job a worker runs.
+
+    Args:
+        towers: (friendly, enemy) Board.tower_state masks
+
+    Returns:
+        Engine for a board with those towers standing
+    """
+    engine = _WORKER_ENGINES.get(towers)
+    if engine is None:
+        from engine import ClashRoyaleEngine
+        board = Board()
+        for side, state in zip((Side.FRIENDLY, Side.ENEMY), towers):
+            for bit, name in enumerate(Board.TOWER_NAMES):
+                if not state & (1 << bit):
+                    board.destroy_tower(side, name)
+        engine = ClashRoyaleEngine(board, use_tables=True, tt_bytes=0, cache_size=4096)
+        _WORKER_ENGINES[towers] = engine
+    return engine
@@ -0,0 +1,397 @@
+"""
+Benchmarks for the engine's hot paths.
+
+Every case times one engine call (``generate_moves``, ``evaluate_move``,
+``find_best_move`` in each placement and evaluation mode,
+``analyze_position``, and the lookahead and Monte Carlo searches) over a
+range of card-pool sizes and position grids, and reports:
+
+- ``ops_per_sec``: calls per second, from the mean latency
+- ``p50_us`` / ``p99_us``: median and 99th percentile latency
+- ``peak_bytes``: peak memory traced by ``tracemalloc`` during one call
+- ``retained_blocks``: memory blocks still allocated after one call
+
+Fast calls are timed in batches (each sample lasts at least
+``SAMPLE_TIME``) and latencies are per call. Cases with state that would
+speed up later calls, such as the search transposition table, reset it
+before every sample, outside the timed region.
+
+A card pool of N cards is ``CARD_POOL`` extended with stat variants of its
+cards. The opponent's hand is unknown and scored as a ``CardDistribution``
+spread evenly over the pool, so the counter term grows with N.
+
+The report is JSON. Given a baseline report, every case that got slower or
+allocates more than the threshold is listed as a regression::
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.25
+
+The second command exits with status 1 if any case regressed.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from card import Card, CARD_POOL
+from board import Side
+from engine import ClashRoyaleEngine
+from move import Move
+from opponent import CardDistribution
+from player import Player
+from batch import np
+
+REPORT_VERSION = 1
+
+# Card-pool sizes and (placement, resolution) grids benchmarked by default
+POOL_SIZES = (10, 40, 160)
+GRIDS = (('zones', 1.0), ('tiles', 1.0), ('tiles', 0.5), ('refine', 0.5))
+
+# Minimum duration of one timing sample (seconds)
+SAMPLE_TIME = 0.002
+
+
+class BenchmarkResult:
+    """Timing and allocation statistics of one benchmark case."""
+
+    FIELDS = ('ops_per_sec', 'p50_us', 'p99_us', 'samples', 'calls',
+              'peak_bytes', 'retained_blocks')
+
+    def __init__(self, name: str, latencies: Sequence[float], calls: int,
+                 peak_bytes: int = 0, retained_blocks: int = 0):
+        """
+        Initialize a result.
+
+        Args:
+            name: Case name
+            latencies: Per-call latency of every sample (seconds)
+            calls: Total number of timed calls
+            peak_bytes: Peak traced memory during one call
+            retained_blocks: Blocks still allocated after one call
+        """
+        ordered = sorted(latencies)
+        mean = sum(ordered) / len(ordered)
+        self.name = name
+        self.ops_per_sec = 1.0 / mean if mean > 0 else float('inf')
+        self.p50_us = _percentile(ordered, 0.50) * 1e6
+        self.p99_us = _percentile(ordered, 0.99) * 1e6
+        self.samples = len(ordered)
+        self.calls = calls
+        self.peak_bytes = peak_bytes
+        self.retained_blocks = retained_blocks
+
+    def to_dict(self) -> Dict[str, float]:
+        """Get the statistics as a JSON-compatible dictionary."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return (f"{self.name:<44} {self.ops_per_sec:>11.1f}/s "
+                f"p50 {self.p50_us:>10.1f}us p99 {self.p99_us:>10.1f}us "
+                f"peak {self.peak_bytes:>9}B")
+
+
+def _percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    reset: Optional[Callable[[], object]] = None,
+    min_time: float = 0.5,
+    min_samples: int = 5,
+    max_samples: int = 1000
+) -> BenchmarkResult:
+    """
+    Time a function and trace the memory one call allocates.
+
+    Args:
+        name: Case name
+        func: Function to call with no arguments
+        reset: Called before every sample, untimed; forces one call per
+            sample
+        min_time: Seconds of sampling after calibration
+        min_samples: Fewest samples to take, however long they last
+        max_samples: Most samples to take
+
+    Returns:
+        Statistics of the case
+    """
+    perf_counter = time.perf_counter
+
+    def sample(number: int) -> float:
+        if reset is not None:
+            reset()
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        return perf_counter() - start
+
+    # Warm up (lazy tables, caches) and pick calls per sample
+    number = 1
+    elapsed = sample(1)
+    if reset is None:
+        while elapsed < SAMPLE_TIME:
+            number *= 2
+            elapsed = sample(number)
+
+    latencies = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = perf_counter() + min_time
+        while len(latencies) < max_samples and (
+                len(latencies) < min_samples or perf_counter() < deadline):
+            latencies.append(sample(number) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    peak_bytes, retained_blocks = _trace_allocations(func, reset)
+    return BenchmarkResult(name, latencies, number * len(latencies), peak_bytes, retained_blocks)
+
+
+def _trace_allocations(func: Callable[[], object], reset: Optional[Callable[[], object]]) -> Tuple[int, int]:
+    """Peak traced bytes and retained blocks of one call."""
+    if reset is not None:
+        reset()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start_blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - start_bytes
+        del result
+        gc.collect()
+        retained = sys.getallocatedblocks() - start_blocks
+    finally:
+        tracemalloc.stop()
+    return peak, max(0, retained)
+
+
+def make_pool(size: int) -> List[Card]:
+    """
+    Build a card pool of a given size.
+
+    Args:
+        size: Number of cards (at least 8)
+
+    Returns:
+        CARD_POOL followed by stat variants of its cards
+    """
+    pool = list(CARD_POOL[:size])
+    variant = 0
+    while len(pool) < size:
+        base = CARD_POOL[variant % len(CARD_POOL)]
+        level = variant // len(CARD_POOL) + 1
+        pool.append(Card(
+            f"{base.name} +{level}", base.card_type, base.elixir_cost, base.rarity,
+            base.target_type, damage=base.damage + 10 * level, hit_speed=base.hit_speed,
+            range_=base.range, area_damage=base.area_damage, splash_radius=base.splash_radius
+        ))
+        variant += 1
+    return pool
+
+
+def _players(pool: Sequence[Card]) -> Tuple[Player, Player, CardDistribution]:
+    """Two full-elixir players with a deck spread over the pool, and the opponent's hand."""
+    stride = max(1, len(pool) // 8)
+    deck = list(pool[:8 * stride:stride])
+    player = Player(deck, "Benchmark")
+    opponent = Player(deck[4:] + deck[:4], "Opponent")
+    player.elixir = opponent.elixir = Player.MAX_ELIXIR
+    hand = CardDistribution({
+        card.card_id: Player.HAND_SIZE / len(pool) for card in pool
+    })
+    return player, opponent, hand
+
+
+def build_cases(
+    pool_sizes: Sequence[int] = POOL_SIZES,
+    grids: Sequence[Tuple[str, float]] = GRIDS
+) -> List[Tuple[str, Callable[[], object], Optional[Callable[[], object]]]]:
+    """
+    Build the benchmark cases.
+
+    Args:
+        pool_sizes: Card-pool sizes to benchmark
+        grids: (placement, resolution) pairs for find_best_move
+
+    Returns:
+        (name, function, reset) triples
+    """
+    side = Side.FRIENDLY
+    cases = []
+    engine = ClashRoyaleEngine()
+    tables_engine = ClashRoyaleEngine(use_tables=True)
+    vector_engine = ClashRoyaleEngine(vectorized=True) if np is not None else None
+
+    for size in pool_sizes:
+        pool = make_pool(size)
+        player, opponent, hand = _players(pool)
+        suffix = f"pool={size}"
+        move = Move(player.hand[0], engine.board.get_valid_deployment_positions(side)[0])
+
+        cases.append((f"generate_moves/{suffix}",
+                      lambda player=player: engine.generate_moves(player, side), None))
+        cases.append((f"evaluate_move/{suffix}",
+                      lambda move=move, hand=hand: engine.evaluate_move(move, side, hand), None))
+        for placement, resolution in grids:
+            name = f"find_best_move/{placement}@{resolution:g}/{suffix}"
+            cases.append((name, lambda player=player, hand=hand, placement=placement, resolution=resolution:
+                          engine.find_best_move(player, side, hand, top_n=5,
+                                                placement=placement, resolution=resolution), None))
+        cases.append((f"find_best_move/tables/{suffix}",
+                      lambda player=player, hand=hand: tables_engine.find_best_move(player, side, hand, top_n=5),
+                      None))
+        if vector_engine is not None:
+            cases.append((f"find_best_move/vectorized/{suffix}",
+                          lambda player=player, hand=hand: vector_engine.find_best_move(player, side, hand, top_n=5),
+                          None))
+        cases.append((f"analyze_position/{suffix}",
+                      lambda player=player, hand=hand: engine.analyze_position(player, side, hand), None))
+
+    # Searches only look at the players' hands, so one pool is enough
+    pool = make_pool(min(pool_sizes))
+    player, opponent, hand = _players(pool)
+    search_engine = ClashRoyaleEngine()
+
+    def clear_table():
+        if search_engine.transposition_table is not None:
+            search_engine.transposition_table.clear()
+
+    cases.append(("analyze_position/search-depth=2",
+                  lambda: search_engine.analyze_position(player, side, hand, opponent, search_depth=2),
+                  clear_table))
+    for depth in (2, 3):
+        cases.append((f"search_best_move/depth={depth}",
+                      lambda depth=depth: search_engine.search_best_move(player, opponent, side, hand, depth=depth),
+                      clear_table))
+    cases.append(("iterative_search/depth=3",
+                  lambda: search_engine.iterative_search(player, opponent, side, hand,
+                                                         time_budget=None, max_depth=3),
+                  clear_table))
+    cases.append(("mcts_best_move/iterations=200",
+                  lambda: search_engine.mcts_best_move(player, opponent, side, hand, iterations=200),
+                  None))
+    return cases
+
+
+def run_benchmarks(
+    pool_sizes: Sequence[int] = POOL_SIZES,
+    grids: Sequence[Tuple[str, float]] = GRIDS,
+    pattern: Optional[str] = None,
+    min_time: float = 0.5,
+    verbose: bool = False
+) -> dict:
+    """
+    Run every benchmark case.
+
+    Args:
+        pool_sizes: Card-pool sizes to benchmark
+        grids: (placement, resolution) pairs for find_best_move
+        pattern: Regular expression; only cases whose name matches run
+        min_time: Seconds of sampling per case
+        verbose: Print each result as it is measured
+
+    Returns:
+        JSON-compatible report
+    """
+    cases = {}
+    for name, func, reset in build_cases(pool_sizes, grids):
+        if pattern is not None and not re.search(pattern, name):
+            continue
+        result = measure(name, func, reset, min_time=min_time)
+        if verbose:
+            print(result)
+        cases[name] = result.to_dict()
+    return {
+        'version': REPORT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np is not None,
+        'cases': cases,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.25,
+            min_bytes: int = 4096) -> List[str]:
+    """
+    Find cases that regressed against a baseline report.
+
+    A case regresses if its median latency or its peak memory grew by more
+    than ``threshold`` (a fraction). Cases missing from either report are
+    ignored.
+
+    Args:
+        report: Current report from run_benchmarks
+        baseline: Earlier report
+        threshold: Allowed relative growth (0.25 = 25%)
+        min_bytes: Peak memory growth below this many bytes is ignored
+
+    Returns:
+        One message per regression (empty if none)
+    """
+    if baseline.get('version') != report.get('version'):
+        raise ValueError(f"Baseline report version {baseline.get('version')} "
+                         f"does not match {report.get('version')}")
+    regressions = []
+    for name, current in report['cases'].items():
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            continue
+        if current['p50_us'] > previous['p50_us'] * (1.0 + threshold):
+            regressions.append(
+                f"{name}: p50 {previous['p50_us']:.1f}us -> {current['p50_us']:.1f}us "
+                f"(+{current['p50_us'] / previous['p50_us'] - 1.0:.0%})"
+            )
+        growth = current['peak_bytes'] - previous['peak_bytes']
+        if growth > min_bytes and current['peak_bytes'] > previous['peak_bytes'] * (1.0 + threshold):
+            regressions.append(
+                f"{name}: peak {previous['peak_bytes']}B -> {current['peak_bytes']}B"
+            )
+    return regressions
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    parser.add_argument('--baseline', help="JSON report to check for regressions against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed relative slowdown (default 0.25)")
+    parser.add_argument('--filter', help="only run cases matching this regular expression")
+    parser.add_argument('--pools', type=int, nargs='+', default=list(POOL_SIZES),
+                        help="card-pool sizes")
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help="seconds of sampling per case")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.pools, pattern=args.filter, min_time=args.min_time, verbose=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 Board/Arena class representing the Clash Royale playing field.
 """
 
-from typing import List, Tuple, Optional
+import math
+from typing import Dict, List, Tuple, Optional, Sequence
 from enum import Enum
 
 
@@ -13,7 +14,16 @@ class Side(Enum):
 
 
 class Position:
-    """Represents a position on the arena."""
+    """
+    Represents a position on the arena.
+    
+    Positions are immutable. Positions on the tile grid are interned (see
+    Position.intern and PositionGrid): there is a single shared instance per
+    tile and side, which also carries its precomputed validity and distances
+    to every tower.
+    """
+    
+    __slots__ = ('x', 'y', 'side', '_hash', 'valid', 'tower_distances')
     
     def __init__(self, x: float, y: float, side: Side):
         """
@@ -24,9 +34,36 @@ class Position:
             y: Y coordinate (0-32, representing tiles from bottom to top)
             side: Which side of the arena (friendly or enemy)
         """
-        self.x = x
-        self.y = y
-        self.side = side
+        set_attr = object.__setattr__
+        set_attr(self, 'x', x)
+        set_attr(self, 'y', y)
+        set_attr(self, 'side', side)
+        set_attr(self, '_hash', hash((x, y, side)))
+        # Filled in for interned positions only
+        set_attr(self, 'valid', None)
+        set_attr(self, 'tower_distances', None)
+    
+    @staticmethod
+    def intern(x: float, y: float, side: Side) -> 'Position':
+        """
+        Get the shared instance for a grid position.
+        
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            side: Which side of the arena
+            
+        Returns:
+            The interned position, or a new one if (x, y) is off the grid
+        """
+        position = Board.grid().get(x, y, side)
+        return position if position is not None else Position(x, y, side)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+    
+    def __reduce__(self):
+        return (Position.intern, (self.x, self.y, self.side))
     
     def __repr__(self) -> str:
         return f"Position(x={self.x}, y={self.y}, {self.side.value})"
@@ -35,17 +72,99 @@ class Position:
         return f"({self.x}, {self.y}) {self.side.value}"
     
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
         if not isinstance(other, Position):
             return False
         return (self.x == other.x and self.y == other.y and 
                 self.side == other.side)
     
     def __hash__(self) -> int:
-        return hash((self.x, self.y, self.side))
+        return self._hash
     
     def distance_to(self, other: 'Position') -> float:
         """Calculate Euclidean distance to another position."""
-        return ((self.x - other.x) ** 2 + (self.y - other.y) ** 2) ** 0.5
+        # math.sqrt is correctly rounded, which keeps this bit-identical to
+        # the vectorized evaluator (float ** 0.5 can differ in the last ulp)
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return math.sqrt(dx * dx + dy * dy)
+
+
+class PositionGrid:
+    """
+    Flyweight grid of interned positions covering the whole arena.
+    
+    Holds one Position per grid point and side, at ``resolution`` tile
+    spacing (0.5 includes half-tiles). Each position is stamped with its
+    validity under Board's deployment rules and its distance to each of
+    the six towers, in Board.TOWER_ORDER.
+    """
+    
+    def __init__(self, resolution: float = 0.5):
+        """
+        Build the grid.
+        
+        Args:
+            resolution: Spacing between grid points in tiles (1 / integer)
+        """
+        self.steps = int(round(1 / resolution))
+        self.resolution = 1 / self.steps
+        self.columns = Board.WIDTH * self.steps + 1
+        self.rows = Board.HEIGHT * self.steps + 1
+        # Cells are created on first access so building the grid is cheap
+        self._cells: Dict[Side, List[Optional[Position]]] = {
+            side: [None] * (self.columns * self.rows) for side in Side
+        }
+    
+    def _make_cell(self, column: int, row: int, side: Side) -> Position:
+        """Create and stamp the interned position of a cell."""
+        position = Position(self._coordinate(column), self._coordinate(row), side)
+        set_attr = object.__setattr__
+        set_attr(position, 'valid', Board.check_position(position))
+        set_attr(position, 'tower_distances',
+                 tuple(position.distance_to(tower) for tower in Board.TOWER_ORDER))
+        self._cells[side][row * self.columns + column] = position
+        return position
+    
+    def _coordinate(self, index: int) -> float:
+        """Grid index to coordinate, keeping whole tiles as ints."""
+        if index % self.steps == 0:
+            return index // self.steps
+        return index / self.steps
+    
+    def get(self, x: float, y: float, side: Side) -> Optional[Position]:
+        """
+        Get the interned position at a coordinate.
+        
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            side: Which side of the arena
+            
+        Returns:
+            Interned position, or None if (x, y) is not a grid point
+        """
+        column = x * self.steps
+        row = y * self.steps
+        if column != int(column) or row != int(row):
+            return None
+        column = int(column)
+        row = int(row)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return None
+        position = self._cells[side][row * self.columns + column]
+        if position is None:
+            position = self._make_cell(column, row, side)
+        return position
+    
+    def positions(self, side: Side) -> List[Position]:
+        """Every interned position of a side, row by row."""
+        cells = self._cells[side]
+        for index, position in enumerate(cells):
+            if position is None:
+                self._make_cell(index % self.columns, index // self.columns, side)
+        return cells
 
 
 class Board:
@@ -96,6 +215,18 @@ class Board:
     ENEMY_LEFT_TOWER = Position(4, 22, Side.ENEMY)
     ENEMY_RIGHT_TOWER = Position(14, 22, Side.ENEMY)
     
+    # Tower names in bit order for tower_state()
+    TOWER_NAMES = ('king', 'left', 'right')
+    
+    # Tower order of Position.tower_distances (nearest-tower search order)
+    TOWER_ORDER = (
+        FRIENDLY_LEFT_TOWER, FRIENDLY_RIGHT_TOWER, FRIENDLY_KING_TOWER,
+        ENEMY_LEFT_TOWER, ENEMY_RIGHT_TOWER, ENEMY_KING_TOWER
+    )
+    
+    _grid: Optional[PositionGrid] = None
+    _deployment_positions: Dict[tuple, Tuple[Position, ...]] = {}
+    
     def __init__(self):
         """Initialize the board."""
         # Track destroyed towers
@@ -109,23 +240,87 @@ class Board:
             'left': True,
             'right': True
         }
+        self._valid_deployment: Dict[Side, Tuple[Position, ...]] = {}
+        self._tile_positions: Dict[tuple, Tuple[Position, ...]] = {}
+    
+    @classmethod
+    def grid(cls) -> PositionGrid:
+        """Get the shared position grid, building it on first use."""
+        if Board._grid is None:
+            Board._grid = PositionGrid()
+        return Board._grid
     
-    def get_deployment_positions(self, side: Side) -> List[Position]:
+    def get_deployment_positions(self, side: Side) -> Sequence[Position]:
         """
         Get valid deployment positions for a side.
         
+        The positions are interned and the returned tuple is shared, so
+        repeated calls allocate nothing.
+        
         Args:
             side: Which side to get positions for
             
         Returns:
-            List of valid deployment positions
+            Tuple of deployment positions
         """
-        if side == Side.FRIENDLY:
-            zones = self.FRIENDLY_DEPLOYMENT_ZONES
-        else:
-            zones = self.ENEMY_DEPLOYMENT_ZONES
+        key = (type(self), side)
+        positions = Board._deployment_positions.get(key)
+        if positions is None:
+            if side == Side.FRIENDLY:
+                zones = self.FRIENDLY_DEPLOYMENT_ZONES
+            else:
+                zones = self.ENEMY_DEPLOYMENT_ZONES
+            positions = tuple(Position.intern(x, y, side) for x, y in zones)
+            Board._deployment_positions[key] = positions
+        return positions
+    
+    def get_tile_positions(self, side: Side, resolution: float = 1.0) -> Sequence[Position]:
+        """
+        Get every legal tile (or sub-tile) position on a side.
         
-        return [Position(x, y, side) for x, y in zones]
+        Args:
+            side: Which side to get positions for
+            resolution: Spacing in tiles, 1.0 for whole tiles or 0.5 to also
+                include half-tiles
+            
+        Returns:
+            Tuple of interned valid positions, row by row
+        """
+        key = (side, resolution)
+        positions = self._tile_positions.get(key)
+        if positions is None:
+            grid = self.grid()
+            steps = int(round(1 / resolution))
+            if grid.steps % steps != 0:
+                raise ValueError(f"Unsupported resolution: {resolution}")
+            stride = grid.steps // steps
+            positions = tuple(
+                position for index, position in enumerate(grid.positions(side))
+                if (index % grid.columns) % stride == 0 and
+                (index // grid.columns) % stride == 0 and
+                self.is_valid_position(position)
+            )
+            self._tile_positions[key] = positions
+        return positions
+    
+    def get_valid_deployment_positions(self, side: Side) -> Sequence[Position]:
+        """
+        Get the deployment positions that pass is_valid_position.
+        
+        Args:
+            side: Which side to get positions for
+            
+        Returns:
+            Tuple of valid deployment positions, checked once per board
+        """
+        positions = self._valid_deployment.get(side)
+        if positions is None:
+            positions = tuple(
+                position for position in self.get_deployment_positions(side)
+                if self.is_valid_position(position)
+            )
+            self._valid_deployment[side] = positions
+        return positions
     
     def is_valid_position(self, position: Position) -> bool:
         """
@@ -137,19 +332,105 @@ class Board:
         Returns:
             True if position is valid
         """
-        if position.x < 0 or position.x > self.WIDTH:
+        # Interned positions carry a precomputed validity bit
+        if position.valid is not None:
+            return position.valid
+        return self.check_position(position)
+    
+    @classmethod
+    def check_position(cls, position: Position) -> bool:
+        """
+        Apply the arena bounds and deployment rules to a position.
+        
+        Args:
+            position: Position to check
+            
+        Returns:
+            True if position is valid
+        """
+        if position.x < 0 or position.x > cls.WIDTH:
             return False
-        if position.y < 0 or position.y > self.HEIGHT:
+        if position.y < 0 or position.y > cls.HEIGHT:
             return False
         
         # Check deployment restrictions
-        if position.side == Side.FRIENDLY and position.y > self.MIDLINE:
+        if position.side == Side.FRIENDLY and position.y > cls.MIDLINE:
             return False
-        if position.side == Side.ENEMY and position.y < self.MIDLINE:
+        if position.side == Side.ENEMY and position.y < cls.MIDLINE:
             return False
         
         return True
     
+    def get_towers(self, side: Side) -> dict:
+        """
+        Get the standing/destroyed tower flags for a side.
+        
+        Args:
+            side: Which side's towers to return
+            
+        Returns:
+            Dictionary mapping tower name to True if still standing
+        """
+        return self.friendly_towers if side == Side.FRIENDLY else self.enemy_towers
+    
+    def tower_state(self, side: Side) -> int:
+        """
+        Encode which towers are standing on a side as a 3-bit integer.
+        
+        Args:
+            side: Which side's towers to encode
+            
+        Returns:
+            Bitmask with one bit per tower in TOWER_NAMES order
+        """
+        towers = self.get_towers(side)
+        state = 0
+        for bit, name in enumerate(self.TOWER_NAMES):
+            if towers[name]:
+                state |= 1 << bit
+        return state
+    
+    def destroy_tower(self, side: Side, tower: str) -> bool:
+        """
+        Mark a tower as destroyed.
+        
+        Args:
+            side: Which side the tower belongs to
+            tower: Tower name ('king', 'left' or 'right')
+            
+        Returns:
+            True if the tower was standing before this call
+        """
+        towers = self.get_towers(side)
+        if tower not in towers:
+            raise ValueError(f"Unknown tower: {tower}")
+        was_standing = towers[tower]
+        towers[tower] = False
+        return was_standing
+    
+    def make_destroy_tower(self, side: Side, tower: str) -> tuple:
+        """
+        Destroy a tower, keeping what is needed to take it back.
+        
+        Args:
+            side: Which side the tower belongs to
+            tower: Tower name ('king', 'left' or 'right')
+            
+        Returns:
+            Undo record for unmake
+        """
+        return (side, tower, self.destroy_tower(side, tower))
+    
+    def unmake(self, undo: tuple):
+        """
+        Take back a make_destroy_tower.
+        
+        Args:
+            undo: Record returned by make_destroy_tower
+        """
+        side, tower, was_standing = undo
+        self.get_towers(side)[tower] = was_standing
+    
     def get_nearest_tower(self, position: Position, side: Side) -> Optional[Position]:
         """
         Get the nearest tower position for a given side.
@@ -183,5 +464,37 @@ class Board:
         
         return min(towers, key=lambda t: position.distance_to(t))
     
+    def get_nearest_tower_distance(self, position: Position, side: Side) -> Optional[float]:
+        """
+        Get the distance to the nearest standing tower of a side.
+        
+        Uses the precomputed distances of interned positions when available.
+        
+        Args:
+            position: Position to check from
+            side: Which side's towers to consider
+            
+        Returns:
+            Distance to the nearest tower or None if all are destroyed
+        """
+        distances = position.tower_distances
+        if distances is None:
+            tower = self.get_nearest_tower(position, side)
+            return position.distance_to(tower) if tower is not None else None
+        
+        if side == Side.FRIENDLY:
+            alive = self.friendly_towers
+            offset = 0
+        else:
+            alive = self.enemy_towers
+            offset = 3
+        nearest = None
+        for index, name in enumerate(('left', 'right', 'king')):
+            if alive[name]:
+                distance = distances[offset + index]
+                if nearest is None or distance < nearest:
+                    nearest = distance
+        return nearest
+    
     def __repr__(self) -> str:
         return f"Board({self.WIDTH}x{self.HEIGHT})"
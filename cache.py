@@ -0,0 +1,100 @@
+"""
+Bounded LRU cache for engine results.
+
+``ClashRoyaleEngine`` uses a ``ResultCache`` to memoize ``find_best_move``
+on a canonical form of its inputs (see ``ClashRoyaleEngine._cache_key``).
+The cache remembers the card registry version it was filled under and
+empties itself when new cards are registered.
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class ResultCache:
+    """Least-recently-used mapping with a size limit and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of stored results
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def validate(self, version: Hashable):
+        """
+        Drop every entry if the data the results depend on has changed.
+
+        Args:
+            version: Current version of that data (e.g. the registry version)
+        """
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.version = version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a result and mark it as recently used.
+
+        Args:
+            key: Canonical input key
+
+        Returns:
+            Stored result, or None on a miss
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a result, evicting the least recently used one if full.
+
+        Args:
+            key: Canonical input key
+            value: Result to store (must not be None)
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry (counters are kept)."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get the cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (f"ResultCache({len(self._entries)}/{self.max_entries} entries, "
+                f"{self.hits} hits, {self.misses} misses)")
@@ -2,8 +2,9 @@
 Card class representing Clash Royale cards with their properties.
 """
 
+from array import array
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class CardType(Enum):
@@ -30,7 +31,21 @@ class TargetType(Enum):
 
 
 class Card:
-    """Represents a Clash Royale card with its properties."""
+    """
+    Represents a Clash Royale card with its properties.
+    
+    Every card is registered in CARD_REGISTRY on creation and carries the
+    resulting integer ``card_id``. Cards with identical stats share an ID and
+    compare equal; equality and hashing only look at the ID.
+    
+    Cards are immutable: the registry copies their stats into its arrays at
+    registration, so a changed attribute would leave those stale.
+    """
+    
+    __slots__ = (
+        'name', 'card_type', 'elixir_cost', 'rarity', 'target_type', 'damage',
+        'hit_speed', 'range', 'area_damage', 'splash_radius', 'card_id'
+    )
     
     def __init__(
         self,
@@ -60,16 +75,40 @@ class Card:
             area_damage: Whether card does area damage
             splash_radius: Radius of splash damage
         """
-        self.name = name
-        self.card_type = card_type
-        self.elixir_cost = elixir_cost
-        self.rarity = rarity
-        self.target_type = target_type
-        self.damage = damage
-        self.hit_speed = hit_speed
-        self.range = range_
-        self.area_damage = area_damage
-        self.splash_radius = splash_radius
+        set_attr = object.__setattr__
+        set_attr(self, 'name', name)
+        set_attr(self, 'card_type', card_type)
+        set_attr(self, 'elixir_cost', elixir_cost)
+        set_attr(self, 'rarity', rarity)
+        set_attr(self, 'target_type', target_type)
+        set_attr(self, 'damage', damage)
+        set_attr(self, 'hit_speed', hit_speed)
+        set_attr(self, 'range', range_)
+        set_attr(self, 'area_damage', area_damage)
+        set_attr(self, 'splash_radius', splash_radius)
+        set_attr(self, 'card_id', CARD_REGISTRY.register(self))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable; create a new Card")
+    
+    def signature(self) -> tuple:
+        """Get the tuple of all stats that identifies this card."""
+        return (self.name, self.card_type, self.elixir_cost, self.rarity,
+                self.target_type, self.damage, self.hit_speed, self.range,
+                self.area_damage, self.splash_radius)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Card):
+            return False
+        return self.card_id == other.card_id
+    
+    def __hash__(self) -> int:
+        return self.card_id
+    
+    def __reduce__(self):
+        # Rebuild through __init__ so the card is registered (and gets a
+        # valid ID) in the receiving process
+        return (_rebuild_card, self.signature())
     
     def __repr__(self) -> str:
         return f"Card({self.name}, {self.elixir_cost} elixir, {self.card_type.value})"
@@ -78,6 +117,135 @@ class Card:
         return f"{self.name} ({self.elixir_cost})"
 
 
+def _rebuild_card(name, card_type, elixir_cost, rarity, target_type, damage,
+                  hit_speed, range_, area_damage, splash_radius) -> Card:
+    """Recreate a card from its signature (used when unpickling)."""
+    return Card(name, card_type, elixir_cost, rarity, target_type, damage=damage,
+                hit_speed=hit_speed, range_=range_, area_damage=area_damage,
+                splash_radius=splash_radius)
+
+
+class CardRegistry:
+    """
+    Assigns each distinct card a small integer ID.
+    
+    Card stats are also stored in struct-of-arrays form, one compact array
+    per attribute indexed by card ID, so vectorized code can gather stats
+    for many cards without touching Card objects. Numeric stats are stored
+    as doubles, so fractional values are kept as given; enum attributes are
+    stored as their index in the enum's definition order.
+    
+    ``version`` increases whenever a new card is registered, so caches built
+    over the registry can tell when they are stale.
+    """
+    
+    CARD_TYPES = list(CardType)
+    RARITIES = list(Rarity)
+    TARGET_TYPES = list(TargetType)
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._ids: Dict[tuple, int] = {}
+        self._names: Dict[str, int] = {}
+        self.cards: List[Card] = []
+        self.version = 0
+        self.elixir_cost = array('d')
+        self.damage = array('d')
+        self.hit_speed = array('d')
+        self.range = array('d')
+        self.area_damage = array('b')
+        self.splash_radius = array('d')
+        self.card_type = array('b')
+        self.rarity = array('b')
+        self.target_type = array('b')
+    
+    def register(self, card: Card) -> int:
+        """
+        Register a card, reusing the ID of an identical card if one exists.
+        
+        Args:
+            card: Card to register
+            
+        Returns:
+            The card's integer ID
+            
+        Raises:
+            ValueError: If a stat is not numeric or an enum is unknown
+        """
+        signature = card.signature()
+        card_id = self._ids.get(signature)
+        if card_id is not None:
+            return card_id
+        
+        # Convert every stat before touching the registry, so a bad card
+        # leaves it unchanged
+        try:
+            row = (
+                (self.elixir_cost, float(card.elixir_cost)),
+                (self.damage, float(card.damage)),
+                (self.hit_speed, float(card.hit_speed)),
+                (self.range, float(card.range)),
+                (self.area_damage, bool(card.area_damage)),
+                (self.splash_radius, float(card.splash_radius)),
+                (self.card_type, self.CARD_TYPES.index(card.card_type)),
+                (self.rarity, self.RARITIES.index(card.rarity)),
+                (self.target_type, self.TARGET_TYPES.index(card.target_type)),
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid stats for card {card.name!r}: {e}") from None
+        appended = []
+        try:
+            for values, value in row:
+                values.append(value)
+                appended.append(values)
+        except (TypeError, ValueError, OverflowError) as e:
+            for values in appended:
+                values.pop()
+            raise ValueError(f"Invalid stats for card {card.name!r}: {e}") from None
+        
+        card_id = len(self.cards)
+        self._ids[signature] = card_id
+        self._names.setdefault(card.name, card_id)
+        self.cards.append(card)
+        self.version += 1
+        return card_id
+    
+    def get(self, card_id: int) -> Card:
+        """
+        Get the card registered under an ID.
+        
+        Args:
+            card_id: Card ID
+            
+        Returns:
+            The first card registered with that ID
+        """
+        return self.cards[card_id]
+    
+    def find(self, name: str) -> Optional[Card]:
+        """
+        Look up a card by name.
+        
+        Args:
+            name: Card name
+            
+        Returns:
+            The first card registered under that name, or None
+        """
+        card_id = self._names.get(name)
+        return None if card_id is None else self.cards[card_id]
+    
+    def __len__(self) -> int:
+        return len(self.cards)
+    
+    def __repr__(self) -> str:
+        return f"CardRegistry({len(self.cards)} cards)"
+
+
+# Registry shared by every card
+CARD_REGISTRY = CardRegistry()
+
+
 # Predefined common Clash Royale cards
 KNIGHT = Card("Knight", CardType.TROOP, 3, Rarity.COMMON, TargetType.GROUND, 
               damage=100, hit_speed=1.1, range_=0.5)
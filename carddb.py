@@ -0,0 +1,420 @@
+"""
+Card databases loaded from JSON or CSV files.
+
+A ``CardDatabase`` reads card definitions from a file instead of module
+constants. On first load the file is parsed and compiled into a binary
+cache next to it (``cards.json`` -> ``cards.json.crdb``): a header, one
+fixed-size struct-packed record per card, the record numbers sorted by name
+and a UTF-8 name blob. Later loads memory-map the cache and only check its
+header, and a lookup by name is a binary search over the mapped file, so
+opening a database and fetching a card cost about the same for ten cards or
+thousands. ``Card`` objects (and their registry IDs) are created on first
+access.
+
+The cache records the format version and the source file's size and
+modification time, and is rebuilt whenever either changes. Where the cache
+cannot be written, the compiled records are kept in memory for the life of
+the database.
+
+Each database maps names to its own cards, so balance-patch variants of the
+same card can be loaded side by side from separate files::
+
+    live = CardDatabase('cards.json')
+    patch = CardDatabase('cards-patch.json')
+    live.get('Knight'), patch.get('Knight')   # two distinct cards
+
+JSON files hold a list of card objects (or ``{"cards": [...]}``); CSV files
+have one card per row. Fields are named like the ``Card`` attributes::
+
+    name, card_type, elixir_cost, rarity, target_type,
+    damage, hit_speed, range, area_damage, splash_radius
+
+Enum fields take their values (``"troop"``, ``"rare"``, ``"both"``). The last
+five fields are optional.
+"""
+
+import csv
+import json
+import math
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from card import Card, CardRegistry, CardType, Rarity, TargetType
+
+FORMAT_VERSION = 1
+_MAGIC = b'CRDB'
+# magic, format version, source size, source mtime (ns), cards, name bytes
+_HEADER = struct.Struct('<4sHQqII')
+# name offset, name length, card type, rarity, target type, elixir cost,
+# damage, hit speed, range, area damage, splash radius
+_RECORD = struct.Struct('<IHBBBbiddBd')
+# record number, in name order
+_ORDER = struct.Struct('<I')
+# Largest values the record fields hold
+_MAX_NAME_BYTES = 0xFFFF
+_MAX_ELIXIR_COST = 127
+_MAX_DAMAGE = 2 ** 31 - 1
+
+FIELDS = ('name', 'card_type', 'elixir_cost', 'rarity', 'target_type',
+          'damage', 'hit_speed', 'range', 'area_damage', 'splash_radius')
+
+
+def _parse_bool(value) -> bool:
+    """Parse a JSON or CSV boolean."""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ('1', 'true', 'yes', 'y'):
+            return True
+        if text in ('', '0', 'false', 'no', 'n'):
+            return False
+        raise ValueError(f"Not a boolean: {value!r}")
+    return bool(value)
+
+
+def _parse_number(value, field: str, integer: bool, low: float, high: float):
+    """Parse a JSON or CSV number, checking that it fits its record field."""
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number, not {value!r}")
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            raise ValueError(f"{field} must be a number, not {value!r}") from None
+    elif not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number, not {value!r}")
+    if not math.isfinite(value):
+        raise ValueError(f"{field} must be finite")
+    if integer:
+        if value != int(value):
+            raise ValueError(f"{field} must be a whole number, not {value!r}")
+        value = int(value)
+    if not low <= value <= high:
+        raise ValueError(f"{field} must be between {low} and {high}, not {value!r}")
+    return value
+
+
+def _parse_card(entry: dict, where: str) -> tuple:
+    """Validate one card definition and convert it to a record tuple."""
+    try:
+        name = str(entry['name'])
+        card_type = CardRegistry.CARD_TYPES.index(CardType(entry['card_type']))
+        rarity = CardRegistry.RARITIES.index(Rarity(entry['rarity']))
+        target_type = CardRegistry.TARGET_TYPES.index(TargetType(entry['target_type']))
+        elixir_cost = _parse_number(entry['elixir_cost'], 'elixir_cost', True, 0, _MAX_ELIXIR_COST)
+        damage = _parse_number(entry.get('damage') or 0, 'damage', True, 0, _MAX_DAMAGE)
+        hit_speed = _parse_number(entry.get('hit_speed') or 0.0, 'hit_speed', False, 0, math.inf)
+        range_ = _parse_number(entry.get('range') or 0.0, 'range', False, 0, math.inf)
+        area_damage = _parse_bool(entry.get('area_damage', False))
+        splash_radius = _parse_number(entry.get('splash_radius') or 0.0, 'splash_radius',
+                                      False, 0, math.inf)
+    except KeyError as e:
+        raise ValueError(f"{where}: missing field {e.args[0]!r}") from None
+    except ValueError as e:
+        raise ValueError(f"{where}: {e}") from None
+    if not name:
+        raise ValueError(f"{where}: empty card name")
+    if len(name.encode('utf-8')) > _MAX_NAME_BYTES:
+        raise ValueError(f"{where}: name longer than {_MAX_NAME_BYTES} bytes")
+    return (name, card_type, rarity, target_type, elixir_cost, damage,
+            hit_speed, range_, area_damage, splash_radius)
+
+
+def read_definitions(path: str) -> List[tuple]:
+    """
+    Parse a JSON or CSV card file.
+
+    Args:
+        path: File ending in .json or .csv
+
+    Returns:
+        One record tuple per card, in file order
+
+    Raises:
+        ValueError: If the file is malformed or repeats a card name
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('cards')
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: expected a list of cards")
+        entries = data
+    elif extension == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            entries = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Unsupported card file type: {path}")
+
+    records = []
+    seen = set()
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path} card {number}: expected an object")
+        record = _parse_card(entry, f"{path} card {number}")
+        if record[0] in seen:
+            raise ValueError(f"{path} card {number}: duplicate name {record[0]!r}")
+        seen.add(record[0])
+        records.append(record)
+    return records
+
+
+def pack_cache(records: Sequence[tuple], source_size: int = 0, source_mtime: int = 0) -> bytes:
+    """
+    Pack card records into the binary cache format.
+
+    Args:
+        records: Record tuples from read_definitions
+        source_size: Size of the source file, checked on load
+        source_mtime: Modification time (ns) of the source file
+
+    Returns:
+        Cache contents: header, records, name order and names
+    """
+    names = bytearray()
+    body = bytearray()
+    encoded_names = []
+    for name, *stats in records:
+        encoded = name.encode('utf-8')
+        body += _RECORD.pack(len(names), len(encoded), *stats)
+        names += encoded
+        encoded_names.append(encoded)
+    for index in sorted(range(len(records)), key=encoded_names.__getitem__):
+        body += _ORDER.pack(index)
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, source_size, source_mtime,
+                          len(records), len(names))
+    return header + bytes(body) + bytes(names)
+
+
+def compile_cache(records: Sequence[tuple], cache_path: str, source_size: int = 0,
+                  source_mtime: int = 0):
+    """
+    Write card records to a binary cache file.
+
+    The file is written under a temporary name and renamed into place, so
+    readers never see a partial cache.
+
+    Args:
+        records: Record tuples from read_definitions
+        cache_path: File to write
+        source_size: Size of the source file, checked on load
+        source_mtime: Modification time (ns) of the source file
+
+    Raises:
+        OSError: If the cache file cannot be written
+    """
+    _write_cache(pack_cache(records, source_size, source_mtime), cache_path)
+
+
+def _write_cache(data: bytes, cache_path: str):
+    """Write packed cache contents atomically."""
+    temporary = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, cache_path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class CardDatabase:
+    """
+    Cards of one JSON/CSV file, served from a memory-mapped binary cache.
+    """
+
+    def __init__(self, path: str, cache_path: Optional[str] = None, rebuild: bool = False):
+        """
+        Open a card database, compiling its cache if needed.
+
+        If the cache cannot be written (a read-only data directory, say),
+        the compiled records are kept in memory instead and ``cached`` is
+        False; pass a writable cache_path to keep the fast startup.
+
+        Args:
+            path: JSON or CSV card file
+            cache_path: Binary cache file (path + '.crdb' if None)
+            rebuild: Recompile the cache even if it is current
+
+        Raises:
+            ValueError: If the card file is malformed
+        """
+        self.path = path
+        self.cache_path = cache_path or path + '.crdb'
+        self.compiled = False
+        self.cached = True
+        source = os.stat(path)
+        self._source = (source.st_size, source.st_mtime_ns)
+        self._file = None
+        self._map = None
+        if rebuild or not self._open():
+            data = pack_cache(read_definitions(path), *self._source)
+            self.compiled = True
+            try:
+                _write_cache(data, self.cache_path)
+            except OSError:
+                self.cached = False
+            if not self._open(None if self.cached else data):
+                raise ValueError(f"Could not read the compiled cache {self.cache_path}")
+        self._cards: Dict[int, Card] = {}
+
+    def _open(self, data: Optional[bytes] = None) -> bool:
+        """
+        Map the cache file (or use packed contents kept in memory).
+
+        Returns:
+            False if the cache is missing, stale or foreign
+        """
+        self.close()
+        f = None
+        if data is None:
+            try:
+                f = open(self.cache_path, 'rb')
+            except OSError:
+                return False
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                f.close()
+                return False
+        valid = False
+        if len(data) >= _HEADER.size:
+            magic, version, size, mtime, count, name_bytes = _HEADER.unpack_from(data, 0)
+            valid = (magic == _MAGIC and version == FORMAT_VERSION and
+                     (size, mtime) == self._source and
+                     len(data) == _HEADER.size + count * (_RECORD.size + _ORDER.size) + name_bytes)
+        if not valid:
+            if f is not None:
+                data.close()
+                f.close()
+            return False
+        self._file = f
+        self._map = data
+        self._count = count
+        self._order_start = _HEADER.size + count * _RECORD.size
+        self._names_start = self._order_start + count * _ORDER.size
+        return True
+
+    def close(self):
+        """Unmap the cache (cards already created stay valid)."""
+        if self._file is not None:
+            self._map.close()
+            self._file.close()
+        self._map = None
+        self._file = None
+
+    def _record(self, index: int) -> tuple:
+        """Unpack one record; the name comes first, as in read_definitions."""
+        offset, length, *stats = _RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size)
+        start = self._names_start + offset
+        return (self._map[start:start + length].decode('utf-8'), *stats)
+
+    def _name_bytes(self, index: int) -> bytes:
+        """Encoded name of one record."""
+        offset, length = _RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size)[:2]
+        start = self._names_start + offset
+        return self._map[start:start + length]
+
+    def _find(self, name: str) -> Optional[int]:
+        """Binary search the name order for a record number."""
+        target = name.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            index = _ORDER.unpack_from(self._map, self._order_start + middle * _ORDER.size)[0]
+            if self._name_bytes(index) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            index = _ORDER.unpack_from(self._map, self._order_start + low * _ORDER.size)[0]
+            if self._name_bytes(index) == target:
+                return index
+        return None
+
+    def names(self) -> List[str]:
+        """Names of every card, in file order."""
+        return [self._name_bytes(i).decode('utf-8') for i in range(self._count)]
+
+    def get(self, name: str) -> Optional[Card]:
+        """
+        Get a card by name, creating (and registering) it on first use.
+
+        Args:
+            name: Card name
+
+        Returns:
+            The card, or None if the database has no card of that name
+        """
+        index = self._find(name)
+        if index is None:
+            return None
+        return self._card(index)
+
+    def _card(self, index: int) -> Card:
+        """Create (or reuse) the card of one record."""
+        card = self._cards.get(index)
+        if card is None:
+            (name, card_type, rarity, target_type, elixir_cost, damage,
+             hit_speed, range_, area_damage, splash_radius) = self._record(index)
+            card = Card(name, CardRegistry.CARD_TYPES[card_type], elixir_cost,
+                        CardRegistry.RARITIES[rarity], CardRegistry.TARGET_TYPES[target_type],
+                        damage=damage, hit_speed=hit_speed, range_=range_,
+                        area_damage=bool(area_damage), splash_radius=splash_radius)
+            self._cards[index] = card
+        return card
+
+    def cards(self) -> List[Card]:
+        """Every card, in file order (creating any not created yet)."""
+        return [self._card(i) for i in range(self._count)]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) is not None
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards())
+
+    def __reduce__(self):
+        # Workers reopen (and map) the cache instead of receiving every card
+        return (CardDatabase, (self.path, self.cache_path))
+
+    def __repr__(self) -> str:
+        return f"CardDatabase({self.path!r}, {self._count} cards)"
+
+
+def dump_cards(cards: Sequence[Card], path: str):
+    """
+    Write cards to a JSON or CSV card file.
+
+    Args:
+        cards: Cards to write (e.g. CARD_POOL)
+        path: File ending in .json or .csv
+    """
+    rows = [
+        {
+            'name': card.name, 'card_type': card.card_type.value,
+            'elixir_cost': card.elixir_cost, 'rarity': card.rarity.value,
+            'target_type': card.target_type.value, 'damage': card.damage,
+            'hit_speed': card.hit_speed, 'range': card.range,
+            'area_damage': card.area_damage, 'splash_radius': card.splash_radius,
+        }
+        for card in cards
+    ]
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    elif extension == '.csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        raise ValueError(f"Unsupported card file type: {path}")
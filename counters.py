@@ -0,0 +1,191 @@
+"""
+Precomputed card-vs-card counter bonuses.
+
+``ClashRoyaleEngine._evaluate_counters`` only depends on the pair (card,
+opponent card), so the bonus for every pair of registered cards is computed
+once and stored in a ``CounterMatrix`` indexed by card ID. The matrix starts
+out covering every card registered at construction (the whole ``CARD_POOL``)
+and grows by one row and one column for each card registered later.
+"""
+
+from array import array
+from typing import List, Sequence
+
+from card import CARD_REGISTRY, Card, CardRegistry, CardType, TargetType
+from batch import np, require_numpy
+from weights import DEFAULT_WEIGHTS, EvalWeights
+
+_BUILDING = CardRegistry.CARD_TYPES.index(CardType.BUILDING)
+_TARGETS_BUILDINGS = CardRegistry.TARGET_TYPES.index(TargetType.BUILDINGS)
+_AIR = CardRegistry.TARGET_TYPES.index(TargetType.AIR)
+_BOTH = CardRegistry.TARGET_TYPES.index(TargetType.BOTH)
+
+
+class CounterMatrix:
+    """
+    Counter bonus of every registered card against every other.
+
+    ``rows[a][b]`` is the bonus card ``a`` earns against a known opponent
+    card ``b``. A move's counter term is the sum of its row over the
+    opponent's cards, added in the order the opponent cards are given.
+    """
+
+    def __init__(self, weights: EvalWeights = DEFAULT_WEIGHTS, registry: CardRegistry = CARD_REGISTRY):
+        """
+        Build the matrix for the cards registered so far.
+
+        Args:
+            weights: Evaluation weights supplying the counter bonuses
+            registry: Registry whose card IDs index the matrix
+        """
+        self.weights = weights
+        self.registry = registry
+        self.rows: List[array] = []
+        self._array = None
+        self.sync()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def sync(self):
+        """Add rows and columns for cards registered since the last call."""
+        size = len(self.rows)
+        total = len(self.registry)
+        if size == total:
+            return
+        pair = self._pair
+        for card_id, row in enumerate(self.rows):
+            row.extend(pair(card_id, opp_id) for opp_id in range(size, total))
+        for card_id in range(size, total):
+            self.rows.append(array('d', (pair(card_id, opp_id) for opp_id in range(total))))
+        self._array = None
+
+    def row(self, card_id: int) -> array:
+        """
+        Get the bonuses of one card against every registered card.
+
+        Args:
+            card_id: Registry ID of the card being played
+
+        Returns:
+            Row indexed by opponent card ID
+        """
+        if len(self.rows) != len(self.registry):
+            self.sync()
+        return self.rows[card_id]
+
+    def score(self, card: Card, opponent_cards: Sequence[Card]) -> float:
+        """
+        Counter score of a card against known opponent cards.
+
+        Args:
+            card: Card being played
+            opponent_cards: Known opponent cards
+
+        Returns:
+            Sum of the pair bonuses, in opponent order
+        """
+        row = self.row(card.card_id)
+        score = 0.0
+        for opp_card in opponent_cards:
+            score += row[opp_card.card_id]
+        return score
+
+    def expected_score(self, card: Card, distribution) -> float:
+        """
+        Expected counter score of a card against a card distribution.
+
+        Args:
+            card: Card being played
+            distribution: Iterable of (card ID, expected count) pairs, e.g.
+                an opponent.CardDistribution
+
+        Returns:
+            Sum of pair bonuses weighted by expected count, in entry order
+        """
+        row = self.row(card.card_id)
+        score = 0.0
+        for opp_id, expected in distribution:
+            score += expected * row[opp_id]
+        return score
+
+    def as_array(self):
+        """Get the matrix as a square NumPy array (requires NumPy)."""
+        require_numpy()
+        if len(self.rows) != len(self.registry):
+            self.sync()
+        if self._array is None:
+            self._array = np.array(self.rows, dtype=np.float64).reshape(len(self.rows), len(self.rows))
+        return self._array
+
+    def scores(self, opponent_cards: Sequence[Card], card_ids=None):
+        """
+        Counter scores of many cards at once (requires NumPy).
+
+        Sums matrix columns in opponent order, so every entry equals
+        ``score`` for the same card exactly.
+
+        Args:
+            opponent_cards: Known opponent cards
+            card_ids: Card IDs to score (every registered card if None)
+
+        Returns:
+            Array of counter scores, aligned with card_ids
+        """
+        matrix = self.as_array()
+        if card_ids is not None:
+            matrix = matrix[np.asarray(card_ids, dtype=np.intp)]
+        total = np.zeros(matrix.shape[0])
+        for opp_card in opponent_cards:
+            total = total + matrix[:, opp_card.card_id]
+        return total
+
+    def expected_scores(self, distribution, card_ids=None):
+        """
+        Expected counter scores of many cards at once (requires NumPy).
+
+        Every entry equals ``expected_score`` for the same card exactly.
+
+        Args:
+            distribution: Iterable of (card ID, expected count) pairs
+            card_ids: Card IDs to score (every registered card if None)
+
+        Returns:
+            Array of expected counter scores, aligned with card_ids
+        """
+        matrix = self.as_array()
+        if card_ids is not None:
+            matrix = matrix[np.asarray(card_ids, dtype=np.intp)]
+        total = np.zeros(matrix.shape[0])
+        for opp_id, expected in distribution:
+            total = total + expected * matrix[:, opp_id]
+        return total
+
+    def _pair(self, card_id: int, opp_id: int) -> float:
+        """Bonus of one card against one opponent card."""
+        registry = self.registry
+        weights = self.weights
+        score = 0.0
+
+        # Area damage counters swarms
+        if registry.area_damage[card_id] and registry.elixir_cost[opp_id] <= 3:
+            score += weights.counter_swarm
+
+        # Buildings counter building-targeting troops
+        if (registry.card_type[card_id] == _BUILDING and
+                registry.target_type[opp_id] == _TARGETS_BUILDINGS):
+            score += weights.counter_building
+
+        # High damage counters tanks
+        if registry.damage[card_id] > 300 and registry.elixir_cost[opp_id] >= 5:
+            score += weights.counter_tank
+
+        # Air targeting counters air troops
+        if (registry.target_type[card_id] in (_AIR, _BOTH) and
+                registry.target_type[opp_id] == _AIR):
+            score += weights.counter_air
+
+        return score
+
+    def __repr__(self) -> str:
+        return f"CounterMatrix({len(self.rows)}x{len(self.rows)})"
@@ -0,0 +1,317 @@
+"""
+Deck building: the best 8-card deck from a card pool.
+
+A deck's score has three parts, each scaled by a weight:
+
+- value: mean over the deck of each card's average ``evaluate_move`` score
+  across the deployment positions
+- coverage: for every threat card (the pool by default), the best counter
+  bonus any deck card earns against it (a ``CounterMatrix`` entry),
+  averaged over the threats
+- elixir: minus the distance between ``Player.get_average_elixir`` of the
+  deck and a target average
+
+``DeckOptimizer`` finds the highest-scoring deck by branch and bound over
+card subsets instead of enumerating all C(n, 8) of them. Cards are sorted by
+their standalone merit (value plus coverage on an empty deck). Each partial
+deck is bounded by the best merits left, the per-threat coverage still
+reachable, and the closest average elixir the cheapest and dearest
+remaining cards allow. A greedy deck supplies the first incumbent. Partial
+decks that reach the same search position with the same elixir total and
+coverage as an earlier one, but no more value, are pruned from a memo.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from card import Card, CARD_POOL
+from board import Side
+from player import Player
+
+_DECK_SIZE = 8
+
+
+class DeckResult:
+    """Best deck found by a DeckOptimizer."""
+
+    def __init__(
+        self,
+        deck: List[Card],
+        score: float,
+        value: float,
+        coverage: float,
+        average_elixir: float,
+        nodes: int,
+        optimal: bool,
+        elapsed: float
+    ):
+        """
+        Initialize a result.
+
+        Args:
+            deck: The 8 cards, in pool order
+            score: Weighted deck score
+            value: Mean per-card evaluation value (unweighted)
+            coverage: Mean best counter bonus per threat (unweighted)
+            average_elixir: Average elixir cost of the deck
+            nodes: Partial decks visited by the search
+            optimal: False if the node limit stopped the search early
+            elapsed: Wall-clock seconds spent
+        """
+        self.deck = deck
+        self.score = score
+        self.value = value
+        self.coverage = coverage
+        self.average_elixir = average_elixir
+        self.nodes = nodes
+        self.optimal = optimal
+        self.elapsed = elapsed
+
+    def player(self, name: str = "Player") -> Player:
+        """Get a Player holding the deck."""
+        return Player(list(self.deck), name)
+
+    def __repr__(self) -> str:
+        cards = ", ".join(card.name for card in self.deck)
+        return (f"DeckResult([{cards}], score={self.score:.2f}, "
+                f"elixir={self.average_elixir:.2f}, nodes={self.nodes})")
+
+
+class DeckOptimizer:
+    """
+    Branch-and-bound search for the best deck from a card pool.
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        card_pool: Optional[Sequence[Card]] = None,
+        threats: Optional[Sequence[Card]] = None,
+        side: Side = Side.FRIENDLY,
+        value_weight: float = 1.0,
+        coverage_weight: float = 1.0,
+        elixir_weight: float = 2.0,
+        target_elixir: float = 3.5
+    ):
+        """
+        Initialize the optimizer.
+
+        Args:
+            engine: ClashRoyaleEngine scoring moves and supplying the counter
+                matrix (a new one if None)
+            card_pool: Cards to choose from (CARD_POOL if None); duplicates
+                are ignored
+            threats: Opponent cards the deck should counter (the pool if
+                None)
+            side: Side the deck is played from
+            value_weight: Weight of the mean card value
+            coverage_weight: Weight of the mean threat coverage
+            elixir_weight: Penalty per elixir of distance from target_elixir
+            target_elixir: Preferred average elixir cost
+        """
+        if engine is None:
+            from engine import ClashRoyaleEngine
+            engine = ClashRoyaleEngine()
+        pool = list({card.card_id: card for card in (card_pool or CARD_POOL)}.values())
+        if len(pool) < _DECK_SIZE:
+            raise ValueError("Card pool must contain at least 8 distinct cards")
+        self.engine = engine
+        self.pool = pool
+        self.threats = list(threats) if threats is not None else pool
+        self.side = side
+        self.value_weight = value_weight
+        self.coverage_weight = coverage_weight
+        self.elixir_weight = elixir_weight
+        self.target_elixir = target_elixir
+        self._values: Dict[int, float] = {}
+
+    def card_value(self, card: Card) -> float:
+        """
+        Average evaluate_move score of a card over the deployment positions.
+
+        Args:
+            card: Card to evaluate
+
+        Returns:
+            Mean score (memoized per card)
+        """
+        value = self._values.get(card.card_id)
+        if value is None:
+            engine = self.engine
+            positions = engine.board.get_valid_deployment_positions(self.side)
+            scores = engine._score_card_positions(card, positions, self.side, None)
+            value = sum(scores) / len(scores) if scores else 0.0
+            self._values[card.card_id] = value
+        return value
+
+    def score(self, deck: Sequence[Card]) -> Tuple[float, float, float, float]:
+        """
+        Score a deck.
+
+        Args:
+            deck: 8 cards
+
+        Returns:
+            (score, value, coverage, average elixir)
+        """
+        matrix = self.engine.counter_matrix
+        value = sum(self.card_value(card) for card in deck) / len(deck)
+        rows = [matrix.row(card.card_id) for card in deck]
+        coverage = sum(
+            max(row[threat.card_id] for row in rows) for threat in self.threats
+        ) / len(self.threats)
+        average = Player(list(deck)).get_average_elixir()
+        score = (self.value_weight * value + self.coverage_weight * coverage -
+                 self.elixir_weight * abs(average - self.target_elixir))
+        return score, value, coverage, average
+
+    def optimize(self, node_limit: Optional[int] = None) -> DeckResult:
+        """
+        Find the highest-scoring deck.
+
+        Args:
+            node_limit: Maximum partial decks to visit (None for no limit);
+                when reached, the best deck so far is returned
+
+        Returns:
+            Best deck found
+        """
+        start = time.perf_counter()
+        matrix = self.engine.counter_matrix
+        threat_ids = [threat.card_id for threat in self.threats]
+        cover_scale = self.coverage_weight / len(threat_ids)
+        value_scale = self.value_weight / _DECK_SIZE
+
+        # Per card: weighted value, cost and coverage of every threat
+        cards = []
+        for index, card in enumerate(self.pool):
+            row = matrix.row(card.card_id)
+            cover = [row[threat] * cover_scale for threat in threat_ids]
+            value = self.card_value(card) * value_scale
+            cards.append((value + sum(cover), index, card, value, cover))
+        cards.sort(key=lambda entry: (-entry[0], entry[1]))
+        count = len(cards)
+        merit = [entry[0] for entry in cards]
+        values = [entry[3] for entry in cards]
+        costs = [entry[2].elixir_cost for entry in cards]
+        covers = [entry[4] for entry in cards]
+
+        # Suffix tables: merit prefix sums, the k best values and the k
+        # cheapest / dearest costs among cards i.., and per-threat best cover
+        merit_sum = [0.0]
+        for m in merit:
+            merit_sum.append(merit_sum[-1] + m)
+        best_values = [[0.0] * (_DECK_SIZE + 1) for _ in range(count + 1)]
+        low_costs = [[0] * (_DECK_SIZE + 1) for _ in range(count + 1)]
+        high_costs = [[0] * (_DECK_SIZE + 1) for _ in range(count + 1)]
+        top_values: List[float] = []
+        suffix_costs: List[int] = []
+        max_cover = [[0.0] * len(threat_ids) for _ in range(count + 1)]
+        for i in range(count - 1, -1, -1):
+            top_values = sorted(top_values + [values[i]], reverse=True)[:_DECK_SIZE]
+            suffix_costs = sorted(suffix_costs + [costs[i]])
+            cheap = suffix_costs[:_DECK_SIZE]
+            dear = suffix_costs[::-1][:_DECK_SIZE]
+            for k in range(1, _DECK_SIZE + 1):
+                best_values[i][k] = best_values[i][k - 1] + (top_values[k - 1] if k <= len(top_values) else 0.0)
+                low_costs[i][k] = low_costs[i][k - 1] + (cheap[k - 1] if k <= len(cheap) else 0)
+                high_costs[i][k] = high_costs[i][k - 1] + (dear[k - 1] if k <= len(dear) else 0)
+            max_cover[i] = [a if a > b else b for a, b in zip(covers[i], max_cover[i + 1])]
+
+        target_total = self.target_elixir * _DECK_SIZE
+        penalty_scale = self.elixir_weight / _DECK_SIZE
+        # Bounds are sums in a different order than the scores; never prune
+        # on a difference smaller than rounding
+        slack = 1e-9
+
+        def penalty(low: float, high: float) -> float:
+            if target_total < low:
+                return (low - target_total) * penalty_scale
+            if target_total > high:
+                return (target_total - high) * penalty_scale
+            return 0.0
+
+        best_score, best_deck = self._greedy(cards, penalty)
+        memo: Dict[tuple, float] = {}
+        nodes = 0
+        limited = False
+        chosen: List[int] = []
+
+        def search(first: int, value: float, cover: List[float], cover_sum: float, cost: int):
+            nonlocal best_score, best_deck, nodes, limited
+            need = _DECK_SIZE - len(chosen)
+            for i in range(first, count - need + 1):
+                # Merits are sorted, so no later card can do better either
+                if value + cover_sum + merit_sum[i + need] - merit_sum[i] + slack <= best_score:
+                    break
+                if node_limit is not None and nodes >= node_limit:
+                    limited = True
+                    return
+                nodes += 1
+                next_value = value + values[i]
+                next_cost = cost + costs[i]
+                next_cover = [a if a > b else b for a, b in zip(cover, covers[i])]
+                next_sum = sum(next_cover)
+                if need == 1:
+                    score = next_value + next_sum - penalty(next_cost, next_cost)
+                    if score > best_score:
+                        best_score = score
+                        best_deck = chosen + [i]
+                    continue
+                rest = need - 1
+                reach = sum(a if a > b else b for a, b in zip(next_cover, max_cover[i + 1]))
+                # The remaining cards add no more than their merits, and no
+                # more than the best values left plus the coverage the
+                # remaining cards can still reach
+                bound = next_value + min(
+                    next_sum + merit_sum[i + 1 + rest] - merit_sum[i + 1],
+                    best_values[i + 1][rest] + reach
+                ) - penalty(next_cost + low_costs[i + 1][rest], next_cost + high_costs[i + 1][rest])
+                if bound + slack <= best_score:
+                    continue
+                key = (i, rest, next_cost, tuple(next_cover))
+                seen = memo.get(key)
+                if seen is not None and seen >= next_value:
+                    continue
+                memo[key] = next_value
+                chosen.append(i)
+                search(i + 1, next_value, next_cover, next_sum, next_cost)
+                chosen.pop()
+                if limited:
+                    return
+
+        search(0, 0.0, [0.0] * len(threat_ids), 0.0, 0)
+
+        deck = sorted((cards[i][2] for i in best_deck), key=self.pool.index)
+        score, value, coverage, average = self.score(deck)
+        return DeckResult(deck, score, value, coverage, average, nodes,
+                          not limited, time.perf_counter() - start)
+
+    def _greedy(self, cards, penalty) -> Tuple[float, List[int]]:
+        """Build a deck one best-gain card at a time (the first incumbent)."""
+        chosen: List[int] = []
+        cover = [0.0] * len(cards[0][4])
+        value = 0.0
+        cost = 0
+        for _ in range(_DECK_SIZE):
+            best = None
+            for i, (_, _, card, card_value, card_cover) in enumerate(cards):
+                if i in chosen:
+                    continue
+                gain = card_value + sum(a if a > b else b for a, b in zip(cover, card_cover))
+                # Judge elixir by the average the deck would have so far
+                total = cost + card.elixir_cost
+                size = len(chosen) + 1
+                gain -= penalty(total * _DECK_SIZE / size, total * _DECK_SIZE / size)
+                if best is None or gain > best[0]:
+                    best = (gain, i)
+            i = best[1]
+            chosen.append(i)
+            value += cards[i][3]
+            cost += cards[i][2].elixir_cost
+            cover = [a if a > b else b for a, b in zip(cover, cards[i][4])]
+        score = value + sum(cover) - penalty(cost, cost)
+        return score, sorted(chosen)
+
+    def __repr__(self) -> str:
+        return f"DeckOptimizer({len(self.pool)} cards, {len(self.threats)} threats)"
@@ -2,11 +2,25 @@
 Clash Royale Engine - Main engine for evaluating moves and suggesting best plays.
 """
 
-from typing import List, Optional, Dict, Tuple
-from card import Card, CardType, TargetType
+import heapq
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter, itemgetter
+from typing import Iterator, List, Optional, Dict, Sequence, Tuple
+from card import Card, CardType, TargetType, CARD_REGISTRY
 from board import Board, Position, Side
 from move import Move
 from player import Player
+from batch import BatchEvaluator, BatchResult, find_best_moves_chunk, _run_chunk
+from cache import ResultCache
+from counters import CounterMatrix
+from opponent import CardDistribution
+from tables import ScoreTables
+from weights import DEFAULT_WEIGHTS, EvalWeights
+from search import Searcher, SearchResult
+from zobrist import TranspositionTable
+from instrumentation import EngineInstrumentation
+from mcts import MCTSResult, parallel_mcts
 
 
 class ClashRoyaleEngine:
@@ -17,14 +31,92 @@ class ClashRoyaleEngine:
     placements based on various strategic factors.
     """
     
-    def __init__(self, board: Optional[Board] = None):
+    # Coarse grid spacing (tiles) and refined cells per card for 'refine' placement
+    COARSE_STRIDE = 4
+    REFINE_CELLS = 2
+    
+    def __init__(
+        self,
+        board: Optional[Board] = None,
+        vectorized: bool = False,
+        use_tables: bool = False,
+        tt_bytes: int = 16 * 1024 * 1024,
+        cache_size: int = 0,
+        weights: Optional[EvalWeights] = None
+    ):
         """
         Initialize the engine.
         
         Args:
             board: Game board (creates new if None)
+            vectorized: Score moves with the NumPy batch evaluator instead
+                of calling evaluate_move once per move (requires NumPy)
+            use_tables: Serve the static evaluation terms from precomputed
+                per-tower-state tables (takes precedence over vectorized)
+            tt_bytes: Memory cap of the search transposition table, which is
+                kept across searches (0 disables it)
+            cache_size: Number of find_best_move results to memoize in an
+                LRU cache (0 disables it)
+            weights: Evaluation weights (defaults if None)
         """
         self.board = board or Board()
+        self.weights = weights if weights is not None else DEFAULT_WEIGHTS
+        self.counter_matrix = CounterMatrix(self.weights)
+        self.vectorized = vectorized
+        self.use_tables = use_tables
+        self.batch_evaluator = (
+            BatchEvaluator(self.board, self.weights, self.counter_matrix) if vectorized else None
+        )
+        self.score_tables = ScoreTables(self) if use_tables else None
+        self.tt_bytes = tt_bytes
+        self.cache_size = cache_size
+        self.result_cache = ResultCache(cache_size) if cache_size > 0 else None
+        # Moves skipped by bound pruning in the last table-based find_best_move
+        self.last_pruned = 0
+        # Positions scored (summed over cards) by the last tile-based search
+        self.last_positions_evaluated = 0
+        self._transposition_table: Optional[TranspositionTable] = None
+        # Per-stage counters while instrumentation is enabled
+        self.instrumentation: Optional[EngineInstrumentation] = None
+    
+    @property
+    def transposition_table(self) -> Optional[TranspositionTable]:
+        """Search transposition table, allocated on first use (None if disabled)."""
+        if self._transposition_table is None and self.tt_bytes > 0:
+            self._transposition_table = TranspositionTable(self.tt_bytes)
+        return self._transposition_table
+    
+    def enable_instrumentation(self, stages: Optional[Sequence[str]] = None) -> EngineInstrumentation:
+        """
+        Start counting calls, time, moves generated and moves pruned per stage.
+        
+        The stage methods are shadowed by timing wrappers on this engine
+        only; disable_instrumentation removes them, so an engine that is not
+        instrumented pays nothing.
+        
+        Args:
+            stages: Method names to time (EngineInstrumentation.STAGES if None)
+            
+        Returns:
+            The live counters (see as_dict and prometheus)
+        """
+        self.disable_instrumentation()
+        self.instrumentation = EngineInstrumentation(self, stages)
+        self.instrumentation.attach()
+        return self.instrumentation
+    
+    def disable_instrumentation(self) -> Optional[EngineInstrumentation]:
+        """
+        Stop instrumenting and restore the engine's own methods.
+        
+        Returns:
+            The final counters (None if instrumentation was not enabled)
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.detach()
+            self.instrumentation = None
+        return instrumentation
     
     def generate_moves(self, player: Player, side: Side) -> List[Move]:
         """
@@ -37,17 +129,29 @@ class ClashRoyaleEngine:
         Returns:
             List of possible moves
         """
-        moves = []
         playable_cards = player.get_playable_cards()
-        positions = self.board.get_deployment_positions(side)
+        positions = self.board.get_valid_deployment_positions(side)
         
-        for card in playable_cards:
-            for position in positions:
-                if self.board.is_valid_position(position):
-                    move = Move(card, position)
-                    moves.append(move)
+        return [Move(card, position) for card in playable_cards for position in positions]
+    
+    def iter_moves(self, player: Player, side: Side) -> Iterator[Move]:
+        """
+        Lazily generate all possible moves for a player.
         
-        return moves
+        Yields the same moves, in the same order, as generate_moves without
+        building the whole list.
+        
+        Args:
+            player: Player to generate moves for
+            side: Which side the player is on
+            
+        Yields:
+            Possible moves
+        """
+        positions = self.board.get_valid_deployment_positions(side)
+        for card in player.get_playable_cards():
+            for position in positions:
+                yield Move(card, position)
     
     def evaluate_move(
         self, 
@@ -67,7 +171,8 @@ class ClashRoyaleEngine:
         Args:
             move: Move to evaluate
             player_side: Which side the player is on
-            opponent_cards: Known opponent cards (if any)
+            opponent_cards: Known opponent cards (if any), or a
+                CardDistribution of expected opponent cards
             
         Returns:
             Score for the move (higher is better)
@@ -75,10 +180,11 @@ class ClashRoyaleEngine:
         score = 0.0
         card = move.card
         position = move.position
+        weights = self.weights
         
         # Base score inversely proportional to elixir cost
         # (cheaper cards are slightly favored for tempo)
-        score += (10 - card.elixir_cost) * 0.5
+        score += (weights.elixir_base - card.elixir_cost) * weights.elixir_scale
         
         # Evaluate positioning
         score += self._evaluate_positioning(card, position, player_side)
@@ -95,6 +201,68 @@ class ClashRoyaleEngine:
         
         return score
     
+    def evaluate_move_breakdown(
+        self,
+        move: Move,
+        player_side: Side,
+        opponent_cards: Optional[List[Card]] = None
+    ) -> Tuple[float, Tuple[float, ...]]:
+        """
+        Evaluate a move and keep each component of its score.
+        
+        Args:
+            move: Move to evaluate
+            player_side: Which side the player is on
+            opponent_cards: Known opponent cards (if any), or a
+                CardDistribution of expected opponent cards
+            
+        Returns:
+            (score, breakdown): the score equals evaluate_move exactly and
+            the breakdown holds the Move.COMPONENTS terms (counters is 0.0
+            without opponent cards)
+        """
+        card = move.card
+        position = move.position
+        weights = self.weights
+        elixir = (weights.elixir_base - card.elixir_cost) * weights.elixir_scale
+        positioning = self._evaluate_positioning(card, position, player_side)
+        card_type = self._evaluate_card_type(card, position, player_side)
+        counters = self._evaluate_counters(card, opponent_cards) if opponent_cards else 0.0
+        strategy = self._evaluate_strategy(card, position, player_side)
+        
+        # Same additions, in the same order, as evaluate_move
+        score = 0.0
+        score += elixir
+        score += positioning
+        score += card_type
+        if opponent_cards:
+            score += counters
+        score += strategy
+        return score, (elixir, positioning, card_type, counters, strategy)
+    
+    def evaluate_moves_breakdown(
+        self,
+        moves: Sequence[Move],
+        player_side: Side,
+        opponent_cards: Optional[List[Card]] = None
+    ):
+        """
+        Score components of many moves at once (requires NumPy).
+        
+        Args:
+            moves: Moves to evaluate
+            player_side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+            
+        Returns:
+            Array of shape (len(moves), len(Move.COMPONENTS));
+            BatchEvaluator.sum_components turns it into move scores
+        """
+        evaluator = self.batch_evaluator
+        if evaluator is None:
+            evaluator = BatchEvaluator(self.board, self.weights, self.counter_matrix)
+        return evaluator.score_components(moves, player_side, opponent_cards)
+    
     def _evaluate_positioning(
         self, 
         card: Card, 
@@ -113,32 +281,32 @@ class ClashRoyaleEngine:
             Positioning score
         """
         score = 0.0
+        weights = self.weights
         
-        # Get nearest enemy tower
+        # Get distance to the nearest enemy tower
         enemy_side = Side.ENEMY if player_side == Side.FRIENDLY else Side.FRIENDLY
-        nearest_tower = self.board.get_nearest_tower(position, enemy_side)
+        distance = self.board.get_nearest_tower_distance(position, enemy_side)
         
-        if nearest_tower:
-            distance = position.distance_to(nearest_tower)
+        if distance is not None:
             
             # Troops targeting buildings should be closer to towers
             if card.card_type == CardType.TROOP and card.target_type == TargetType.BUILDINGS:
-                score += max(0, 20 - distance * 0.5)  # Closer is better
+                score += max(0, weights.rush_base - distance * weights.rush_falloff)  # Closer is better
             
             # Defensive cards should be positioned further back
             elif card.card_type == CardType.BUILDING:
-                score += distance * 0.3  # Further is better for buildings
+                score += distance * weights.building_distance  # Further is better for buildings
             
             # Spells are position-dependent on targets (simplified)
             elif card.card_type == CardType.SPELL:
-                score += 5.0  # Base spell value
+                score += weights.spell_base  # Base spell value
         
         # Bridge positions are valuable for offensive troops
         is_bridge = (player_side == Side.FRIENDLY and position.y >= 14) or \
                     (player_side == Side.ENEMY and position.y <= 18)
         
         if is_bridge and card.card_type == CardType.TROOP:
-            score += 3.0
+            score += weights.bridge_troop
         
         return score
     
@@ -160,22 +328,23 @@ class ClashRoyaleEngine:
             Card type score
         """
         score = 0.0
+        weights = self.weights
         
         # High damage cards get bonus
         if card.damage > 200:
-            score += 3.0
+            score += weights.high_damage
         
         # Area damage is valuable
         if card.area_damage:
-            score += 2.5
+            score += weights.area_damage
         
         # Long range cards get positioning flexibility bonus
         if card.range > 5.0:
-            score += 2.0
+            score += weights.long_range
         
         # Buildings provide defensive value
         if card.card_type == CardType.BUILDING:
-            score += 4.0  # Base defensive value
+            score += weights.building_value  # Base defensive value
         
         return score
     
@@ -183,35 +352,20 @@ class ClashRoyaleEngine:
         """
         Evaluate how well a card counters known opponent cards.
         
+        Looks the pair bonuses up in the precomputed counter matrix (see
+        counters.CounterMatrix for the individual terms). Against a
+        CardDistribution the score is the expectation over that distribution.
+        
         Args:
             card: Card being evaluated
-            opponent_cards: Known opponent cards
+            opponent_cards: Known opponent cards, or a CardDistribution
             
         Returns:
             Counter score
         """
-        score = 0.0
-        
-        for opp_card in opponent_cards:
-            # Area damage counters swarms
-            if card.area_damage and opp_card.elixir_cost <= 3:
-                score += 3.0
-            
-            # Buildings counter building-targeting troops
-            if (card.card_type == CardType.BUILDING and 
-                opp_card.target_type == TargetType.BUILDINGS):
-                score += 4.0
-            
-            # High damage counters tanks
-            if card.damage > 300 and opp_card.elixir_cost >= 5:
-                score += 2.5
-            
-            # Air targeting counters air troops
-            if (card.target_type in [TargetType.AIR, TargetType.BOTH] and
-                opp_card.target_type == TargetType.AIR):
-                score += 2.0
-        
-        return score
+        if isinstance(opponent_cards, CardDistribution):
+            return self.counter_matrix.expected_score(card, opponent_cards)
+        return self.counter_matrix.score(card, opponent_cards)
     
     def _evaluate_strategy(
         self, 
@@ -231,22 +385,23 @@ class ClashRoyaleEngine:
             Strategic score
         """
         score = 0.0
+        weights = self.weights
         
         # Lane pressure: playing in different lanes spreads defense
         if position.x < 7:  # Left lane
-            score += 1.0
+            score += weights.side_lane
         elif position.x > 11:  # Right lane
-            score += 1.0
+            score += weights.side_lane
         else:  # Center
-            score += 0.5
+            score += weights.center_lane
         
         # Offensive positioning (closer to enemy side)
         if player_side == Side.FRIENDLY:
             if position.y > 10:
-                score += 2.0  # Aggressive positioning
+                score += weights.aggressive  # Aggressive positioning
         else:
             if position.y < 22:
-                score += 2.0
+                score += weights.aggressive
         
         return score
     
@@ -255,7 +410,10 @@ class ClashRoyaleEngine:
         player: Player, 
         side: Side,
         opponent_cards: Optional[List[Card]] = None,
-        top_n: int = 1
+        top_n: int = 1,
+        placement: str = 'zones',
+        resolution: float = 1.0,
+        breakdown: bool = False
     ) -> List[Move]:
         """
         Find the best move(s) for a player.
@@ -263,31 +421,577 @@ class ClashRoyaleEngine:
         Args:
             player: Player to find moves for
             side: Which side the player is on
-            opponent_cards: Known opponent cards (if any)
+            opponent_cards: Known opponent cards (if any), or a
+                CardDistribution (e.g. OpponentModel.hand_distribution())
+                to score counters by expectation
             top_n: Number of top moves to return
+            placement: Which positions to consider: 'zones' for the fixed
+                deployment zones, 'tiles' for every legal tile on the
+                player's side, or 'refine' for a coarse tile grid refined
+                around its best cells (roughly 6x the cost of 'zones' and
+                a quarter of 'tiles' on the scalar path; no faster than
+                'tiles' when vectorized at whole-tile resolution)
+            resolution: Tile spacing for 'tiles' and 'refine' (0.5 adds
+                half-tiles)
+            breakdown: Also set each move's per-component breakdown
+                (Move.breakdown); bypasses the result cache
             
         Returns:
             List of best moves, sorted by score (highest first)
         """
-        # Generate all possible moves
-        moves = self.generate_moves(player, side)
+        if top_n <= 0:
+            return []
+        if self.result_cache is not None and not breakdown:
+            return self._cached_best_moves(
+                player, side, opponent_cards, top_n, placement, resolution
+            )
+        return self._find_best_moves(
+            player, side, opponent_cards, top_n, placement, resolution, breakdown
+        )
+    
+    def _find_best_moves(
+        self,
+        player: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        top_n: int,
+        placement: str,
+        resolution: float,
+        breakdown: bool = False
+    ) -> List[Move]:
+        """Compute find_best_move without consulting the result cache."""
+        if placement != 'zones' or self.score_tables is not None:
+            if placement != 'zones':
+                moves = self._find_best_tile_moves(
+                    player, side, opponent_cards, top_n, placement, resolution
+                )
+            else:
+                moves = self._best_moves_from_tables(player, side, opponent_cards, top_n)
+            if breakdown:
+                # These paths fuse terms together, so only the selected
+                # moves are broken down
+                for move in moves:
+                    move.score, move.breakdown = self.evaluate_move_breakdown(
+                        move, side, opponent_cards
+                    )
+            return moves
+        
+        if self.vectorized:
+            moves = self.generate_moves(player, side)
+            if not moves:
+                return []
+            evaluator = self.batch_evaluator
+            if breakdown:
+                components = evaluator.score_components(moves, side, opponent_cards)
+                scores = evaluator.sum_components(components)
+                for move, row in zip(moves, components.tolist()):
+                    move.breakdown = tuple(row)
+            else:
+                scores = evaluator.score_moves(moves, side, opponent_cards)
+            for move, score in zip(moves, scores.tolist()):
+                move.score = score
+            # Same order as a stable descending sort, without sorting everything
+            return heapq.nlargest(top_n, moves, key=attrgetter('score'))
+        
+        # Stream moves through a heap that never holds more than top_n entries
+        heap = []
+        for seq, move in enumerate(self.iter_moves(player, side)):
+            if breakdown:
+                move.score, move.breakdown = self.evaluate_move_breakdown(
+                    move, side, opponent_cards
+                )
+            else:
+                move.score = self.evaluate_move(move, side, opponent_cards)
+            # Ties go to the earlier move, like a stable sort
+            entry = (move.score, -seq, move)
+            if len(heap) < top_n:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        
+        heap.sort(key=itemgetter(0, 1), reverse=True)
+        return [move for _, _, move in heap]
+    
+    def _cache_key(
+        self,
+        player: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        top_n: int,
+        placement: str,
+        resolution: float
+    ) -> tuple:
+        """
+        Canonical form of the find_best_move inputs.
+        
+        Elixir only matters through which cards are affordable, so the key
+        holds the multiset of playable hand cards rather than the elixir
+        amount. Opponent cards are a multiset too, since counter bonuses
+        are added up independently of their order. The tower state of both
+        sides is part of the key, so destroying (or restoring) a tower
+        switches to a different set of entries.
+        """
+        elixir = player.elixir
+        playable = tuple(sorted(
+            card.card_id for card in player.hand if card.elixir_cost <= elixir
+        ))
+        if isinstance(opponent_cards, CardDistribution):
+            opponents = ('expected',) + opponent_cards.key()
+        elif opponent_cards:
+            opponents = tuple(sorted(card.card_id for card in opponent_cards))
+        else:
+            opponents = ()
+        board = self.board
+        return (side, playable, opponents,
+                board.tower_state(Side.FRIENDLY), board.tower_state(Side.ENEMY),
+                top_n, placement, resolution)
+    
+    def _cached_best_moves(
+        self,
+        player: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        top_n: int,
+        placement: str,
+        resolution: float
+    ) -> List[Move]:
+        """Serve find_best_move from the result cache, filling it on a miss."""
+        cache = self.result_cache
+        cache.validate(CARD_REGISTRY.version)
+        key = self._cache_key(player, side, opponent_cards, top_n, placement, resolution)
+        cached = cache.get(key)
+        if cached is None:
+            # Which of several equally scored moves make the top_n cut
+            # depends on the hand's slot order, which the key ignores. So
+            # if a tie straddles the cut, store every move scoring at least
+            # the Nth best score; one extra move shows whether it does.
+            ranked = self._find_best_moves(
+                player, side, opponent_cards, top_n + 1, placement, resolution
+            )
+            if len(ranked) > top_n and ranked[top_n - 1].score == ranked[top_n].score:
+                cutoff = ranked[top_n - 1].score
+                ranked = self._find_best_moves(
+                    player, side, opponent_cards, sys.maxsize, placement, resolution
+                )
+                cached = [m for m in ranked if m.score >= cutoff]
+            else:
+                cached = ranked[:top_n]
+            cache.put(key, tuple(Move(m.card, m.position, m.score) for m in cached))
+            return ranked[:top_n]
+        
+        # The entry may come from a hand in a different slot order; put
+        # equal scores back in this hand's move generation order
+        slots = {}
+        for slot, card in enumerate(player.hand):
+            slots.setdefault(card.card_id, slot)
+        order = sorted(
+            range(len(cached)),
+            key=lambda i: (-cached[i].score, slots[cached[i].card.card_id], i)
+        )[:top_n]
+        return [Move(cached[i].card, cached[i].position, cached[i].score) for i in order]
+    
+    def find_best_moves_batch(
+        self,
+        states: Sequence[Tuple[Player, Side, Optional[List[Card]]]],
+        top_n: int = 1,
+        workers: int = 1,
+        chunk_size: int = 256
+    ) -> BatchResult:
+        """
+        Find the best moves for many game states in one call.
+        
+        States are processed in chunks by an engine with score tables, so
+        static evaluation terms are shared across every state in a chunk.
+        With several workers the chunks run in a process pool; results
+        always come back in input order.
         
-        if not moves:
+        Args:
+            states: (player, side, opponent_cards) tuples
+            top_n: Number of top moves per state
+            workers: Number of processes (1 runs in-process)
+            chunk_size: States per chunk sent to a worker
+            
+        Returns:
+            Columnar result with the best moves of every state
+        """
+        states = list(states)
+        if workers <= 1:
+            return find_best_moves_chunk(self.board, states, top_n, self.weights)
+        
+        jobs = [
+            (self.board, states[start:start + chunk_size], top_n, self.weights)
+            for start in range(0, len(states), chunk_size)
+        ]
+        result = BatchResult()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(_run_chunk, jobs):
+                result.extend(chunk)
+        return result
+    
+    def analyze_many(
+        self,
+        states: Sequence[Tuple[Player, Side, Optional[List[Card]]]],
+        workers: int = 1,
+        chunk_size: int = 256
+    ) -> BatchResult:
+        """
+        Analyze many game states in one call.
+        
+        Equivalent to analyze_position for each state (top 5 moves), but
+        returned in columnar form; BatchResult.analysis(i) rebuilds the
+        dictionary of state i.
+        
+        Args:
+            states: (player, side, opponent_cards) tuples
+            workers: Number of processes (1 runs in-process)
+            chunk_size: States per chunk sent to a worker
+            
+        Returns:
+            Columnar result for every state, in input order
+        """
+        return self.find_best_moves_batch(states, top_n=5, workers=workers, chunk_size=chunk_size)
+    
+    def search_best_move(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        depth: int = 4,
+        node_limit: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        time_step: float = 2.0
+    ) -> SearchResult:
+        """
+        Find the best move by looking ahead over plays from both sides.
+        
+        Unlike find_best_move, which ranks single placements, this explores
+        sequences of plays (and waits) by both players while elixir
+        regenerates, using alpha-beta pruned minimax.
+        
+        Args:
+            player: Player to find a move for
+            opponent: Opposing player
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            depth: Number of plies to look ahead
+            node_limit: Maximum number of search nodes
+            time_limit: Maximum wall-clock seconds to spend
+            time_step: Seconds of game time per ply
+            
+        Returns:
+            Search result with the best move, score and statistics
+        """
+        searcher = Searcher(self, time_step=time_step)
+        return searcher.search(
+            player, opponent, side, opponent_cards,
+            depth=depth, node_limit=node_limit, time_limit=time_limit
+        )
+    
+    def iterative_search(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        time_budget: Optional[float] = 0.05,
+        max_depth: int = 32,
+        node_limit: Optional[int] = None,
+        time_step: float = 2.0
+    ) -> SearchResult:
+        """
+        Search with iterative deepening under a wall-clock budget.
+        
+        Searches depth 1, 2, 3, ... until the budget runs out and returns
+        the best move of the deepest completed iteration. The result reports
+        the depth reached, nodes searched and nodes per second.
+        
+        Args:
+            player: Player to find a move for
+            opponent: Opposing player
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            time_budget: Wall-clock seconds available (e.g. 0.05 for 50 ms)
+            max_depth: Deepest iteration to run
+            node_limit: Maximum number of search nodes
+            time_step: Seconds of game time per ply
+            
+        Returns:
+            Search result from the deepest completed iteration
+        """
+        searcher = Searcher(self, time_step=time_step)
+        return searcher.iterative_deepening(
+            player, opponent, side, opponent_cards,
+            time_budget=time_budget, max_depth=max_depth, node_limit=node_limit
+        )
+    
+    def mcts_best_move(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        iterations: int = 1000,
+        workers: Optional[int] = 1,
+        time_limit: Optional[float] = None,
+        seed: int = 0,
+        **options
+    ) -> MCTSResult:
+        """
+        Find the best move with Monte Carlo Tree Search.
+        
+        Moves from generate_moves are selected with UCT, using evaluate_move
+        scores as priors and heuristic rollouts to value leaves. With several
+        workers, independent trees are grown in a process pool and merged.
+        Every tree engine gets this engine's weights and its vectorized,
+        use_tables and cache_size options.
+        
+        Args:
+            player: Player to find a move for
+            opponent: Opposing player
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            iterations: Simulations per worker
+            workers: Number of processes (None uses every core)
+            time_limit: Maximum wall-clock seconds per worker
+            seed: Base random seed
+            **options: Extra MCTS parameters (horizon, exploration, ...)
+            
+        Returns:
+            Result with the most visited root move and per-move statistics
+        """
+        return parallel_mcts(
+            self.board, player, opponent, side, opponent_cards,
+            iterations=iterations, workers=workers, time_limit=time_limit,
+            seed=seed, weights=self.weights, counter_matrix=self.counter_matrix,
+            engine_options={'vectorized': self.vectorized, 'use_tables': self.use_tables,
+                            'cache_size': self.cache_size},
+            **options
+        )
+    
+    def _find_best_tile_moves(
+        self,
+        player: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        top_n: int,
+        placement: str,
+        resolution: float
+    ) -> List[Move]:
+        """
+        Find the best moves over tile positions instead of deployment zones.
+        
+        In 'refine' mode each card is first scored on a coarse grid
+        (every COARSE_STRIDE tiles). Then the REFINE_CELLS best coarse cells
+        are searched at full resolution within half a stride of the cell.
+        That is about 200 evaluations for a four-card hand (430 at half
+        tiles), against 48 for the zone placement. Refining does not
+        restrict itself to the zones because the best tile is often far
+        from every zone.
+        
+        Args:
+            player: Player to find moves for
+            side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+            top_n: Number of top moves to return
+            placement: 'tiles' or 'refine'
+            resolution: Tile spacing of the fine grid
+            
+        Returns:
+            Best moves, highest score first
+        """
+        if placement not in ('tiles', 'refine'):
+            raise ValueError(f"Unknown placement mode: {placement}")
+        
+        tiles = self.board.get_tile_positions(side, resolution)
+        if placement == 'refine':
+            stride = self.COARSE_STRIDE
+            coarse = [p for p in tiles if p.x % stride == 0 and p.y % stride == 0]
+        
+        self.last_positions_evaluated = 0
+        heap = []
+        seq = 0
+        for card in player.get_playable_cards():
+            if placement == 'tiles':
+                positions = tiles
+                scores = self._score_card_positions(card, positions, side, opponent_cards)
+            else:
+                positions, scores = self._refine_card(
+                    card, coarse, side, opponent_cards, resolution
+                )
+            self.last_positions_evaluated += len(positions)
+            
+            for position, score in zip(positions, scores):
+                # Ties go to the earlier move, like a stable sort
+                entry = (score, -seq, card, position)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+                seq += 1
+        
+        heap.sort(key=itemgetter(0, 1), reverse=True)
+        return [Move(card, position, score) for score, _, card, position in heap]
+    
+    def _refine_card(
+        self,
+        card: Card,
+        coarse: List[Position],
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        resolution: float
+    ) -> Tuple[List[Position], List[float]]:
+        """
+        Coarse-to-fine placement search for one card.
+        
+        Returns:
+            Every evaluated position (coarse and refined, no duplicates) and
+            its score
+        """
+        scores = self._score_card_positions(card, coarse, side, opponent_cards)
+        ranked = sorted(range(len(coarse)), key=lambda i: scores[i], reverse=True)
+        
+        grid = self.board.grid()
+        radius = self.COARSE_STRIDE // 2
+        steps = int(round(1 / resolution))
+        offsets = [i / steps for i in range(-radius * steps, radius * steps + 1)]
+        seen = set(coarse)
+        refined = []
+        for i in ranked[:self.REFINE_CELLS]:
+            center = coarse[i]
+            for dy in offsets:
+                for dx in offsets:
+                    position = grid.get(center.x + dx, center.y + dy, side)
+                    if (position is not None and position not in seen and
+                            self.board.is_valid_position(position)):
+                        seen.add(position)
+                        refined.append(position)
+        
+        positions = list(coarse) + refined
+        scores = scores + self._score_card_positions(card, refined, side, opponent_cards)
+        return positions, scores
+    
+    def _score_card_positions(
+        self,
+        card: Card,
+        positions: Sequence[Position],
+        side: Side,
+        opponent_cards: Optional[List[Card]]
+    ) -> List[float]:
+        """
+        Score one card at many positions, identically to evaluate_move.
+        
+        Position independent terms are evaluated once. With the vectorized
+        flag the NumPy batch evaluator scores the whole row at once.
+        
+        Args:
+            card: Card being played
+            positions: Positions to evaluate
+            side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+            
+        Returns:
+            Score for each position
+        """
+        if not positions:
             return []
+        if self.vectorized:
+            grid = self.batch_evaluator.score_grid([card], positions, side, opponent_cards)
+            return grid[0].tolist()
+        
+        base = (self.weights.elixir_base - card.elixir_cost) * self.weights.elixir_scale
+        card_type = self._evaluate_card_type(card, positions[0], side)
+        counters = self._evaluate_counters(card, opponent_cards) if opponent_cards else None
+        scores = []
+        for position in positions:
+            # Same additions, in the same order, as evaluate_move
+            score = 0.0
+            score += base
+            score += self._evaluate_positioning(card, position, side)
+            score += card_type
+            if counters is not None:
+                score += counters
+            score += self._evaluate_strategy(card, position, side)
+            scores.append(score)
+        return scores
+    
+    def _best_moves_from_tables(
+        self,
+        player: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]],
+        top_n: int
+    ) -> List[Move]:
+        """
+        Select the top moves using the score tables, pruning whole cards.
         
-        # Evaluate each move
-        for move in moves:
-            move.score = self.evaluate_move(move, side, opponent_cards)
+        Every card gets an upper bound on its score (best prefix plus
+        counters plus best strategy term; float addition is monotonic so the
+        bound is exact). Cards are visited best bound first and, once the
+        heap holds top_n moves, any card whose bound can't beat the current
+        Nth best is skipped along with all cards after it.
         
-        # Sort by score (descending) and return top N
-        moves.sort(reverse=True)
-        return moves[:top_n]
+        Args:
+            player: Player to generate moves for
+            side: Which side the player is on
+            opponent_cards: Known opponent cards (if any)
+            top_n: Number of top moves to return
+            
+        Returns:
+            Best moves, highest score first (ties keep generation order)
+        """
+        tables = self.score_tables
+        groups = []
+        first_seq = 0
+        for card in player.get_playable_cards():
+            positions, prefixes, strategies = tables.lookup(card, side)
+            max_prefix, max_strategy = tables.bounds(card, side)
+            # Counters only depend on the card, so evaluate them once per card
+            if opponent_cards:
+                counters = self._evaluate_counters(card, opponent_cards)
+                bound = max_prefix + counters + max_strategy
+            else:
+                counters = None
+                bound = max_prefix + max_strategy
+            groups.append((bound, -first_seq, card, counters, positions, prefixes, strategies))
+            first_seq += len(positions)
+        groups.sort(key=itemgetter(0, 1), reverse=True)
+        
+        heap = []
+        self.last_pruned = 0
+        for index, group in enumerate(groups):
+            bound, neg_first, card, counters, positions, prefixes, strategies = group
+            if len(heap) == top_n and (bound, neg_first) <= heap[0][:2]:
+                # Later groups have lower bounds, so none of them can compete
+                self.last_pruned = sum(len(g[4]) for g in groups[index:])
+                break
+            seq = -neg_first
+            for position, prefix, strategy in zip(positions, prefixes, strategies):
+                if counters is None:
+                    score = prefix + strategy
+                else:
+                    score = prefix + counters + strategy
+                entry = (score, -seq, card, position)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+                seq += 1
+        
+        heap.sort(key=itemgetter(0, 1), reverse=True)
+        return [Move(card, position, score) for score, _, card, position in heap]
     
     def analyze_position(
         self, 
         player: Player, 
         side: Side,
-        opponent_cards: Optional[List[Card]] = None
+        opponent_cards: Optional[List[Card]] = None,
+        opponent: Optional[Player] = None,
+        search_depth: int = 4,
+        breakdown: bool = False
     ) -> Dict[str, any]:
         """
         Analyze the current position and provide detailed analysis.
@@ -296,11 +1000,17 @@ class ClashRoyaleEngine:
             player: Player to analyze for
             side: Which side the player is on
             opponent_cards: Known opponent cards (if any)
+            opponent: Opposing player; when given, a lookahead search is run
+                and reported under 'search' (reusing the transposition table
+                across calls)
+            search_depth: Depth of that lookahead search
+            breakdown: Add each best move's per-component scores under
+                'breakdown'
             
         Returns:
             Dictionary with analysis results
         """
-        best_moves = self.find_best_move(player, side, opponent_cards, top_n=5)
+        best_moves = self.find_best_move(player, side, opponent_cards, top_n=5, breakdown=breakdown)
         
         analysis = {
             'player': player.name,
@@ -318,5 +1028,21 @@ class ClashRoyaleEngine:
             ],
             'recommendation': str(best_moves[0]) if best_moves else "No moves available"
         }
+        if breakdown:
+            for entry, move in zip(analysis['best_moves'], best_moves):
+                entry['breakdown'] = {
+                    name: round(value, 2) for name, value in move.explain().items()
+                }
+        
+        if opponent is not None:
+            result = self.search_best_move(
+                player, opponent, side, opponent_cards, depth=search_depth
+            )
+            analysis['search'] = {
+                'best_move': str(result.best_move) if result.best_move else "Wait",
+                'score': round(result.score, 2),
+                'depth': result.depth,
+                'nodes': result.nodes
+            }
         
         return analysis
@@ -0,0 +1,228 @@
+"""
+Opt-in per-stage instrumentation of ``ClashRoyaleEngine``.
+
+``EngineInstrumentation.attach`` replaces the engine's stage methods with
+timing wrappers by setting instance attributes that shadow the class
+methods. Every call site already looks the stages up on the engine
+(``self._evaluate_counters(...)``, ``engine._evaluate_positioning(...)``),
+so the score tables, tile search, lookahead search and MCTS are all
+measured. ``detach`` deletes the attributes again, after which the engine
+runs exactly the code it ran before: there is no flag to test in the hot
+loops, instrumented or not.
+
+Stage times are inclusive, like cProfile's cumulative time: the time of
+``evaluate_move`` contains the time of the ``_evaluate_*`` terms it calls.
+Counters export as a dictionary or in the Prometheus text format::
+
+    stats = engine.enable_instrumentation()
+    engine.find_best_move(player, Side.FRIENDLY)
+    print(stats.prometheus())
+    engine.disable_instrumentation()
+"""
+
+import time
+from typing import Dict, Optional, Sequence
+
+
+class StageStats:
+    """Call count and cumulative time of one stage."""
+
+    __slots__ = ('calls', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"StageStats({self.calls} calls, {self.seconds:.6f}s)"
+
+
+class EngineInstrumentation:
+    """
+    Counters for one engine: per-stage calls and time, moves generated,
+    moves pruned and search nodes.
+    """
+
+    # Timed stages, by engine method name
+    STAGES = (
+        'find_best_move',
+        'generate_moves',
+        'evaluate_move',
+        '_evaluate_positioning',
+        '_evaluate_card_type',
+        '_evaluate_counters',
+        '_evaluate_strategy',
+        '_score_card_positions',
+        '_best_moves_from_tables',
+        'search_best_move',
+        'iterative_search',
+        'mcts_best_move',
+        'analyze_position',
+    )
+
+    def __init__(self, engine, stages: Optional[Sequence[str]] = None):
+        """
+        Initialize counters for an engine (call attach to start counting).
+
+        Args:
+            engine: Engine to instrument
+            stages: Method names to time (STAGES if None)
+
+        Raises:
+            ValueError: If a stage is not an engine method
+        """
+        stages = tuple(stages) if stages is not None else self.STAGES
+        for name in stages:
+            if not callable(getattr(type(engine), name, None)):
+                raise ValueError(f"Unknown engine stage: {name}")
+        self.engine = engine
+        self.stages: Dict[str, StageStats] = {name: StageStats() for name in stages}
+        self.moves_generated = 0
+        self.moves_pruned = 0
+        self.search_nodes = 0
+        self._attached = []
+
+    @property
+    def attached(self) -> bool:
+        """Whether the wrappers are installed on the engine."""
+        return bool(self._attached)
+
+    def attach(self):
+        """Install the wrappers on the engine."""
+        if self._attached:
+            return
+        engine = self.engine
+        for name in self.stages:
+            self._install(name, self._timed(name, getattr(engine, name)))
+        # Lazily generated moves are counted but not timed (the consumer's
+        # time would be charged to them)
+        if 'iter_moves' not in engine.__dict__:
+            self._install('iter_moves', self._counted(engine.iter_moves))
+
+    def detach(self):
+        """Remove the wrappers, restoring the engine's own methods."""
+        engine = self.engine
+        for name in self._attached:
+            engine.__dict__.pop(name, None)
+        self._attached = []
+
+    def reset(self):
+        """Zero every counter."""
+        for stats in self.stages.values():
+            stats.calls = 0
+            stats.seconds = 0.0
+        self.moves_generated = 0
+        self.moves_pruned = 0
+        self.search_nodes = 0
+
+    def _install(self, name: str, wrapper):
+        """Shadow an engine method with a wrapper."""
+        self.engine.__dict__[name] = wrapper
+        self._attached.append(name)
+
+    def _timed(self, name: str, method):
+        """Wrap a bound method to count and time its calls."""
+        stats = self.stages[name]
+        perf_counter = time.perf_counter
+        after = {
+            'generate_moves': self._after_generate,
+            '_score_card_positions': self._after_generate,
+            '_best_moves_from_tables': self._after_tables,
+            'search_best_move': self._after_search,
+            'iterative_search': self._after_search,
+        }.get(name)
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                stats.seconds += perf_counter() - start
+                stats.calls += 1
+            if after is not None:
+                after(result, args)
+            return result
+
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    def _after_generate(self, result, args):
+        """Count generated moves (or tile positions scored)."""
+        self.moves_generated += len(result)
+
+    def _after_tables(self, result, args):
+        """Count the moves a score-table selection covered and pruned."""
+        engine = self.engine
+        player, side = args[0], args[1]
+        positions = engine.score_tables.get_table(side).positions
+        self.moves_generated += len(player.get_playable_cards()) * len(positions)
+        self.moves_pruned += engine.last_pruned
+
+    def _after_search(self, result, args):
+        """Count the nodes a lookahead search visited."""
+        self.search_nodes += result.nodes
+
+    def _counted(self, method):
+        """Wrap a generator method to count what it yields."""
+        def wrapper(*args, **kwargs):
+            for move in method(*args, **kwargs):
+                self.moves_generated += 1
+                yield move
+
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    def as_dict(self) -> dict:
+        """
+        Get the counters as a dictionary.
+
+        Returns:
+            {'stages': {stage: {'calls', 'seconds'}}, 'moves_generated',
+            'moves_pruned', 'search_nodes'}; stage names drop the leading
+            underscore
+        """
+        return {
+            'stages': {
+                name.lstrip('_'): {'calls': stats.calls, 'seconds': stats.seconds}
+                for name, stats in self.stages.items()
+            },
+            'moves_generated': self.moves_generated,
+            'moves_pruned': self.moves_pruned,
+            'search_nodes': self.search_nodes,
+        }
+
+    def prometheus(self, prefix: str = 'clasher_engine') -> str:
+        """
+        Get the counters in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Exposition text, one metric family after another
+        """
+        lines = []
+
+        def family(name: str, help_text: str):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+
+        family('stage_calls_total', "Calls of each engine stage.")
+        for name, stats in self.stages.items():
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name.lstrip("_")}"}} {stats.calls}')
+        family('stage_seconds_total', "Cumulative seconds in each engine stage, nested stages included.")
+        for name, stats in self.stages.items():
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name.lstrip("_")}"}} {stats.seconds!r}')
+        for name, value, help_text in (
+            ('moves_generated_total', self.moves_generated, "Moves (or tile positions) generated."),
+            ('moves_pruned_total', self.moves_pruned, "Moves skipped by score-table bound pruning."),
+            ('search_nodes_total', self.search_nodes, "Nodes visited by lookahead searches."),
+        ):
+            family(name, help_text)
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self) -> str:
+        calls = sum(stats.calls for stats in self.stages.values())
+        state = "attached" if self.attached else "detached"
+        return f"EngineInstrumentation({state}, {calls} stage calls, {self.moves_generated} moves)"
@@ -0,0 +1,409 @@
+"""
+Monte Carlo Tree Search over plays by both sides.
+
+Children of a node are the moves from ``ClashRoyaleEngine.generate_moves``
+plus waiting, with ``evaluate_move`` scores turned into selection priors.
+Leaves are valued with cheap heuristic rollouts that follow the Player
+elixir and card cycle rules. Several independent trees can be grown in a
+process pool (root parallelization) and their root statistics merged.
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from card import Card
+from board import Board, Side
+from move import Move
+from player import Player
+from search import SearchState, other_side, root_context
+from tables import ScoreTables
+
+
+class MCTSNode:
+    """A node in the search tree."""
+
+    def __init__(
+        self,
+        state: Optional[SearchState],
+        move: Optional[Move],
+        parent: Optional['MCTSNode'],
+        prior: float,
+        ply: int
+    ):
+        """
+        Initialize a node.
+
+        Args:
+            state: Game state after ``move`` was applied (None until the
+                node is first selected)
+            move: Move leading here (None for waiting or the root)
+            parent: Parent node (None for the root)
+            prior: Selection prior from the parent's evaluation
+            ply: Depth of the node below the root
+        """
+        self.state = state
+        self.move = move
+        self.parent = parent
+        self.prior = prior
+        self.ply = ply
+        self.children: Optional[List['MCTSNode']] = None
+        # Move score collected by the side that made ``move``
+        self.gained = 0.0
+        self.visits = 0
+        # Sum of rewards from the perspective of the side that made ``move``
+        self.value_sum = 0.0
+
+    @property
+    def value(self) -> float:
+        """Mean reward for the side that made the move."""
+        return self.value_sum / self.visits if self.visits else 0.0
+
+
+class MCTSResult:
+    """Outcome of an MCTS run."""
+
+    def __init__(
+        self,
+        best_move: Optional[Move],
+        value: float,
+        iterations: int,
+        elapsed: float,
+        move_stats: List[Tuple[Optional[Move], int, float]]
+    ):
+        """
+        Initialize a result.
+
+        Args:
+            best_move: Most visited root move (None means waiting)
+            value: Mean reward of that move, in [-1, 1]
+            iterations: Total simulations across all trees
+            elapsed: Wall-clock time spent in seconds
+            move_stats: (move, visits, mean reward) for each root move,
+                most visited first
+        """
+        self.best_move = best_move
+        self.value = value
+        self.iterations = iterations
+        self.elapsed = elapsed
+        self.move_stats = move_stats
+
+    def __repr__(self) -> str:
+        return (f"MCTSResult({self.best_move}, value={self.value:.3f}, "
+                f"iterations={self.iterations})")
+
+
+class MCTS:
+    """
+    UCT search with evaluation priors and heuristic rollouts.
+
+    Rewards are the difference between the move scores collected by the root
+    player and by the opponent over ``horizon`` plies, plus an elixir term at
+    the horizon, squashed into [-1, 1] with tanh.
+    """
+
+    def __init__(
+        self,
+        engine,
+        horizon: int = 8,
+        time_step: float = 2.0,
+        exploration: float = 1.4,
+        prior_temperature: float = 5.0,
+        value_scale: float = 20.0,
+        elixir_weight: float = 2.0,
+        wait_probability: float = 0.2,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize the search.
+
+        Args:
+            engine: Engine providing the board, moves and evaluation
+            horizon: Plies simulated from the root (tree plus rollout)
+            time_step: Seconds of game time per ply
+            exploration: UCT exploration constant
+            prior_temperature: Softmax temperature turning scores into priors
+            value_scale: Score difference that maps to a reward of tanh(1)
+            elixir_weight: Value of one elixir of advantage at the horizon
+            wait_probability: Chance that a rollout player waits instead of playing
+            seed: Random seed for rollouts
+        """
+        self.engine = engine
+        self.horizon = horizon
+        self.time_step = time_step
+        self.exploration = exploration
+        self.prior_temperature = prior_temperature
+        self.value_scale = value_scale
+        self.elixir_weight = elixir_weight
+        self.wait_probability = wait_probability
+        self.random = random.Random(seed)
+        self.tables = engine.score_tables or ScoreTables(engine)
+
+    def search(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        iterations: int = 1000,
+        time_limit: Optional[float] = None
+    ) -> MCTSNode:
+        """
+        Grow a tree from the current position.
+
+        Args:
+            player: Player to move
+            opponent: Opposing player
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            iterations: Number of simulations
+            time_limit: Maximum wall-clock seconds to spend
+
+        Returns:
+            Root node of the tree
+        """
+        state = SearchState(
+            {side: player, other_side(side): opponent},
+            side,
+            {side: None, other_side(side): None}
+        ).copy()
+        self.root_side = side
+        self.root_context = root_context(opponent_cards)
+        root = MCTSNode(state, None, None, 1.0, 0)
+
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        for i in range(iterations):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._simulate(root)
+        return root
+
+    def _simulate(self, root: MCTSNode):
+        """Run one selection, expansion, rollout and backpropagation pass."""
+        node = root
+        total = 0.0  # Score difference from the root player's perspective
+        while node.children:
+            node = self._select(node)
+            if node.state is None:
+                node.state, node.gained = self._advance(node.parent.state, node.move)
+            total += self._signed(node.parent.state.to_move, node.gained)
+
+        if node.ply < self.horizon and node.children is None:
+            self._expand(node)
+
+        total += self._rollout(node.state, node.ply)
+        reward = math.tanh(total / self.value_scale)
+
+        while node is not None:
+            node.visits += 1
+            if node.parent is not None:
+                node.value_sum += self._signed(node.parent.state.to_move, reward)
+            node = node.parent
+
+    def _signed(self, side: Side, value: float) -> float:
+        """Express a value gained by ``side`` from the root player's perspective."""
+        return value if side == self.root_side else -value
+
+    def _select(self, node: MCTSNode) -> MCTSNode:
+        """Pick the child maximizing the PUCT score."""
+        scale = self.exploration * math.sqrt(node.visits + 1)
+        best = None
+        best_score = float('-inf')
+        for child in node.children:
+            score = child.value + scale * child.prior / (1 + child.visits)
+            if score > best_score:
+                best_score = score
+                best = child
+        return best
+
+    def _context(self, state: SearchState, ply: int) -> Optional[List[Card]]:
+        """Cards the side to move is responding to."""
+        last = state.last_played[other_side(state.to_move)]
+        if last is not None:
+            return [last]
+        return self.root_context if ply == 0 else None
+
+    def _expand(self, node: MCTSNode):
+        """Create children for every legal move plus waiting, with priors."""
+        state = node.state
+        side = state.to_move
+        engine = self.engine
+        context = self._context(state, node.ply)
+        moves: List[Optional[Move]] = engine.generate_moves(state.players[side], side)
+        for move in moves:
+            move.score = engine.evaluate_move(move, side, context)
+        moves.append(None)
+
+        # Softmax over scores; waiting gets the score of an average play
+        scores = [m.score for m in moves[:-1]]
+        wait_score = sum(scores) / len(scores) if scores else 0.0
+        scores.append(wait_score)
+        top = max(scores)
+        weights = [math.exp((s - top) / self.prior_temperature) for s in scores]
+        norm = sum(weights)
+
+        # Child states are built lazily when a child is first selected
+        node.children = [
+            MCTSNode(None, move, node, weight / norm, node.ply + 1)
+            for move, weight in zip(moves, weights)
+        ]
+
+    def _advance(self, state: SearchState, move: Optional[Move]) -> Tuple[SearchState, float]:
+        """Apply a move (or a wait) and let time pass."""
+        mover = state.to_move
+        child = state.copy()
+        gained = 0.0
+        if move is not None:
+            child.players[mover].play_card(move.card)
+            child.last_played[mover] = move.card
+            gained = move.score
+        for player in child.players.values():
+            player.add_elixir(self.time_step * player.ELIXIR_RATE)
+        child.to_move = other_side(mover)
+        return child, gained
+
+    def _rollout(self, state: SearchState, ply: int) -> float:
+        """
+        Play random cards at their best static position until the horizon.
+
+        Plays are made on the node's own state and unmade afterwards, so
+        rollouts do not copy the state.
+
+        Returns:
+            Score difference from the root player's perspective
+        """
+        engine = self.engine
+        rng = self.random
+        total = 0.0
+        undo = []
+        try:
+            while ply < self.horizon:
+                side = state.to_move
+                playable = state.players[side].get_playable_cards()
+                card = None
+                if playable and rng.random() >= self.wait_probability:
+                    card = rng.choice(playable)
+                    positions, prefixes, strategies = self.tables.lookup(card, side)
+                    context = self._context(state, ply)
+                    counters = engine._evaluate_counters(card, context) if context else 0.0
+                    best = max(range(len(positions)), key=lambda i: prefixes[i] + strategies[i])
+                    total += self._signed(side, prefixes[best] + counters + strategies[best])
+                undo.append(state.make(card, self.time_step))
+                ply += 1
+
+            root_player = state.players[self.root_side]
+            other = state.players[other_side(self.root_side)]
+            return total + self.elixir_weight * (root_player.elixir - other.elixir)
+        finally:
+            for record in reversed(undo):
+                state.unmake(record)
+
+
+def root_statistics(root: MCTSNode) -> Dict[tuple, list]:
+    """
+    Summarize root children by move.
+
+    Returns:
+        Mapping of move key to [move, visits, value_sum]
+    """
+    stats = {}
+    for child in root.children or ():
+        move = child.move
+        key = None if move is None else (move.card.card_id, move.position.x, move.position.y)
+        stats[key] = [move, child.visits, child.value_sum]
+    return stats
+
+
+def _run_tree(args) -> Dict[tuple, list]:
+    """Grow one independent tree in a worker process."""
+    (board, player, opponent, side, opponent_cards,
+     iterations, time_limit, seed, weights, counter_matrix, engine_options, options) = args
+    from engine import ClashRoyaleEngine
+    engine = ClashRoyaleEngine(board, tt_bytes=0, weights=weights, **engine_options)
+    if counter_matrix is not None:
+        engine.counter_matrix = counter_matrix
+    mcts = MCTS(engine, seed=seed, **options)
+    root = mcts.search(player, opponent, side, opponent_cards, iterations, time_limit)
+    return root_statistics(root)
+
+
+def parallel_mcts(
+    board: Board,
+    player: Player,
+    opponent: Player,
+    side: Side,
+    opponent_cards: Optional[List[Card]] = None,
+    iterations: int = 1000,
+    workers: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    seed: int = 0,
+    weights=None,
+    counter_matrix=None,
+    engine_options: Optional[dict] = None,
+    **options
+) -> MCTSResult:
+    """
+    Run MCTS with root parallelization and merge the trees.
+
+    Each worker grows its own tree from the same root with a different seed;
+    visit counts and rewards of the root moves are then summed.
+
+    Args:
+        board: Board to search on
+        player: Player to move
+        opponent: Opposing player
+        side: Which side the player is on
+        opponent_cards: Opponent cards already on the field, or a
+            CardDistribution (if any)
+        iterations: Simulations per worker
+        workers: Number of processes (defaults to the CPU count; 1 runs
+            in-process without a pool)
+        time_limit: Maximum wall-clock seconds per worker
+        seed: Base random seed (worker i uses seed + i)
+        weights: EvalWeights of the tree engines (defaults if None)
+        counter_matrix: CounterMatrix to score counters with in-process;
+            worker processes rebuild it from the weights instead of
+            receiving a copy of the card registry
+        engine_options: Other ClashRoyaleEngine arguments of the tree
+            engines (vectorized, use_tables, cache_size)
+        **options: Extra MCTS parameters (horizon, exploration, ...)
+
+    Returns:
+        Merged result with the most visited move
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    jobs = [
+        (board, player, opponent, side, opponent_cards,
+         iterations, time_limit, seed + i, weights,
+         counter_matrix if workers == 1 else None, engine_options or {}, options)
+        for i in range(workers)
+    ]
+    if workers == 1:
+        trees = [_run_tree(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            trees = list(pool.map(_run_tree, jobs))
+
+    merged: Dict[tuple, list] = {}
+    for stats in trees:
+        for key, (move, visits, value_sum) in stats.items():
+            entry = merged.setdefault(key, [move, 0, 0.0])
+            entry[1] += visits
+            entry[2] += value_sum
+
+    move_stats = sorted(
+        ((move, visits, value_sum / visits if visits else 0.0)
+         for move, visits, value_sum in merged.values()),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    total = sum(visits for _, visits, _ in move_stats)
+    if not move_stats:
+        return MCTSResult(None, 0.0, total, time.perf_counter() - start, [])
+    best_move, _, value = move_stats[0]
+    return MCTSResult(best_move, value, total, time.perf_counter() - start, move_stats)
@@ -2,7 +2,7 @@
 Move class representing a card placement in Clash Royale.
 """
 
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from card import Card
 from board import Position
 
@@ -10,9 +10,22 @@ from board import Position
 class Move:
     """
     Represents a move in Clash Royale (deploying a card at a position).
+    
+    Moves compare and hash by card ID and position.
     """
     
-    def __init__(self, card: Card, position: Position, score: float = 0.0):
+    __slots__ = ('card', 'position', 'score', 'breakdown')
+    
+    # Score components of a breakdown, in the order evaluate_move adds them
+    COMPONENTS = ('elixir', 'positioning', 'card_type', 'counters', 'strategy')
+    
+    def __init__(
+        self,
+        card: Card,
+        position: Position,
+        score: float = 0.0,
+        breakdown: Optional[Tuple[float, ...]] = None
+    ):
         """
         Initialize a move.
         
@@ -20,10 +33,18 @@ class Move:
             card: The card being played
             position: Where the card is being placed
             score: Evaluation score for this move
+            breakdown: Score of each of COMPONENTS, if it was requested
         """
         self.card = card
         self.position = position
         self.score = score
+        self.breakdown = breakdown
+    
+    def explain(self) -> Optional[Dict[str, float]]:
+        """Get the score breakdown by component name (None if not computed)."""
+        if self.breakdown is None:
+            return None
+        return dict(zip(self.COMPONENTS, self.breakdown))
     
     def __repr__(self) -> str:
         return f"Move({self.card.name} at {self.position}, score={self.score:.2f})"
@@ -34,11 +55,11 @@ class Move:
     def __eq__(self, other) -> bool:
         if not isinstance(other, Move):
             return False
-        return (self.card.name == other.card.name and 
+        return (self.card.card_id == other.card.card_id and 
                 self.position == other.position)
     
     def __hash__(self) -> int:
-        return hash((self.card.name, self.position))
+        return hash((self.card.card_id, self.position))
     
     def __lt__(self, other) -> bool:
         """Compare moves by score for sorting."""
@@ -0,0 +1,327 @@
+"""
+Opponent modelling: inferring the opponent's deck, hand and cycle.
+
+Only the cards an opponent plays are visible. ``OpponentModel`` tracks those
+plays with a particle filter whose particles follow the ``Player`` rules:
+an 8-card deck in cycle order, a 4-card hand starting as the first four
+cards, and each played card replaced by ``deck[next_card_index % 8]``.
+
+Deck slots are assigned lazily: a slot holds no card until an observation
+requires one, at which point the card is placed in one of the unassigned
+slots currently in hand and the particle's weight is multiplied by the
+prior probability of that placement. Unassigned slots are uniformly
+distributed over the pool cards not yet placed. Particles that cannot
+explain a play get weight zero, and the set is resampled when its effective
+size drops below half. If no particle explains a play, the particles are
+rebuilt by replaying the whole history from the prior.
+
+Queries return a ``CardDistribution``, which ``ClashRoyaleEngine`` accepts
+in place of a list of opponent cards and scores as the expected counter
+term.
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from card import Card, CARD_POOL, CARD_REGISTRY
+from player import Player
+
+_DECK_SIZE = 8
+
+
+class CardDistribution:
+    """
+    Expected number of copies of each card, keyed by card ID.
+
+    Entries are kept sorted by card ID, which fixes the order in which
+    expected scores are summed.
+    """
+
+    __slots__ = ('entries', '_map')
+
+    def __init__(self, expected: Dict[int, float]):
+        """
+        Initialize a distribution.
+
+        Args:
+            expected: Card ID -> expected count (zero entries are dropped)
+        """
+        self.entries: Tuple[Tuple[int, float], ...] = tuple(
+            (card_id, value) for card_id, value in sorted(expected.items()) if value > 0
+        )
+        self._map = dict(self.entries)
+
+    def probability(self, card: Card) -> float:
+        """Expected count of a card (its probability for 0/1 quantities)."""
+        return self._map.get(card.card_id, 0.0)
+
+    def key(self) -> tuple:
+        """Hashable form, for caching results computed against it."""
+        return self.entries
+
+    def most_likely(self, n: int = 4) -> List[Tuple[Card, float]]:
+        """
+        Get the cards with the highest expected counts.
+
+        Args:
+            n: Number of cards to return
+
+        Returns:
+            (card, expected count) pairs, highest first
+        """
+        ranked = sorted(self.entries, key=lambda entry: (-entry[1], entry[0]))[:n]
+        return [(CARD_REGISTRY.get(card_id), value) for card_id, value in ranked]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        top = ", ".join(f"{card.name} {value:.2f}" for card, value in self.most_likely())
+        return f"CardDistribution({top})"
+
+
+class OpponentModel:
+    """
+    Particle filter over an opponent's deck order, hand and cycle position.
+
+    ``next_card_index`` is the same in every particle (it only depends on
+    the number of plays), so particles differ in which card sits in which
+    deck slot and, through that, in which slots are in hand.
+    """
+
+    # Replays of the history tried before giving up on the cycle rules
+    REPLAY_ATTEMPTS = 4
+
+    def __init__(
+        self,
+        card_pool: Optional[Sequence[Card]] = None,
+        deck: Optional[Sequence[Card]] = None,
+        particles: int = 256,
+        seed: int = 0
+    ):
+        """
+        Initialize the model with no observations.
+
+        Args:
+            card_pool: Cards the opponent's deck is drawn from (CARD_POOL
+                if None); the deck holds 8 distinct cards of the pool
+            deck: The opponent's 8 cards, if known (only their order and
+                the hand are then inferred)
+            particles: Number of particles
+            seed: Random seed for placements and resampling
+        """
+        if deck is not None:
+            if len(deck) != _DECK_SIZE:
+                raise ValueError("Deck must contain exactly 8 cards")
+            card_pool = deck
+        pool = list(dict.fromkeys(card.card_id for card in (card_pool or CARD_POOL)))
+        if len(pool) < _DECK_SIZE:
+            raise ValueError("Card pool must contain at least 8 distinct cards")
+        self.pool = pool
+        self.num_particles = particles
+        self.random = random.Random(seed)
+        self.history: List[int] = []
+        self.resets = 0
+        self.resamples = 0
+        self._reset_particles()
+
+    def _reset_particles(self):
+        """Start every particle from the prior: nothing placed, equal weights."""
+        count = self.num_particles
+        self.next_card_index = Player.HAND_SIZE
+        # Per particle: card ID in each deck slot (-1 unassigned), deck
+        # slots in hand (in hand order), and weight
+        self.slots = [[-1] * _DECK_SIZE for _ in range(count)]
+        self.hands = [list(range(Player.HAND_SIZE)) for _ in range(count)]
+        self.weights = [1.0 / count] * count
+        self._cached: Dict[str, CardDistribution] = {}
+
+    @property
+    def plays(self) -> int:
+        """Number of observed plays."""
+        return len(self.history)
+
+    def observe(self, card: Card):
+        """
+        Update the model with a card the opponent played.
+
+        Args:
+            card: Card played
+        """
+        card_id = card.card_id
+        if card_id not in self.pool:
+            # The pool was wrong about this deck; the card is in it now
+            self.pool.append(card_id)
+        self.history.append(card_id)
+        if not self._update(card_id):
+            # Every particle guessed a slot wrong somewhere. Rejuvenate by
+            # replaying the whole history with fresh placements; if no
+            # replay explains it, the plays broke the cycle rules
+            self.resets += 1
+            for _ in range(self.REPLAY_ATTEMPTS):
+                if self._replay():
+                    break
+            else:
+                self._restart(card_id)
+        self._cached = {}
+
+    def _replay(self) -> bool:
+        """Rebuild the particles from the prior through every observed play."""
+        self._reset_particles()
+        for card_id in self.history:
+            if not self._update(card_id):
+                return False
+        return True
+
+    def _restart(self, card_id: int):
+        """
+        Restart from the prior with one play, at the real cycle position.
+
+        Cards observed earlier stay pinned in every particle: out of hand
+        first, then in hand, always leaving a hand slot for the new play.
+        """
+        self._reset_particles()
+        self.next_card_index = Player.HAND_SIZE + len(self.history) - 1
+        earlier = [seen for seen in dict.fromkeys(self.history[:-1]) if seen != card_id]
+        earlier = earlier[:_DECK_SIZE - 1]
+        rng = self.random
+        for slots, hand in zip(self.slots, self.hands):
+            outside = [slot for slot in range(_DECK_SIZE) if slot not in hand]
+            inside = list(hand)
+            rng.shuffle(outside)
+            rng.shuffle(inside)
+            for seen, slot in zip(earlier, outside + inside[1:]):
+                slots[slot] = seen
+        self._update(card_id)
+
+    def _update(self, card_id: int) -> bool:
+        """Advance every particle by one play; False if all weights are zero."""
+        rng = self.random
+        pool_size = len(self.pool)
+        incoming = self.next_card_index % _DECK_SIZE
+        weights = self.weights
+        total = 0.0
+        for i, slots in enumerate(self.slots):
+            weight = weights[i]
+            if weight == 0.0:
+                continue
+            hand = self.hands[i]
+            played = -1
+            for slot in hand:
+                if slots[slot] == card_id:
+                    played = slot
+                    break
+            if played < 0:
+                if card_id in slots:
+                    # Already placed in a slot that is not in hand
+                    weights[i] = 0.0
+                    continue
+                open_slots = sorted({slot for slot in hand if slots[slot] < 0})
+                if not open_slots:
+                    weights[i] = 0.0
+                    continue
+                placed = _DECK_SIZE - slots.count(-1)
+                # Each open slot holds this card with probability
+                # 1 / (pool cards not yet placed)
+                weight *= len(open_slots) / (pool_size - placed)
+                played = rng.choice(open_slots)
+                slots[played] = card_id
+            hand[hand.index(played)] = incoming
+            weights[i] = weight
+            total += weight
+        self.next_card_index += 1
+        if total == 0.0:
+            return False
+        for i in range(len(weights)):
+            weights[i] /= total
+        if self.effective_size() < self.num_particles / 2:
+            self._resample()
+        return True
+
+    def effective_size(self) -> float:
+        """Effective number of particles (1 / sum of squared weights)."""
+        return 1.0 / sum(w * w for w in self.weights)
+
+    def _resample(self):
+        """Systematic resampling to equal weights."""
+        count = self.num_particles
+        step = 1.0 / count
+        position = self.random.random() * step
+        cumulative = 0.0
+        source = 0
+        slots, hands = [], []
+        weights = self.weights
+        for _ in range(count):
+            while source < count - 1 and cumulative + weights[source] < position:
+                cumulative += weights[source]
+                source += 1
+            slots.append(list(self.slots[source]))
+            hands.append(list(self.hands[source]))
+            position += step
+        self.slots = slots
+        self.hands = hands
+        self.weights = [step] * count
+        self.resamples += 1
+
+    def hand_distribution(self) -> CardDistribution:
+        """Expected count of each card in the opponent's current hand."""
+        return self._distribution('hand')
+
+    def deck_distribution(self) -> CardDistribution:
+        """Probability of each card being in the opponent's deck."""
+        return self._distribution('deck')
+
+    def next_card_distribution(self) -> CardDistribution:
+        """Probability of each card being the next one to enter the hand."""
+        return self._distribution('next')
+
+    def _distribution(self, kind: str) -> CardDistribution:
+        """Average a per-particle quantity over the weighted particle set."""
+        cached = self._cached.get(kind)
+        if cached is not None:
+            return cached
+        pool = self.pool
+        pool_size = len(pool)
+        incoming = self.next_card_index % _DECK_SIZE
+        expected = dict.fromkeys(pool, 0.0)
+        # Mass of unassigned slots, spread evenly over every pool card that
+        # the particle has not placed yet
+        spread = 0.0
+        for slots, hand, weight in zip(self.slots, self.hands, self.weights):
+            if weight == 0.0:
+                continue
+            if kind == 'hand':
+                members = hand
+            elif kind == 'deck':
+                members = range(_DECK_SIZE)
+            else:
+                members = (incoming,)
+            unknown = 0
+            for slot in members:
+                card_id = slots[slot]
+                if card_id < 0:
+                    unknown += 1
+                else:
+                    expected[card_id] += weight
+            if unknown:
+                placed = [card_id for card_id in slots if card_id >= 0]
+                share = weight * unknown / (pool_size - len(placed))
+                spread += share
+                for card_id in placed:
+                    expected[card_id] -= share
+        if spread:
+            for card_id in pool:
+                expected[card_id] += spread
+        # Cancelled shares can leave rounding noise on placed cards
+        distribution = CardDistribution({
+            card_id: value for card_id, value in expected.items() if value > 1e-12
+        })
+        self._cached[kind] = distribution
+        return distribution
+
+    def __repr__(self) -> str:
+        return (f"OpponentModel({self.plays} plays, {self.num_particles} particles, "
+                f"ess {self.effective_size():.0f})")
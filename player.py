@@ -2,16 +2,19 @@
 Player class managing deck, hand, and elixir.
 """
 
-from typing import List
+from typing import List, Optional, Tuple
 from card import Card
 
 
 class Player:
     """Represents a Clash Royale player with their deck and resources."""
     
+    __slots__ = ('name', 'deck', 'deck_ids', 'elixir', 'hand', 'next_card_index')
+    
     MAX_ELIXIR = 10
     STARTING_ELIXIR = 5
     HAND_SIZE = 4
+    ELIXIR_RATE = 1 / 2.8  # Elixir generated per second (single elixir)
     
     def __init__(self, deck: List[Card], name: str = "Player"):
         """
@@ -26,6 +29,7 @@ class Player:
         
         self.name = name
         self.deck = deck
+        self.deck_ids = tuple(card.card_id for card in deck)
         self.elixir = self.STARTING_ELIXIR
         
         # Initialize hand with first 4 cards
@@ -42,7 +46,13 @@ class Player:
         Returns:
             True if card can be played
         """
-        return self.elixir >= card.elixir_cost and card in self.hand
+        if self.elixir < card.elixir_cost:
+            return False
+        card_id = card.card_id
+        for held in self.hand:
+            if held.card_id == card_id:
+                return True
+        return False
     
     def play_card(self, card: Card) -> bool:
         """
@@ -54,18 +64,59 @@ class Player:
         Returns:
             True if card was successfully played
         """
+        return self.make_play(card) is not None
+    
+    def make_play(self, card: Card) -> Optional[tuple]:
+        """
+        Play a card like play_card, keeping what is needed to take it back.
+        
+        Args:
+            card: Card to play
+            
+        Returns:
+            Undo record for unmake, or None if the card can't be played
+        """
         if not self.can_play_card(card):
-            return False
+            return None
+        
+        card_index = self.hand.index(card)
+        undo = (self.elixir, self.next_card_index, card_index, self.hand[card_index])
         
         # Spend elixir
         self.elixir -= card.elixir_cost
         
         # Remove card from hand and add next card from deck
-        card_index = self.hand.index(card)
         self.hand[card_index] = self.deck[self.next_card_index % 8]
         self.next_card_index += 1
         
-        return True
+        return undo
+    
+    def make_elixir(self, amount: float) -> tuple:
+        """
+        Add elixir like add_elixir, keeping what is needed to take it back.
+        
+        Args:
+            amount: Amount of elixir to add
+            
+        Returns:
+            Undo record for unmake
+        """
+        undo = (self.elixir, self.next_card_index, -1, None)
+        self.elixir = min(self.elixir + amount, self.MAX_ELIXIR)
+        return undo
+    
+    def unmake(self, undo: tuple):
+        """
+        Take back a make_play or make_elixir.
+        
+        Records must be undone in the reverse order they were made in.
+        
+        Args:
+            undo: Record returned by make_play or make_elixir
+        """
+        self.elixir, self.next_card_index, card_index, card = undo
+        if card_index >= 0:
+            self.hand[card_index] = card
     
     def add_elixir(self, amount: float):
         """
@@ -76,6 +127,15 @@ class Player:
         """
         self.elixir = min(self.elixir + amount, self.MAX_ELIXIR)
     
+    def hand_ids(self) -> Tuple[int, ...]:
+        """
+        Get the card IDs currently in hand, in slot order.
+        
+        Returns:
+            Tuple of card IDs
+        """
+        return tuple(card.card_id for card in self.hand)
+    
     def get_playable_cards(self) -> List[Card]:
         """
         Get list of cards in hand that can be played.
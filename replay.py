@@ -0,0 +1,419 @@
+"""
+Streaming annotation of match replays with the engine's best moves.
+
+Replays are JSON-lines files with one event per line. Events of several
+matches may be interleaved; each carries its match ID::
+
+    {"type": "match", "match": "m1", "friendly_deck": [...8 names], "enemy_deck": [...]}
+    {"type": "play", "match": "m1", "side": "friendly", "card": "Giant",
+     "x": 4, "y": 14, "time": 12.5, "elixir": 7.2}
+    {"type": "tower", "match": "m1", "side": "enemy", "tower": "left", "time": 80.1}
+    {"type": "end", "match": "m1"}
+
+``elixir`` (before the play) is optional; without it, elixir regenerates at
+``Player.ELIXIR_RATE`` between a side's events. Logged plays are trusted
+over that estimate: a play it says is unaffordable is applied as if the
+side had exactly the card's cost, and the event gets a ``warning``. A
+``ReplayState`` per match
+rebuilds both ``Player`` objects and the ``Board`` as events arrive. For
+every play the state just before it is sent to the engine, which finds the
+best move and scores the move actually played. The opponent cards are the
+ones the opponent played in the last ``field_time`` seconds.
+
+``ReplayAnnotator`` reads events lazily, groups them into batches of
+``batch_size`` and runs at most ``max_pending`` batches at once in a
+process pool. Events come out in input order, each play event with an
+``annotation``::
+
+    {"best": {"card": "Hog Rider", "x": 14, "y": 14, "score": 26.5},
+     "played_score": 21.0, "gap": 5.5}
+
+Events that cannot be applied, and lines that are not JSON objects, get an
+``error`` instead. Memory is bounded
+by the in-flight batches plus the matches that have not ended, whatever
+the size of the logs.
+
+Run with ``python replay.py matches.jsonl -o annotated.jsonl --workers 4``.
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from card import Card, CARD_REGISTRY
+from board import Board, Position, Side
+from move import Move
+from player import Player
+from batch import worker_engine
+
+
+class ReplayError(ValueError):
+    """An event that does not fit the replay format or the match state."""
+
+
+def read_events(paths: Iterable[str]) -> Iterator[dict]:
+    """
+    Lazily read events from JSON-lines files.
+
+    Args:
+        paths: Replay files, read one after another
+
+    Yields:
+        Event objects, in file order (blank lines are skipped); a line that
+        is not a JSON object yields ``{'error': "<path>:<line>: <reason>"}``
+    """
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield {'error': f"{path}:{number}: {e}"}
+                    continue
+                if not isinstance(event, dict):
+                    event = {'error': f"{path}:{number}: expected a JSON object"}
+                yield event
+
+
+def _number(value, field: str) -> float:
+    """Parse a numeric event field."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ReplayError(f"{field} must be a number, not {value!r}")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ReplayError(f"{field} must be finite")
+    return value
+
+
+class ReplayState:
+    """Players, board and recent plays of one match being replayed."""
+
+    def __init__(self, friendly_deck: List[Card], enemy_deck: List[Card], field_time: float = 10.0):
+        """
+        Start a match.
+
+        Args:
+            friendly_deck: Friendly side's 8 cards
+            enemy_deck: Enemy side's 8 cards
+            field_time: Seconds a played card counts as on the field
+        """
+        self.players = {
+            Side.FRIENDLY: Player(list(friendly_deck), "friendly"),
+            Side.ENEMY: Player(list(enemy_deck), "enemy"),
+        }
+        self.board = Board()
+        self.field_time = field_time
+        self.times = {Side.FRIENDLY: 0.0, Side.ENEMY: 0.0}
+        # (time, card) of recent plays, per side
+        self.recent: Dict[Side, deque] = {Side.FRIENDLY: deque(), Side.ENEMY: deque()}
+
+    def field_cards(self, side: Side, time: float) -> List[Card]:
+        """Cards a side played within field_time seconds before a time."""
+        self._expire(side, time)
+        return [card for _, card in self.recent[side]]
+
+    def _expire(self, side: Side, time: float):
+        """Forget a side's plays older than field_time."""
+        recent = self.recent[side]
+        while recent and recent[0][0] < time - self.field_time:
+            recent.popleft()
+
+    def play(self, side: Side, card: Card, x, y, time, elixir, top_n: int) -> tuple:
+        """
+        Apply a play and return the engine job for the state before it.
+
+        The play is checked in full before anything changes, so a rejected
+        play leaves the match as it was. Without a logged elixir, a play the
+        regenerated estimate cannot afford is applied as if the side had
+        exactly the card's cost, leaving it at 0.
+
+        Args:
+            side: Side playing
+            card: Card played
+            x: X coordinate
+            y: Y coordinate
+            time: Match time of the play in seconds (None for the side's
+                last event time)
+            elixir: Elixir before the play, or None to regenerate it
+            top_n: Number of best moves to report
+
+        Returns:
+            (job for _annotate_batch, warning or None)
+
+        Raises:
+            ReplayError: If a field is not a number, the position is off the
+                board, the card is not in hand, or the logged elixir does not
+                cover its cost
+        """
+        x = _number(x, 'x')
+        y = _number(y, 'y')
+        time = self.times[side] if time is None else _number(time, 'time')
+        if not self.board.is_valid_position(Position(x, y, side)):
+            raise ReplayError(f"position ({x}, {y}) is off the board")
+        player = self.players[side]
+        warning = None
+        if elixir is None:
+            elixir = player.elixir + max(0.0, time - self.times[side]) * Player.ELIXIR_RATE
+            elixir = min(elixir, Player.MAX_ELIXIR)
+            if card in player.hand and elixir < card.elixir_cost:
+                warning = (f"estimated elixir {elixir:.2f} is below the cost of "
+                           f"{card.name}; assumed {card.elixir_cost}")
+                elixir = float(card.elixir_cost)
+        else:
+            elixir = _number(elixir, 'elixir')
+            if elixir < 0:
+                raise ReplayError(f"negative elixir: {elixir}")
+            elixir = min(elixir, Player.MAX_ELIXIR)
+        if card not in player.hand:
+            raise ReplayError(f"{card.name} is not in hand")
+        if elixir < card.elixir_cost:
+            raise ReplayError(f"{card.name} is not affordable")
+
+        opponent = Side.ENEMY if side == Side.FRIENDLY else Side.FRIENDLY
+        job = (
+            (self.board.tower_state(Side.FRIENDLY), self.board.tower_state(Side.ENEMY)),
+            side, tuple(player.deck), tuple(player.hand), elixir,
+            tuple(self.field_cards(opponent, time)), card, x, y, top_n
+        )
+        player.elixir = elixir
+        player.play_card(card)
+        self.times[side] = time
+        self._expire(side, time)
+        self.recent[side].append((time, card))
+        return job, warning
+
+    def destroy_tower(self, side: Side, tower: str):
+        """Mark a tower destroyed."""
+        if tower not in Board.TOWER_NAMES:
+            raise ReplayError(f"unknown tower: {tower!r}")
+        self.board.destroy_tower(side, tower)
+
+
+def _annotate_batch(jobs: List[Optional[tuple]]) -> List[Optional[dict]]:
+    """
+    Annotate a batch of plays (process pool entry point).
+
+    Args:
+        jobs: Jobs from ReplayState.play (None entries pass through)
+
+    Returns:
+        Annotation per job (None for None jobs)
+    """
+    annotations = []
+    for job in jobs:
+        if job is None:
+            annotations.append(None)
+            continue
+        towers, side, deck, hand, elixir, opponent_cards, card, x, y, top_n = job
+        player = Player(list(deck))
+        player.hand = list(hand)
+        player.elixir = elixir
+        engine = worker_engine(towers)
+        opponents = list(opponent_cards) or None
+        best = engine.find_best_move(player, side, opponents, top_n=top_n)
+        played = engine.evaluate_move(Move(card, Position(x, y, side)), side, opponents)
+        annotation = {
+            'best': [
+                {'card': move.card.name, 'x': move.position.x, 'y': move.position.y,
+                 'score': round(move.score, 4)}
+                for move in best
+            ],
+            'played_score': round(played, 4),
+            'gap': round(best[0].score - played, 4) if best else None,
+        }
+        if top_n == 1:
+            annotation['best'] = annotation['best'][0] if best else None
+        annotations.append(annotation)
+    return annotations
+
+
+class ReplayAnnotator:
+    """
+    Streams replay events through the engine in bounded parallel batches.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        batch_size: int = 256,
+        max_pending: Optional[int] = None,
+        top_n: int = 1,
+        field_time: float = 10.0,
+        find_card: Callable[[str], Optional[Card]] = CARD_REGISTRY.find
+    ):
+        """
+        Initialize the annotator.
+
+        Args:
+            workers: Number of worker processes (1 annotates in-process)
+            batch_size: Events per batch sent to a worker
+            max_pending: Batches in flight at once (2 * workers if None)
+            top_n: Number of best moves per play
+            field_time: Seconds a played card counts as on the field
+            find_card: Resolves card names (e.g. CardDatabase.get)
+        """
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * max(1, workers)
+        self.top_n = top_n
+        self.field_time = field_time
+        self.find_card = find_card
+        self.matches: Dict[str, ReplayState] = {}
+        self.events = 0
+        self.plays = 0
+        self.warnings = 0
+        self.errors = 0
+
+    def _card(self, name) -> Card:
+        """Resolve a card name."""
+        card = self.find_card(name) if isinstance(name, str) else None
+        if card is None:
+            raise ReplayError(f"unknown card: {name!r}")
+        return card
+
+    def _apply(self, event: dict) -> Tuple[Optional[tuple], Optional[str]]:
+        """Apply one event to its match; the engine job and warning for plays."""
+        kind = event.get('type')
+        match = event.get('match')
+        if not isinstance(match, (str, int)):
+            raise ReplayError(f"match ID must be a string or integer: {match!r}")
+        if kind == 'match':
+            decks = []
+            for field in ('friendly_deck', 'enemy_deck'):
+                names = event.get(field)
+                if not isinstance(names, list) or len(names) != 8:
+                    raise ReplayError(f"{field} must list 8 cards")
+                decks.append([self._card(name) for name in names])
+            self.matches[match] = ReplayState(decks[0], decks[1], self.field_time)
+            return None, None
+        if kind == 'end':
+            self.matches.pop(match, None)
+            return None, None
+        state = self.matches.get(match)
+        if state is None:
+            raise ReplayError(f"event for unknown match {match!r}")
+        try:
+            side = Side(event.get('side'))
+        except (TypeError, ValueError):
+            raise ReplayError(f"unknown side: {event.get('side')!r}") from None
+        if kind == 'tower':
+            state.destroy_tower(side, event.get('tower'))
+            return None, None
+        if kind == 'play':
+            return state.play(side, self._card(event.get('card')), event.get('x'), event.get('y'),
+                              event.get('time'), event.get('elixir'), self.top_n)
+        raise ReplayError(f"unknown event type: {kind!r}")
+
+    def _batches(self, events: Iterable[dict]) -> Iterator[Tuple[List[dict], List[Optional[tuple]]]]:
+        """Apply events in order and group them with their jobs."""
+        batch: List[dict] = []
+        jobs: List[Optional[tuple]] = []
+        for event in events:
+            self.events += 1
+            job = None
+            if 'error' in event:
+                # A line read_events could not parse
+                self.errors += 1
+            else:
+                try:
+                    job, warning = self._apply(event)
+                except ReplayError as e:
+                    event = dict(event, error=str(e))
+                    self.errors += 1
+                else:
+                    if warning is not None:
+                        event = dict(event, warning=warning)
+                        self.warnings += 1
+            if job is not None:
+                self.plays += 1
+            batch.append(event)
+            jobs.append(job)
+            if len(batch) >= self.batch_size:
+                yield batch, jobs
+                batch, jobs = [], []
+        if batch:
+            yield batch, jobs
+
+    def annotate(self, events: Iterable[dict]) -> Iterator[dict]:
+        """
+        Annotate a stream of events.
+
+        Args:
+            events: Replay events (e.g. read_events(paths))
+
+        Yields:
+            Every event, in input order; plays gain an 'annotation'
+        """
+        if self.workers <= 1:
+            for batch, jobs in self._batches(events):
+                yield from self._merge(batch, _annotate_batch(jobs))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for batch, jobs in self._batches(events):
+                if len(pending) >= self.max_pending:
+                    done_batch, future = pending.popleft()
+                    yield from self._merge(done_batch, future.result())
+                pending.append((batch, pool.submit(_annotate_batch, jobs)))
+            while pending:
+                done_batch, future = pending.popleft()
+                yield from self._merge(done_batch, future.result())
+
+    @staticmethod
+    def _merge(batch: List[dict], annotations: List[Optional[dict]]) -> Iterator[dict]:
+        """Attach annotations to their events."""
+        for event, annotation in zip(batch, annotations):
+            if annotation is not None:
+                event = dict(event, annotation=annotation)
+            yield event
+
+    def run(self, paths: Iterable[str], output) -> dict:
+        """
+        Annotate replay files into a JSON-lines stream.
+
+        Args:
+            paths: Replay files
+            output: Writable text file
+
+        Returns:
+            Counters: events, plays annotated, warnings, errors
+        """
+        for event in self.annotate(read_events(paths)):
+            output.write(json.dumps(event) + "\n")
+        return {'events': self.events, 'plays': self.plays, 'warnings': self.warnings,
+                'errors': self.errors}
+
+    def __repr__(self) -> str:
+        return (f"ReplayAnnotator({self.events} events, {self.plays} plays, "
+                f"{len(self.matches)} open matches)")
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Annotate replays with the engine's best moves")
+    parser.add_argument('replays', nargs='+', help="JSON-lines replay files")
+    parser.add_argument('-o', '--output', help="output file (stdout if omitted)")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--top-n', type=int, default=1)
+    args = parser.parse_args()
+
+    annotator = ReplayAnnotator(workers=args.workers, batch_size=args.batch_size, top_n=args.top_n)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            counts = annotator.run(args.replays, output)
+    else:
+        counts = annotator.run(args.replays, sys.stdout)
+    print(f"Annotated {counts['plays']} plays in {counts['events']} events "
+          f"({counts['warnings']} warnings, {counts['errors']} errors)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+Multi-ply lookahead search over elixir timelines.
+
+The search alternates plays between the two players. On each ply the side
+to move either deploys a card or waits, after which the clock advances and
+both players regenerate elixir. Lines are scored as the difference between
+the evaluation scores of the moves each side made plus a small elixir term,
+and explored with negamax and alpha-beta pruning.
+"""
+
+import copy
+import time
+from typing import List, Optional, Tuple
+
+from card import Card
+from board import Side
+from move import Move
+from opponent import CardDistribution
+from player import Player
+from tables import ScoreTables
+from zobrist import ZOBRIST, TranspositionTable
+
+
+class SearchAborted(Exception):
+    """Raised internally when the node budget or deadline is exhausted."""
+
+
+class SearchResult:
+    """Outcome of a search."""
+
+    def __init__(
+        self,
+        best_move: Optional[Move],
+        score: float,
+        depth: int,
+        nodes: int,
+        elapsed: float,
+        principal_variation: List[Optional[Move]],
+        completed: bool
+    ):
+        """
+        Initialize a search result.
+
+        Args:
+            best_move: Best root move (None means waiting is best)
+            score: Search value of the best move for the root side
+            depth: Depth in plies that was searched
+            nodes: Number of nodes visited
+            elapsed: Wall-clock time spent in seconds
+            principal_variation: Expected line of play (None entries are waits)
+            completed: False if the budget ran out before the search finished
+        """
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.principal_variation = principal_variation
+        self.completed = completed
+
+    @property
+    def nodes_per_second(self) -> float:
+        """Search speed in nodes per second."""
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"SearchResult({self.best_move}, score={self.score:.2f}, "
+                f"depth={self.depth}, nodes={self.nodes})")
+
+
+class SearchState:
+    """Both players, the side to move, the last card each side played and the state hash."""
+
+    def __init__(self, players: dict, to_move: Side, last_played: dict, key: int = 0):
+        self.players = players
+        self.to_move = to_move
+        self.last_played = last_played
+        self.key = key
+
+    def copy(self) -> 'SearchState':
+        """Copy the state deeply enough for play_card/add_elixir to be safe."""
+        players = {}
+        for side, player in self.players.items():
+            clone = copy.copy(player)
+            clone.hand = list(player.hand)
+            players[side] = clone
+        return SearchState(players, self.to_move, dict(self.last_played), self.key)
+
+    def make(self, card: Optional[Card], time_step: float) -> tuple:
+        """
+        Play a card (or wait) for the side to move and let time pass, in place.
+
+        Args:
+            card: Card to play, or None to wait
+            time_step: Seconds of game time that pass
+
+        Returns:
+            Undo record for unmake
+        """
+        mover = self.to_move
+        previous = self.last_played[mover]
+        played = None
+        if card is not None:
+            played = self.players[mover].make_play(card)
+            self.last_played[mover] = card
+        elixir = [
+            player.make_elixir(time_step * player.ELIXIR_RATE)
+            for player in self.players.values()
+        ]
+        self.to_move = other_side(mover)
+        return (mover, previous, played, elixir, self.key)
+
+    def unmake(self, undo: tuple):
+        """
+        Take back a make.
+
+        Args:
+            undo: Record returned by make (undo records in reverse order)
+        """
+        mover, previous, played, elixir, key = undo
+        for player, record in zip(self.players.values(), elixir):
+            player.unmake(record)
+        if played is not None:
+            self.players[mover].unmake(played)
+        self.last_played[mover] = previous
+        self.to_move = mover
+        self.key = key
+
+
+def other_side(side: Side) -> Side:
+    """Get the opposing side."""
+    return Side.ENEMY if side == Side.FRIENDLY else Side.FRIENDLY
+
+
+def root_context(opponent_cards) -> Optional[List[Card]]:
+    """
+    Normalize the opponent cards a search starts from.
+
+    Args:
+        opponent_cards: Cards on the field, a CardDistribution, or None
+
+    Returns:
+        A list copy of the cards, the distribution itself (the evaluator
+        scores it as an expectation), or None if there are none
+    """
+    if not opponent_cards:
+        return None
+    if isinstance(opponent_cards, CardDistribution):
+        return opponent_cards
+    return list(opponent_cards)
+
+
+class Searcher:
+    """
+    Alpha-beta search over sequences of plays by both sides.
+
+    Each ply advances the clock by ``time_step`` seconds. Per card only the
+    ``positions_per_card`` best positions (by static score) are considered,
+    which keeps the branching factor close to the hand size.
+    """
+
+    # Check the clock once every this many nodes
+    DEADLINE_CHECK_INTERVAL = 16
+
+    def __init__(
+        self,
+        engine,
+        time_step: float = 2.0,
+        positions_per_card: int = 1,
+        elixir_weight: float = 2.0
+    ):
+        """
+        Initialize the searcher.
+
+        Args:
+            engine: Engine providing the board and move evaluation
+            time_step: Seconds of game time per ply
+            positions_per_card: Candidate positions considered per card
+            elixir_weight: Value of one elixir of advantage at the horizon
+        """
+        self.engine = engine
+        self.time_step = time_step
+        self.positions_per_card = positions_per_card
+        self.elixir_weight = elixir_weight
+        self.tables = engine.score_tables or ScoreTables(engine)
+        self.tt: Optional[TranspositionTable] = engine.transposition_table
+        # Values depend on the search parameters, so they are part of every key
+        self.config_key = ZOBRIST.key('search', time_step, positions_per_card, elixir_weight)
+        self.nodes = 0
+        self.node_limit: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.pv_hint: List[Optional[Move]] = []
+        self.killers: dict = {}
+
+    def search(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        depth: int = 4,
+        node_limit: Optional[int] = None,
+        time_limit: Optional[float] = None
+    ) -> SearchResult:
+        """
+        Search for the best move for a player.
+
+        Args:
+            player: Player to move
+            opponent: Opposing player (their hand and elixir are searched too)
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            depth: Number of plies to look ahead
+            node_limit: Maximum number of nodes to visit
+            time_limit: Maximum wall-clock seconds to spend
+
+        Returns:
+            Search result for the root player
+        """
+        start = time.perf_counter()
+        self._reset(node_limit, time_limit, start)
+        state, root_moves = self._root(player, opponent, side, opponent_cards)
+
+        best_move, best_score, best_line, completed, _ = self._search_root(
+            state, root_moves, depth
+        )
+        if not best_line:
+            # Nothing finished: fall back to the best static move
+            best_move = root_moves[0]
+            best_score = best_move.score if best_move is not None else 0.0
+            best_line = [best_move]
+
+        return self._result(best_move, best_score, depth, start, best_line, completed)
+
+    def iterative_deepening(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]] = None,
+        time_budget: Optional[float] = 0.05,
+        max_depth: int = 32,
+        node_limit: Optional[int] = None
+    ) -> SearchResult:
+        """
+        Search one ply deeper at a time until the budget runs out.
+
+        Each iteration starts from the previous iteration's root move order,
+        principal variation and killer moves, so deeper passes prune more.
+        The move from the deepest fully completed iteration is returned.
+
+        Args:
+            player: Player to move
+            opponent: Opposing player
+            side: Which side the player is on
+            opponent_cards: Opponent cards already on the field, or a
+                CardDistribution (if any)
+            time_budget: Wall-clock seconds available (None for no limit)
+            max_depth: Deepest iteration to run
+            node_limit: Maximum number of nodes over all iterations
+
+        Returns:
+            Search result whose depth is the deepest completed iteration
+        """
+        start = time.perf_counter()
+        self._reset(node_limit, time_budget, start)
+        state, root_moves = self._root(player, opponent, side, opponent_cards)
+
+        # Anytime answer before the first iteration completes
+        best_move = root_moves[0]
+        best_score = best_move.score if best_move is not None else 0.0
+        best_line: List[Optional[Move]] = [best_move]
+        depth_reached = 0
+
+        for depth in range(1, max_depth + 1):
+            self.pv_hint = best_line
+            move, score, line, completed, values = self._search_root(
+                state, root_moves, depth
+            )
+            if not completed:
+                break
+            best_move, best_score, best_line = move, score, line
+            depth_reached = depth
+
+            # Search the strongest root moves first next time
+            order = sorted(range(len(root_moves)), key=lambda i: values[i], reverse=True)
+            root_moves = [root_moves[i] for i in order]
+
+        return self._result(
+            best_move, best_score, depth_reached, start, best_line,
+            depth_reached == max_depth
+        )
+
+    def _reset(self, node_limit: Optional[int], time_limit: Optional[float], start: float):
+        """Reset counters, budgets and move ordering hints for a new search."""
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.pv_hint = []
+        self.killers = {}
+        if self.tt is not None:
+            self.tt.new_search()
+
+    def _root(
+        self,
+        player: Player,
+        opponent: Player,
+        side: Side,
+        opponent_cards: Optional[List[Card]]
+    ) -> Tuple[SearchState, List[Optional[Move]]]:
+        """Build the root search state and its ordered moves."""
+        state = SearchState(
+            {side: player, other_side(side): opponent},
+            side,
+            {side: None, other_side(side): None}
+        ).copy()
+        state.key = ZOBRIST.state_hash(state.players, self.engine.board, side) ^ self.config_key
+        return state, self._ordered_moves(state, root_context(opponent_cards))
+
+    def _result(
+        self,
+        best_move: Optional[Move],
+        best_score: float,
+        depth: int,
+        start: float,
+        best_line: List[Optional[Move]],
+        completed: bool
+    ) -> SearchResult:
+        """Package the search outcome, re-scoring the best move with its search value."""
+        if best_move is not None:
+            best_move = Move(best_move.card, best_move.position, best_score)
+        return SearchResult(
+            best_move,
+            best_score,
+            depth,
+            self.nodes,
+            time.perf_counter() - start,
+            best_line,
+            completed
+        )
+
+    def _search_root(
+        self,
+        state: SearchState,
+        root_moves: List[Optional[Move]],
+        depth: int
+    ) -> Tuple[Optional[Move], float, List[Optional[Move]], bool, List[float]]:
+        """
+        Search every root move to a fixed depth.
+
+        Returns:
+            Tuple of (best move, best score, principal variation, completed,
+            value of each root move)
+        """
+        best_move = None
+        best_score = float('-inf')
+        best_line: List[Optional[Move]] = []
+        values = [float('-inf')] * len(root_moves)
+        alpha = float('-inf')
+        beta = float('inf')
+        pv_move = self.pv_hint[0] if self.pv_hint else None
+        try:
+            self._count_node()
+            for i, move in enumerate(root_moves):
+                on_pv = bool(self.pv_hint) and move == pv_move
+                value, line = self._search_child(
+                    state, move, depth - 1, -beta, -alpha, 1, on_pv
+                )
+                values[i] = value
+                if value > best_score:
+                    best_score = value
+                    best_move = move
+                    best_line = [move] + line
+                alpha = max(alpha, value)
+        except SearchAborted:
+            return best_move, best_score, best_line, False, values
+        return best_move, best_score, best_line, True, values
+
+    def _count_node(self):
+        """Count a node and abort if the budget is exhausted."""
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchAborted()
+        if (self.deadline is not None and
+                self.nodes % self.DEADLINE_CHECK_INTERVAL == 0 and
+                time.perf_counter() >= self.deadline):
+            raise SearchAborted()
+
+    def _search_child(
+        self,
+        state: SearchState,
+        move: Optional[Move],
+        depth: int,
+        alpha: float,
+        beta: float,
+        ply: int,
+        on_pv: bool
+    ) -> Tuple[float, List[Optional[Move]]]:
+        """Make a move on the state, search the resulting position and unmake it."""
+        mover = state.to_move
+        key = state.key ^ ZOBRIST.to_move_key(mover) ^ ZOBRIST.to_move_key(other_side(mover))
+        gained = 0.0
+        card = None
+        if move is not None:
+            card = move.card
+            key ^= ZOBRIST.play_delta(mover, state.players[mover], card)
+            key ^= ZOBRIST.last_played_key(mover, state.last_played[mover])
+            key ^= ZOBRIST.last_played_key(mover, card)
+            gained = move.score
+        for side, player in state.players.items():
+            key ^= ZOBRIST.elixir_key(side, player.elixir)
+
+        undo = state.make(card, self.time_step)
+        try:
+            for side, player in state.players.items():
+                key ^= ZOBRIST.elixir_key(side, player.elixir)
+            state.key = key
+            value, line = self._negamax(state, depth, alpha, beta, ply, on_pv)
+        finally:
+            state.unmake(undo)
+        return gained - value, line
+
+    def _negamax(
+        self,
+        state: SearchState,
+        depth: int,
+        alpha: float,
+        beta: float,
+        ply: int,
+        on_pv: bool
+    ) -> Tuple[float, List[Optional[Move]]]:
+        """Negamax with alpha-beta pruning from the perspective of the side to move."""
+        self._count_node()
+        if depth <= 0:
+            return self._evaluate_leaf(state), []
+
+        tt = self.tt
+        tt_move = None
+        has_tt_move = False
+        original_alpha = alpha
+        if tt is not None:
+            entry = tt.probe(state.key)
+            if entry is not None:
+                entry_depth, value, flag, tt_move = entry
+                has_tt_move = True
+                if entry_depth >= depth:
+                    if flag == TranspositionTable.EXACT:
+                        return value, [tt_move]
+                    if flag == TranspositionTable.LOWER_BOUND:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if alpha >= beta:
+                        return value, [tt_move]
+
+        last = state.last_played[other_side(state.to_move)]
+        context = [last] if last is not None else None
+        moves = self._apply_hints(
+            self._ordered_moves(state, context), ply, on_pv,
+            [tt_move] if has_tt_move else []
+        )
+        pv_move = self.pv_hint[ply] if on_pv and ply < len(self.pv_hint) else None
+
+        best = float('-inf')
+        best_line: List[Optional[Move]] = []
+        for move in moves:
+            child_on_pv = on_pv and ply < len(self.pv_hint) and move == pv_move
+            value, line = self._search_child(
+                state, move, depth - 1, -beta, -alpha, ply + 1, child_on_pv
+            )
+            if value > best:
+                best = value
+                best_line = [move] + line
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self._record_killer(move, ply)
+                break
+
+        if tt is not None:
+            if best <= original_alpha:
+                flag = TranspositionTable.UPPER_BOUND
+            elif best >= beta:
+                flag = TranspositionTable.LOWER_BOUND
+            else:
+                flag = TranspositionTable.EXACT
+            tt.store(state.key, depth, best, flag, best_line[0])
+        return best, best_line
+
+    def _apply_hints(
+        self,
+        moves: List[Optional[Move]],
+        ply: int,
+        on_pv: bool,
+        hints: List[Optional[Move]]
+    ) -> List[Optional[Move]]:
+        """Move the table move, previous principal variation move and killers to the front."""
+        hints = list(hints)
+        if on_pv and ply < len(self.pv_hint):
+            hints.append(self.pv_hint[ply])
+        hints.extend(self.killers.get(ply, ()))
+        if not hints:
+            return moves
+
+        front = []
+        for hint in hints:
+            for i, move in enumerate(moves):
+                if move == hint and move not in front:
+                    front.append(moves.pop(i))
+                    break
+        return front + moves
+
+    def _record_killer(self, move: Optional[Move], ply: int):
+        """Remember a move that caused a beta cutoff at this ply (two slots)."""
+        killers = self.killers.setdefault(ply, [])
+        if move in killers:
+            return
+        killers.insert(0, move)
+        del killers[2:]
+
+    def _evaluate_leaf(self, state: SearchState) -> float:
+        """Score the elixir balance at the horizon for the side to move."""
+        mover = state.players[state.to_move]
+        other = state.players[other_side(state.to_move)]
+        return self.elixir_weight * (mover.elixir - other.elixir)
+
+    def _ordered_moves(
+        self,
+        state: SearchState,
+        opponent_cards: Optional[List[Card]]
+    ) -> List[Optional[Move]]:
+        """
+        Candidate moves for the side to move, best first, ending with a wait.
+
+        Args:
+            state: Current search state
+            opponent_cards: Cards the mover is responding to (if any)
+
+        Returns:
+            Scored moves followed by None (waiting)
+        """
+        side = state.to_move
+        player = state.players[side]
+        engine = self.engine
+        moves = []
+        seen = set()
+        for card in player.get_playable_cards():
+            if card in seen:
+                continue
+            seen.add(card)
+            positions, prefixes, strategies = self.tables.lookup(card, side)
+            counters = engine._evaluate_counters(card, opponent_cards) if opponent_cards else None
+            scored = []
+            for position, prefix, strategy in zip(positions, prefixes, strategies):
+                if counters is None:
+                    score = prefix + strategy
+                else:
+                    score = prefix + counters + strategy
+                scored.append(Move(card, position, score))
+            scored.sort(reverse=True)
+            moves.extend(scored[:self.positions_per_card])
+        moves.sort(reverse=True)
+        moves.append(None)
+        return moves
@@ -0,0 +1,355 @@
+"""
+Asyncio analysis server speaking a JSON-lines protocol.
+
+Each line a client sends is one request object; each line the server sends
+back is the matching response, tagged with the request's ``id``. Responses
+on a connection may arrive out of order.
+
+Request fields::
+
+    {"id": 1,
+     "deck": ["Knight", "Archers", ...],    # 8 card names
+     "hand": ["Knight", ...],               # optional, defaults to deck[:4]
+     "elixir": 6.5,                         # optional, defaults to 5
+     "side": "friendly",                    # optional
+     "opponent_cards": ["Giant"],           # optional
+     "destroyed_towers": {"enemy": ["left"]},  # optional
+     "top_n": 3}                            # optional, defaults to 1
+
+Response: ``{"id": 1, "moves": [{"card": ..., "x": ..., "y": ..., "score": ...}]}``
+or ``{"id": 1, "error": "..."}``.
+
+Engine work runs in a worker pool. Identical requests that are in flight at
+the same time (same hand, elixir, side, towers, opponent cards and top_n)
+share one computation. At most ``max_pending`` requests are admitted at
+once; beyond that the server stops reading from the connection until a slot
+frees up (or answers ``overloaded`` after ``queue_timeout`` seconds).
+
+Run with ``python server.py --port 8765``.
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from card import Card, CARD_REGISTRY
+from board import Board, Side
+from move import Move
+from player import Player
+from batch import worker_engine
+
+
+class RequestError(ValueError):
+    """A request that cannot be analyzed."""
+
+
+def _analyze(job) -> List[Move]:
+    """Find the best moves for one request in a worker."""
+    towers, side, deck, hand, elixir, opponent_cards, top_n = job
+    player = Player(list(deck))
+    player.hand = list(hand)
+    player.elixir = elixir
+    engine = worker_engine(towers)
+    return engine.find_best_move(player, side, list(opponent_cards) or None, top_n=top_n)
+
+
+class AnalysisServer:
+    """
+    JSON-lines analysis server with request coalescing and backpressure.
+    """
+
+    MAX_TOP_N = 20
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_pending: int = 64,
+        queue_timeout: Optional[float] = None,
+        executor: Optional[Executor] = None
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            workers: Number of worker processes (1 uses a single worker thread)
+            max_pending: Maximum number of requests admitted at once
+            queue_timeout: Seconds a request may wait for a slot before it is
+                rejected as overloaded (None waits indefinitely)
+            executor: Pool to run engine work in (overrides ``workers``)
+        """
+        if executor is None:
+            if workers <= 1:
+                executor = ThreadPoolExecutor(max_workers=1)
+            else:
+                executor = ProcessPoolExecutor(max_workers=workers)
+        self.executor = executor
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_pending)
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.requests = 0
+        self.computations = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        """
+        Start listening for connections.
+
+        Args:
+            host: Interface to bind
+            port: TCP port (0 picks a free port)
+
+        Returns:
+            The underlying asyncio server
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self):
+        """Stop listening, drop open connections and shut the worker pool down."""
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._connections):
+            writer.transport.abort()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def handle_request(self, request: dict) -> dict:
+        """
+        Answer one request without going through a socket.
+
+        Args:
+            request: Decoded request object
+
+        Returns:
+            Response object
+        """
+        request_id = request.get('id') if isinstance(request, dict) else None
+        self.requests += 1
+        try:
+            key, job = self._parse(request)
+        except RequestError as e:
+            return {'id': request_id, 'error': str(e)}
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, _analyze, job)
+            self.computations += 1
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        try:
+            moves = await asyncio.shield(future)
+        except Exception as e:
+            return {'id': request_id, 'error': f"analysis failed: {e}"}
+        return {
+            'id': request_id,
+            'moves': [
+                {'card': move.card.name, 'x': move.position.x,
+                 'y': move.position.y, 'score': move.score}
+                for move in moves
+            ]
+        }
+
+    def stats(self) -> dict:
+        """Get request counters."""
+        return {
+            'requests': self.requests,
+            'computations': self.computations,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'in_flight': len(self._in_flight)
+        }
+
+    def _parse(self, request: dict) -> Tuple[tuple, tuple]:
+        """
+        Validate a request and build its coalescing key and worker job.
+
+        Raises:
+            RequestError: If a field is missing or invalid
+        """
+        if not isinstance(request, dict):
+            raise RequestError("request must be a JSON object")
+        deck = self._cards(request.get('deck'), 'deck')
+        if len(deck) != 8:
+            raise RequestError("deck must contain exactly 8 cards")
+        hand = self._cards(request.get('hand', [c.name for c in deck[:Player.HAND_SIZE]]), 'hand')
+        if len(hand) != Player.HAND_SIZE:
+            raise RequestError(f"hand must contain exactly {Player.HAND_SIZE} cards")
+        opponent_cards = self._cards(request.get('opponent_cards', []), 'opponent_cards')
+
+        try:
+            side = Side(request.get('side', Side.FRIENDLY.value))
+        except ValueError:
+            raise RequestError(f"unknown side: {request.get('side')!r}")
+        try:
+            elixir = min(float(request.get('elixir', Player.STARTING_ELIXIR)), Player.MAX_ELIXIR)
+            top_n = int(request.get('top_n', 1))
+        except (TypeError, ValueError):
+            raise RequestError("elixir and top_n must be numbers")
+        if not 1 <= top_n <= self.MAX_TOP_N:
+            raise RequestError(f"top_n must be between 1 and {self.MAX_TOP_N}")
+
+        towers = self._tower_states(request.get('destroyed_towers', {}))
+        key = (
+            towers, side.value,
+            tuple(card.card_id for card in hand),
+            elixir,
+            tuple(card.card_id for card in opponent_cards),
+            top_n
+        )
+        job = (towers, side, tuple(deck), tuple(hand), elixir, tuple(opponent_cards), top_n)
+        return key, job
+
+    @staticmethod
+    def _cards(names, field: str) -> List[Card]:
+        """Resolve a list of card names through the registry."""
+        if not isinstance(names, list):
+            raise RequestError(f"{field} must be a list of card names")
+        cards = []
+        for name in names:
+            card = CARD_REGISTRY.find(name) if isinstance(name, str) else None
+            if card is None:
+                raise RequestError(f"unknown card in {field}: {name!r}")
+            cards.append(card)
+        return cards
+
+    @staticmethod
+    def _tower_states(destroyed) -> Tuple[int, int]:
+        """Turn a {side: [tower names]} mapping into tower state bitmasks."""
+        if not isinstance(destroyed, dict):
+            raise RequestError("destroyed_towers must be an object")
+        states = []
+        for side in (Side.FRIENDLY, Side.ENEMY):
+            state = (1 << len(Board.TOWER_NAMES)) - 1
+            for name in destroyed.get(side.value, []):
+                if name not in Board.TOWER_NAMES:
+                    raise RequestError(f"unknown tower: {name!r}")
+                state &= ~(1 << Board.TOWER_NAMES.index(name))
+            states.append(state)
+        return tuple(states)
+
+    async def _acquire_slot(self) -> bool:
+        """Wait for an admission slot; False if the wait timed out."""
+        if self.queue_timeout is None or not self._slots.locked():
+            await self._slots.acquire()
+            return True
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one client until it disconnects."""
+        self._connections[writer] = asyncio.current_task()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Not reading further lines while no slot is free pushes
+                # back on the client through TCP flow control
+                if not await self._acquire_slot():
+                    self.rejected += 1
+                    await self._write(writer, {'id': self._request_id(line), 'error': 'overloaded'})
+                    continue
+                task = asyncio.create_task(self._serve_line(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            self._connections.pop(writer, None)
+
+    async def _serve_line(self, line: bytes, writer: asyncio.StreamWriter):
+        """Answer one request line, then free its slot."""
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.requests += 1
+                response = {'id': None, 'error': 'invalid JSON'}
+            else:
+                response = await self.handle_request(request)
+            await self._write(writer, response)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _request_id(line: bytes):
+        """Best-effort request id of a line that will not be parsed further."""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        return request.get('id') if isinstance(request, dict) else None
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: dict):
+        """Send one response line."""
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+
+async def serve(
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    workers: int = 1,
+    max_pending: int = 64,
+    queue_timeout: Optional[float] = None
+):
+    """
+    Run an analysis server until cancelled.
+
+    Args:
+        host: Interface to bind
+        port: TCP port
+        workers: Number of worker processes
+        max_pending: Maximum number of requests admitted at once
+        queue_timeout: Seconds to wait for a slot before rejecting
+    """
+    server = AnalysisServer(workers, max_pending, queue_timeout)
+    listener = await server.start(host, port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Clash Royale engine analysis server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-pending', type=int, default=64)
+    parser.add_argument('--queue-timeout', type=float, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers,
+                          args.max_pending, args.queue_timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+"""
+Deterministic fixed-timestep match simulator for self-play.
+
+The simulator advances a match in ticks of ``tick`` seconds. It drives
+Player elixir and card cycling, spawns a unit for every troop or building
+played, walks troops along their lane over the bridge, resolves targeting
+from the card's TargetType, range, hit speed and splash radius, and
+destroys towers on the shared Board when their hitpoints run out.
+
+Units and crown towers live in a ``UnitStore`` (parallel arrays with a
+spatial hash), so target and splash queries stay cheap with many units on
+the field.
+
+Cards carry no hitpoints or movement speed, so units derive them from the
+elixir cost and card type (see the class constants on ``MatchSimulator``).
+Every unit is a ground unit. Matches are fully deterministic for a given
+seed and pair of policies.
+
+A policy is any callable ``policy(sim, side) -> Optional[Move]``; it is
+asked for a play every ``decision_interval`` seconds of game time.
+"""
+
+import math
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from card import Card, CardType, CARD_REGISTRY
+from board import Board, Position, Side
+from move import Move
+from player import Player
+from units import UnitStore, BUILDING, TOWER, TARGET_MOBILE
+
+
+Policy = Callable[['MatchSimulator', Side], Optional[Move]]
+
+# Side <-> UnitStore side index
+SIDES = (Side.FRIENDLY, Side.ENEMY)
+SIDE_INDEX = {Side.FRIENDLY: 0, Side.ENEMY: 1}
+
+
+class MatchResult:
+    """Outcome of a simulated match."""
+
+    def __init__(
+        self,
+        winner: Optional[Side],
+        crowns: Dict[Side, int],
+        tower_hp: Dict[Side, float],
+        duration: float,
+        ticks: int,
+        cards_played: Dict[Side, int]
+    ):
+        """
+        Initialize a result.
+
+        Args:
+            winner: Winning side (None for a draw)
+            crowns: Towers destroyed by each side
+            tower_hp: Remaining tower hitpoints of each side
+            duration: Game time played in seconds
+            ticks: Number of simulated ticks
+            cards_played: Cards played by each side
+        """
+        self.winner = winner
+        self.crowns = crowns
+        self.tower_hp = tower_hp
+        self.duration = duration
+        self.ticks = ticks
+        self.cards_played = cards_played
+
+    def outcome(self, side: Side) -> float:
+        """
+        Score of the match for one side.
+
+        Returns:
+            1.0 for a win, 0.5 for a draw, 0.0 for a loss
+        """
+        if self.winner is None:
+            return 0.5
+        return 1.0 if self.winner == side else 0.0
+
+    def __repr__(self) -> str:
+        winner = self.winner.value if self.winner else "draw"
+        return (f"MatchResult({winner}, crowns={self.crowns[Side.FRIENDLY]}-"
+                f"{self.crowns[Side.ENEMY]}, {self.duration:.1f}s)")
+
+
+class MatchSimulator:
+    """
+    Fixed-timestep simulation of one match between two policies.
+    """
+
+    # Match timing
+    MATCH_DURATION = 180.0
+    DOUBLE_ELIXIR_TIME = 120.0
+
+    # Unit stats derived from cards
+    TROOP_HP_PER_ELIXIR = 300
+    BUILDING_HP_PER_ELIXIR = 350
+    BUILDING_LIFETIME = 30.0
+    TROOP_SPEED = 1.0  # Tiles per second
+    MELEE_RANGE = 1.0
+    SIGHT_RANGE = 5.5
+    DEPLOY_TIME = 1.0
+    RETARGET_INTERVAL = 0.3  # Seconds between searches with nothing in sight
+
+    # Towers
+    KING_TOWER_HP = 4000
+    PRINCESS_TOWER_HP = 2500
+    TOWER_DAMAGE = 90
+    TOWER_HIT_SPEED = 0.8
+    TOWER_RANGE = 7.5
+    # Spells deal reduced damage to crown towers
+    SPELL_TOWER_FACTOR = 0.35
+
+    # Lanes (x coordinate of each bridge)
+    LEFT_LANE_X = 4.0
+    RIGHT_LANE_X = 14.0
+
+    def __init__(
+        self,
+        friendly_deck: List[Card],
+        enemy_deck: List[Card],
+        friendly_policy: Policy,
+        enemy_policy: Policy,
+        seed: int = 0,
+        tick: float = 0.1,
+        decision_interval: float = 1.0,
+        duration: float = MATCH_DURATION,
+        board: Optional[Board] = None
+    ):
+        """
+        Set up a match.
+
+        Args:
+            friendly_deck: 8 cards of the friendly player
+            enemy_deck: 8 cards of the enemy player
+            friendly_policy: Policy playing the friendly side
+            enemy_policy: Policy playing the enemy side
+            seed: Seed for deck shuffling and randomized policies
+            tick: Seconds of game time per tick
+            decision_interval: Seconds between policy decisions
+            duration: Match length in seconds
+            board: Board whose towers are damaged (creates new if None)
+        """
+        self.random = random.Random(seed)
+        self.board = board or Board()
+        self.tick = tick
+        self.decision_interval = decision_interval
+        self.duration = duration
+        self.policies = {Side.FRIENDLY: friendly_policy, Side.ENEMY: enemy_policy}
+
+        self.players: Dict[Side, Player] = {}
+        for side, deck, name in ((Side.FRIENDLY, friendly_deck, "Friendly"),
+                                 (Side.ENEMY, enemy_deck, "Enemy")):
+            deck = list(deck)
+            self.random.shuffle(deck)
+            self.players[side] = Player(deck, name)
+
+        self.store = UnitStore()
+        # Tower slot indices by side and name, and the reverse mapping
+        self.towers: Dict[Side, Dict[str, int]] = {}
+        self._tower_names: Dict[int, Tuple[Side, str]] = {}
+        # King towers that have not woken up yet
+        self._dormant = set()
+        for side in SIDES:
+            standing = self.board.get_towers(side)
+            self.towers[side] = {}
+            for name, position in zip(Board.TOWER_NAMES, self._tower_positions(side)):
+                if standing[name]:
+                    self._add_tower(side, name, position)
+
+        self.time = 0.0
+        self.ticks = 0
+        self.crowns = {Side.FRIENDLY: 0, Side.ENEMY: 0}
+        self.cards_played = {Side.FRIENDLY: 0, Side.ENEMY: 0}
+        self._next_decision = 0.0
+        self.finished = False
+
+    @staticmethod
+    def _tower_positions(side: Side) -> List[Position]:
+        """Tower positions of a side in Board.TOWER_NAMES order."""
+        if side == Side.FRIENDLY:
+            return [Board.FRIENDLY_KING_TOWER, Board.FRIENDLY_LEFT_TOWER, Board.FRIENDLY_RIGHT_TOWER]
+        return [Board.ENEMY_KING_TOWER, Board.ENEMY_LEFT_TOWER, Board.ENEMY_RIGHT_TOWER]
+
+    def _add_tower(self, side: Side, name: str, position: Position):
+        """Put a crown tower into the unit store."""
+        king = name == 'king'
+        index = self.store.add(
+            -1, SIDE_INDEX[side], TOWER, float(position.x), float(position.y),
+            float(self.KING_TOWER_HP if king else self.PRINCESS_TOWER_HP),
+            0.0, self.TOWER_RANGE, self.TOWER_RANGE,
+            float(self.TOWER_DAMAGE), self.TOWER_HIT_SPEED, 0.0, TARGET_MOBILE
+        )
+        self.towers[side][name] = index
+        self._tower_names[index] = (side, name)
+        if king:
+            # The king tower wakes up when it is hit or a princess tower falls
+            self._dormant.add(index)
+
+    def spawn(self, card: Card, side: Side, x: float, y: float) -> int:
+        """
+        Put a unit for a troop or building card on the field.
+
+        Args:
+            card: Card the unit comes from
+            side: Side that owns the unit
+            x: Spawn x coordinate
+            y: Spawn y coordinate
+
+        Returns:
+            Slot index of the unit in the store
+        """
+        lane_x = self.LEFT_LANE_X if x < Board.WIDTH / 2 else self.RIGHT_LANE_X
+        return self.store.add_card(
+            card.card_id, SIDE_INDEX[side], x, y,
+            self.TROOP_HP_PER_ELIXIR, self.BUILDING_HP_PER_ELIXIR,
+            self.TROOP_SPEED, self.MELEE_RANGE, self.SIGHT_RANGE,
+            self.DEPLOY_TIME, self.BUILDING_LIFETIME, lane_x
+        )
+
+    def tower_hp(self, side: Side, name: str) -> float:
+        """
+        Get the remaining hitpoints of a tower.
+
+        Args:
+            side: Side the tower belongs to
+            name: 'king', 'left' or 'right'
+
+        Returns:
+            Hitpoints (0 if the tower is destroyed)
+        """
+        index = self.towers[side].get(name)
+        return max(self.store.hp[index], 0.0) if index is not None else 0.0
+
+    def field_cards(self, side: Side) -> List[Card]:
+        """
+        Get the cards a side currently has on the field.
+
+        Args:
+            side: Side whose units to list
+
+        Returns:
+            Card of every living unit of that side
+        """
+        store = self.store
+        side_index = SIDE_INDEX[side]
+        return [
+            CARD_REGISTRY.get(store.card_id[index]) for index in store.live()
+            if store.side[index] == side_index and store.kind[index] != TOWER
+        ]
+
+    def play(self, side: Side, move: Move) -> bool:
+        """
+        Play a card for a side.
+
+        Args:
+            side: Side playing the card
+            move: Card and deployment position
+
+        Returns:
+            True if the card was played (it was in hand, affordable and
+            the position is legal)
+        """
+        player = self.players[side]
+        position = move.position
+        if position.side != side or not self.board.is_valid_position(position):
+            return False
+        if not player.play_card(move.card):
+            return False
+        self.cards_played[side] += 1
+
+        card = move.card
+        if card.card_type == CardType.SPELL:
+            self._cast_spell(card, side, position.x, position.y)
+        else:
+            self.spawn(card, side, float(position.x), float(position.y))
+        return True
+
+    def run(self) -> MatchResult:
+        """
+        Simulate until the match ends.
+
+        Returns:
+            Match result
+        """
+        while not self.finished:
+            self.step()
+        return self.result()
+
+    def result(self) -> MatchResult:
+        """Summarize the match as it currently stands."""
+        friendly, enemy = self.crowns[Side.FRIENDLY], self.crowns[Side.ENEMY]
+        winner = None
+        if friendly > enemy:
+            winner = Side.FRIENDLY
+        elif enemy > friendly:
+            winner = Side.ENEMY
+        tower_hp = {
+            side: sum(self.tower_hp(side, name) for name in towers)
+            for side, towers in self.towers.items()
+        }
+        return MatchResult(winner, dict(self.crowns), tower_hp, self.time,
+                           self.ticks, dict(self.cards_played))
+
+    def step(self):
+        """Advance the match by one tick."""
+        if self.finished:
+            return
+        dt = self.tick
+
+        rate = Player.ELIXIR_RATE * (2 if self.time >= self.DOUBLE_ELIXIR_TIME else 1)
+        for player in self.players.values():
+            player.add_elixir(dt * rate)
+
+        if self.time >= self._next_decision:
+            self._next_decision += self.decision_interval
+            for side in SIDES:
+                move = self.policies[side](self, side)
+                if move is not None:
+                    self.play(side, move)
+
+        store = self.store
+        live = store.live()
+        self._update_units(live, dt)
+
+        hp, kind = store.hp, store.kind
+        for index in live:
+            if hp[index] <= 0:
+                if kind[index] == TOWER:
+                    # A fallen king takes the other towers with it, so a
+                    # princess tower in the same tick may already be gone
+                    if index in self._tower_names:
+                        self._destroy_tower(index)
+                else:
+                    store.remove(index)
+
+        self.ticks += 1
+        self.time = self.ticks * dt
+        if self.time >= self.duration - 1e-9:
+            self.finished = True
+
+    def _update_units(self, live: List[int], dt: float):
+        """
+        Retarget, then attack or move every unit and tower.
+
+        Works directly on the store's arrays. A unit keeps its target until
+        the target dies or leaves sight; otherwise it looks for the nearest
+        target within sight (a unit that finds nothing looks again after
+        RETARGET_INTERVAL). It attacks a target in range, or walks toward
+        its target or the lane's tower, crossing at the bridge.
+        """
+        store = self.store
+        xs, ys, hp, kind, side_of = store.x, store.y, store.hp, store.kind, store.side
+        cooldown, hit_speed, range_sq = store.cooldown, store.hit_speed, store.range_sq
+        speed_of, lifetime = store.speed, store.lifetime
+        alive, uid, locked, locked_uid = store.alive, store.uid, store.target, store.target_uid
+        nearest, mobile, next_search = store.nearest, store.mobile, store.next_search
+        now, retarget_interval = self.time, self.RETARGET_INTERVAL
+        dormant = self._dormant
+        midline = float(Board.MIDLINE)
+
+        for index in live:
+            if hp[index] <= 0:
+                continue
+            unit_kind = kind[index]
+            if unit_kind == TOWER:
+                if index in dormant:
+                    continue
+                cooldown[index] -= dt
+                if cooldown[index] > 0:
+                    continue
+                if not mobile[1 - side_of[index]]:
+                    # Nothing to shoot at anywhere
+                    cooldown[index] = 0.0
+                    continue
+            else:
+                if unit_kind == BUILDING:
+                    lifetime[index] -= dt
+                    if lifetime[index] <= 0:
+                        hp[index] = 0.0
+                        continue
+                cooldown[index] -= dt
+
+            x, y = xs[index], ys[index]
+            sight_sq = store.sight_sq[index]
+            target = locked[index]
+            if target >= 0:
+                if alive[target] and hp[target] > 0 and uid[target] == locked_uid[index]:
+                    dx = xs[target] - x
+                    dy = ys[target] - y
+                    dist_sq = dx * dx + dy * dy
+                    if dist_sq > sight_sq:
+                        target = -1
+                else:
+                    target = -1
+            if target < 0:
+                if unit_kind == TOWER:
+                    target, dist_sq = nearest(x, y, 1 - side_of[index], sight_sq, TARGET_MOBILE)
+                elif now >= next_search[index]:
+                    target, dist_sq = nearest(x, y, 1 - side_of[index], sight_sq, store.target_mask[index])
+                    if target < 0:
+                        next_search[index] = now + retarget_interval
+                locked[index] = target
+                locked_uid[index] = uid[target] if target >= 0 else -1
+
+            if target >= 0 and dist_sq <= range_sq[index]:
+                if cooldown[index] <= 0:
+                    cooldown[index] += hit_speed[index]
+                    self._attack(index, target)
+                continue
+            if cooldown[index] < 0:
+                cooldown[index] = 0.0
+            speed = speed_of[index]
+            if speed == 0.0:
+                continue
+
+            # Walk toward the target, crossing the river at the lane's bridge
+            if target >= 0:
+                tx, ty = xs[target], ys[target]
+            else:
+                tx, ty = self._lane_destination(index)
+            if side_of[index] == 0:
+                crossing = y < midline and ty > midline
+            else:
+                crossing = y > midline and ty < midline
+            if crossing:
+                tx, ty = store.lane_x[index], midline
+            dx = tx - x
+            dy = ty - y
+            distance = math.sqrt(dx * dx + dy * dy)
+            if distance == 0.0:
+                continue
+            step = speed * dt
+            if distance <= step:
+                store.move(index, tx, ty)
+            else:
+                store.move(index, x + dx / distance * step, y + dy / distance * step)
+
+    def _lane_destination(self, index: int) -> Tuple[float, float]:
+        """Point a troop heads for when nothing is in sight."""
+        store = self.store
+        towers = self.towers[SIDES[1 - store.side[index]]]
+        lane = 'left' if store.lane_x[index] == self.LEFT_LANE_X else 'right'
+        tower = towers.get(lane, towers.get('king'))
+        if tower is None:
+            return store.x[index], store.y[index]
+        return store.x[tower], store.y[tower]
+
+    def _attack(self, index: int, target: int):
+        """Deal a unit's damage to its target (and splash around it)."""
+        store = self.store
+        if store.splash_sq[index]:
+            self._splash(store.side[index], store.x[target], store.y[target],
+                         store.splash_sq[index], store.damage[index], 1.0)
+        else:
+            self._damage(target, store.damage[index])
+
+    def _cast_spell(self, card: Card, side: Side, x: float, y: float):
+        """Resolve a spell landing at a point."""
+        radius = card.splash_radius if card.area_damage else self.MELEE_RANGE
+        self._splash(SIDE_INDEX[side], x, y, radius * radius,
+                     float(card.damage), self.SPELL_TOWER_FACTOR)
+
+    def _splash(self, side: int, x: float, y: float, radius_sq: float,
+                damage: float, tower_factor: float):
+        """Damage every enemy unit and tower within a radius of a point."""
+        kind = self.store.kind
+        for target in self.store.within(x, y, 1 - side, radius_sq):
+            self._damage(target, damage * tower_factor if kind[target] == TOWER else damage)
+
+    def _damage(self, target: int, damage: float):
+        """Apply damage to a unit or tower."""
+        self.store.hp[target] -= damage
+        self._dormant.discard(target)
+
+    def _destroy_tower(self, index: int):
+        """Remove a fallen tower from the field and board and award crowns."""
+        side, name = self._tower_names.pop(index)
+        towers = self.towers[side]
+        attacker = SIDES[1 - SIDE_INDEX[side]]
+        del towers[name]
+        self.store.remove(index)
+        self.board.destroy_tower(side, name)
+        if name == 'king':
+            # Destroying the king tower takes every remaining tower
+            self.crowns[attacker] += 1 + len(towers)
+            for other, other_index in list(towers.items()):
+                del self._tower_names[other_index]
+                self.store.remove(other_index)
+                self.board.destroy_tower(side, other)
+            towers.clear()
+            self.finished = True
+            return
+        self.crowns[attacker] += 1
+        king = towers.get('king')
+        if king is not None:
+            self._dormant.discard(king)
+
+
+class EnginePolicy:
+    """
+    Policy that plays the engine's best move once enough elixir is banked.
+
+    Known opponent cards are the cards the opponent has on the field.
+    """
+
+    def __init__(self, min_elixir: float = 7.0, engine=None, **engine_options):
+        """
+        Initialize the policy.
+
+        Args:
+            min_elixir: Elixir to bank before playing when no enemy unit is
+                on the field
+            engine: Engine to use (must share the simulator's board); built
+                on first use if None
+            **engine_options: Options for the engine built on first use
+        """
+        self.min_elixir = min_elixir
+        self.engine = engine
+        self.engine_options = engine_options or {'use_tables': True, 'tt_bytes': 0, 'cache_size': 1024}
+
+    def __call__(self, sim: MatchSimulator, side: Side) -> Optional[Move]:
+        if self.engine is None or self.engine.board is not sim.board:
+            from engine import ClashRoyaleEngine
+            self.engine = ClashRoyaleEngine(sim.board, **self.engine_options)
+        player = sim.players[side]
+        threats = sim.field_cards(Side.ENEMY if side == Side.FRIENDLY else Side.FRIENDLY)
+        if not threats and player.elixir < self.min_elixir:
+            return None
+        moves = self.engine.find_best_move(player, side, threats)
+        return moves[0] if moves else None
+
+
+class RandomPolicy:
+    """Policy that plays a random affordable card at a random deployment position."""
+
+    def __init__(self, play_probability: float = 0.3):
+        """
+        Initialize the policy.
+
+        Args:
+            play_probability: Chance of playing at each decision point
+        """
+        self.play_probability = play_probability
+
+    def __call__(self, sim: MatchSimulator, side: Side) -> Optional[Move]:
+        rng = sim.random
+        if rng.random() >= self.play_probability:
+            return None
+        playable = sim.players[side].get_playable_cards()
+        if not playable:
+            return None
+        positions = sim.board.get_valid_deployment_positions(side)
+        return Move(rng.choice(playable), rng.choice(positions))
+
+
+def simulate_match(
+    friendly_deck: List[Card],
+    enemy_deck: List[Card],
+    friendly_policy: Optional[Policy] = None,
+    enemy_policy: Optional[Policy] = None,
+    seed: int = 0,
+    **options
+) -> MatchResult:
+    """
+    Simulate one full match.
+
+    Args:
+        friendly_deck: 8 cards of the friendly player
+        enemy_deck: 8 cards of the enemy player
+        friendly_policy: Friendly policy (engine policy if None)
+        enemy_policy: Enemy policy (engine policy if None)
+        seed: Random seed
+        **options: Extra MatchSimulator parameters (tick, duration, ...)
+
+    Returns:
+        Match result
+    """
+    sim = MatchSimulator(
+        friendly_deck, enemy_deck,
+        friendly_policy or EnginePolicy(), enemy_policy or EnginePolicy(),
+        seed=seed, **options
+    )
+    return sim.run()
@@ -0,0 +1,146 @@
+"""
+Precomputed static score tables keyed by card and tower state.
+
+Every evaluation component except counters depends only on the card, the
+deployment position, the side and which of the opposing towers are still
+standing. ``ScoreTables`` computes those components once per card for the
+current tower state and serves later queries from the table.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from card import Card
+from board import Position, Side
+
+
+class ScoreTable:
+    """Static score components for every deployment position of one side."""
+
+    def __init__(self, side: Side, tower_state: int, positions: Sequence[Position]):
+        """
+        Initialize an empty table.
+
+        Args:
+            side: Side the moves are played from
+            tower_state: Opposing tower bitmask the table was built for
+            positions: Valid deployment positions, in move generation order
+        """
+        self.side = side
+        self.tower_state = tower_state
+        self.positions = positions
+        # card -> (prefixes, strategies, max prefix, max strategy), with the
+        # lists aligned with positions
+        self.rows: Dict[Card, Tuple[List[float], List[float], float, float]] = {}
+
+
+class ScoreTables:
+    """
+    Lazily built static score tables for a ClashRoyaleEngine.
+
+    For each card and position the table stores the running score after the
+    elixir, positioning and card type terms ("prefix") and the strategy term
+    separately. The engine then only adds counters in between, which keeps
+    the result bit-identical to ``evaluate_move``.
+
+    Tables are kept per side and opposing tower state, so a search that
+    destroys a tower and takes it back (Board.make_destroy_tower / unmake)
+    switches tables instead of rebuilding them.
+    """
+
+    def __init__(self, engine):
+        """
+        Initialize the tables.
+
+        Args:
+            engine: Engine whose board and evaluation terms are tabulated
+        """
+        self.engine = engine
+        self._tables: Dict[Tuple[Side, int], ScoreTable] = {}
+        self._current: Dict[Side, ScoreTable] = {}
+        self.builds = 0
+        # Tables created because the tower state differed from the last one
+        self.invalidations = 0
+
+    def invalidate(self):
+        """Drop every table (e.g. after changing card stats in place)."""
+        self._tables.clear()
+        self._current.clear()
+
+    def get_table(self, side: Side) -> ScoreTable:
+        """
+        Get the table for a side, rebuilding it if the towers changed.
+
+        Args:
+            side: Side the moves are played from
+
+        Returns:
+            Score table valid for the current board
+        """
+        board = self.engine.board
+        enemy_side = Side.ENEMY if side == Side.FRIENDLY else Side.FRIENDLY
+        tower_state = board.tower_state(enemy_side)
+
+        table = self._current.get(side)
+        if table is not None and table.tower_state == tower_state:
+            return table
+        table = self._tables.get((side, tower_state))
+        if table is None:
+            if side in self._current:
+                self.invalidations += 1
+            positions = board.get_valid_deployment_positions(side)
+            table = ScoreTable(side, tower_state, positions)
+            self._tables[side, tower_state] = table
+        self._current[side] = table
+        return table
+
+    def lookup(self, card: Card, side: Side) -> Tuple[Sequence[Position], List[float], List[float]]:
+        """
+        Get positions and static score components for a card.
+
+        Args:
+            card: Card being played
+            side: Side the card is played from
+
+        Returns:
+            Tuple of (positions, prefixes, strategies), aligned by index
+        """
+        table = self.get_table(side)
+        row = table.rows.get(card)
+        if row is None:
+            row = self._build_row(card, table)
+            table.rows[card] = row
+        return table.positions, row[0], row[1]
+
+    def bounds(self, card: Card, side: Side) -> Tuple[float, float]:
+        """
+        Get the largest prefix and strategy term of a card over all positions.
+
+        Args:
+            card: Card being played
+            side: Side the card is played from
+
+        Returns:
+            Tuple of (max prefix, max strategy), or -inf twice if there are
+            no valid positions
+        """
+        self.lookup(card, side)
+        row = self.get_table(side).rows[card]
+        return row[2], row[3]
+
+    def _build_row(self, card: Card, table: ScoreTable) -> Tuple[List[float], List[float], float, float]:
+        """Evaluate the static terms of a card at every position."""
+        engine = self.engine
+        side = table.side
+        prefixes = []
+        strategies = []
+        for position in table.positions:
+            score = 0.0
+            score += (engine.weights.elixir_base - card.elixir_cost) * engine.weights.elixir_scale
+            score += engine._evaluate_positioning(card, position, side)
+            score += engine._evaluate_card_type(card, position, side)
+            prefixes.append(score)
+            strategies.append(engine._evaluate_strategy(card, position, side))
+        self.builds += 1
+        return (prefixes, strategies,
+                max(prefixes, default=float('-inf')),
+                max(strategies, default=float('-inf')))
@@ -2,7 +2,7 @@
 Basic tests for the Clash Royale Engine.
 """
 
-from card import Card, CardType, Rarity, TargetType, KNIGHT, GIANT, FIREBALL
+from card import Card, CardType, Rarity, TargetType, KNIGHT, GIANT, FIREBALL, CARD_POOL
 from board import Board, Position, Side
 from player import Player
 from move import Move
@@ -122,6 +122,1107 @@ def test_engine_analysis():
     print(f"✓ Analysis recommendation: {analysis['recommendation']}")
 
 
+def test_vectorized_matches_scalar():
+    """Test that the NumPy batch evaluator reproduces scalar scores exactly."""
+    print("Testing vectorized evaluation...")
+    from batch import np
+    if np is None:
+        print("- NumPy not installed, skipping")
+        return
+    
+    board = Board()
+    board.enemy_towers['left'] = False
+    scalar = ClashRoyaleEngine(board)
+    vectorized = ClashRoyaleEngine(board, vectorized=True)
+    opponent_cards = [GIANT, CARD_POOL[1], CARD_POOL[7]]
+    
+    for side in (Side.FRIENDLY, Side.ENEMY):
+        positions = board.get_deployment_positions(side)
+        grid = vectorized.batch_evaluator.score_grid(CARD_POOL, positions, side, opponent_cards)
+        for i, card in enumerate(CARD_POOL):
+            for j, position in enumerate(positions):
+                expected = scalar.evaluate_move(Move(card, position), side, opponent_cards)
+                assert grid[i, j] == expected
+    
+    deck = CARD_POOL[:8]
+    player = Player(deck)
+    player.add_elixir(5)
+    expected = scalar.find_best_move(player, Side.FRIENDLY, top_n=10)
+    actual = vectorized.find_best_move(player, Side.FRIENDLY, top_n=10)
+    assert [(m.card.name, m.position, m.score) for m in actual] == \
+        [(m.card.name, m.position, m.score) for m in expected]
+    print("✓ Vectorized scores match the scalar path")
+
+
+def test_score_tables():
+    """Test that table lookups match scalar scores and follow tower state."""
+    print("Testing score tables...")
+    board = Board()
+    scalar = ClashRoyaleEngine(board)
+    tabled = ClashRoyaleEngine(board, use_tables=True)
+    player = Player(CARD_POOL[:8])
+    player.add_elixir(5)
+    opponent_cards = [GIANT, CARD_POOL[1]]
+    
+    def ranked(engine):
+        moves = engine.find_best_move(player, Side.FRIENDLY, opponent_cards, top_n=20)
+        return [(m.card.name, m.position, m.score) for m in moves]
+    
+    assert ranked(tabled) == ranked(scalar)
+    builds = tabled.score_tables.builds
+    ranked(tabled)
+    assert tabled.score_tables.builds == builds  # Served from the table
+    
+    assert board.destroy_tower(Side.ENEMY, 'left')
+    assert board.tower_state(Side.ENEMY) == 0b101
+    assert ranked(tabled) == ranked(scalar)
+    assert tabled.score_tables.invalidations == 1
+    print("✓ Score tables match scalar evaluation")
+
+
+def test_lookahead_search():
+    """Test multi-ply search and its node budget."""
+    print("Testing lookahead search...")
+    engine = ClashRoyaleEngine()
+    player = Player(CARD_POOL[:8], "Player")
+    opponent = Player(CARD_POOL[2:10], "Opponent")
+    
+    result = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=4)
+    assert result.completed
+    assert result.depth == 4
+    assert len(result.principal_variation) == 4
+    assert player.elixir == Player.STARTING_ELIXIR  # Root state is untouched
+    
+    # Depth 1 is a plain greedy choice
+    greedy = engine.find_best_move(player, Side.FRIENDLY)[0]
+    shallow = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=1)
+    assert shallow.best_move == greedy
+    
+    limited = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=8, node_limit=20)
+    assert not limited.completed
+    assert limited.nodes <= 21
+    assert limited.principal_variation
+    print(f"✓ Search at depth 4: {result.best_move} ({result.nodes} nodes)")
+
+
+def test_iterative_deepening():
+    """Test the time-budgeted iterative deepening driver."""
+    print("Testing iterative deepening...")
+    import time
+    engine = ClashRoyaleEngine()
+    player = Player(CARD_POOL[:8], "Player")
+    opponent = Player(CARD_POOL[2:10], "Opponent")
+    
+    start = time.perf_counter()
+    result = engine.iterative_search(player, opponent, Side.FRIENDLY, time_budget=0.05)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.25
+    assert result.depth >= 1
+    assert result.nodes > 0 and result.nodes_per_second > 0
+    assert result.principal_variation
+    
+    # Without a deadline the deepest iteration equals a fixed-depth search
+    # (the transposition table is off so deeper cached results can't leak in)
+    engine = ClashRoyaleEngine(tt_bytes=0)
+    full = engine.iterative_search(player, opponent, Side.FRIENDLY, time_budget=None, max_depth=4)
+    fixed = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=4)
+    assert full.completed and full.depth == 4
+    assert full.score == fixed.score
+    print(f"✓ Reached depth {result.depth} in 50 ms ({result.nodes_per_second:.0f} nodes/s)")
+
+
+def test_transposition_table():
+    """Test incremental state hashing and transposition table reuse."""
+    print("Testing transposition table...")
+    from zobrist import ZOBRIST, TranspositionTable
+    board = Board()
+    player = Player(CARD_POOL[:8])
+    opponent = Player(CARD_POOL[2:10])
+    players = {Side.FRIENDLY: player, Side.ENEMY: opponent}
+    
+    # Incremental update matches hashing from scratch
+    key = ZOBRIST.state_hash(players, board, Side.FRIENDLY)
+    card = player.hand[2]
+    key ^= ZOBRIST.play_delta(Side.FRIENDLY, player, card)
+    key ^= ZOBRIST.elixir_key(Side.FRIENDLY, player.elixir)
+    player.play_card(card)
+    key ^= ZOBRIST.elixir_key(Side.FRIENDLY, player.elixir)
+    assert key == ZOBRIST.state_hash(players, board, Side.FRIENDLY)
+    
+    # Depth-preferred replacement within a search
+    table = TranspositionTable(max_bytes=TranspositionTable.ENTRY_BYTES)
+    table.store(1, 5, 1.0, TranspositionTable.EXACT, None)
+    table.store(2, 3, 2.0, TranspositionTable.EXACT, None)
+    assert table.probe(2) is None and table.probe(1)[0] == 5
+    table.new_search()
+    table.store(2, 3, 2.0, TranspositionTable.EXACT, None)
+    assert table.probe(2)[1] == 2.0
+
+    # Moves are stored compactly and come back equal, score included
+    move = Move(GIANT, Position(4.5, 14, Side.ENEMY), 17.25)
+    table.store(3, 4, 0.5, TranspositionTable.LOWER_BOUND, move)
+    stored = table.probe(3)[3]
+    assert stored == move and stored.score == move.score
+    assert stored.position.side == Side.ENEMY
+    assert TranspositionTable(max_bytes=1024 * TranspositionTable.ENTRY_BYTES).size == 1024
+
+    # Repeated searches reuse earlier results
+    engine = ClashRoyaleEngine(board)
+    first = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=6)
+    second = engine.search_best_move(player, opponent, Side.FRIENDLY, depth=6)
+    assert second.score == first.score
+    assert second.nodes < first.nodes
+    
+    analysis = engine.analyze_position(player, Side.FRIENDLY, opponent=opponent, search_depth=6)
+    assert analysis['search']['depth'] == 6
+    print(f"✓ Repeated search visited {second.nodes} nodes instead of {first.nodes}")
+
+
+def test_mcts():
+    """Test Monte Carlo Tree Search in-process and with a process pool."""
+    print("Testing MCTS...")
+    engine = ClashRoyaleEngine()
+    player = Player(CARD_POOL[:8], "Player")
+    opponent = Player(CARD_POOL[2:10], "Opponent")
+    
+    first = engine.mcts_best_move(player, opponent, Side.FRIENDLY, iterations=200, seed=7)
+    second = engine.mcts_best_move(player, opponent, Side.FRIENDLY, iterations=200, seed=7)
+    assert first.best_move == second.best_move  # Seeded runs are reproducible
+    assert first.move_stats[0][1] >= first.move_stats[-1][1]
+    assert -1.0 <= first.value <= 1.0
+    assert player.elixir == Player.STARTING_ELIXIR  # Root state is untouched
+    
+    merged = engine.mcts_best_move(player, opponent, Side.FRIENDLY, iterations=100, workers=2)
+    assert merged.iterations == 2 * 99  # The first simulation expands the root
+    
+    # Tree engines are built with the searching engine's options
+    import engine as engine_module
+    built = []
+    
+    class RecordingEngine(ClashRoyaleEngine):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            built.append(self)
+    
+    tabled = ClashRoyaleEngine(use_tables=True, cache_size=4)
+    engine_module.ClashRoyaleEngine = RecordingEngine
+    try:
+        result = tabled.mcts_best_move(player, opponent, Side.FRIENDLY, iterations=200, seed=7)
+    finally:
+        engine_module.ClashRoyaleEngine = ClashRoyaleEngine
+    assert built[0].score_tables is not None and built[0].cache_size == 4
+    assert result.best_move == first.best_move and result.move_stats == first.move_stats
+    print(f"✓ MCTS best move: {first.best_move} ({first.iterations} simulations)")
+
+
+def test_card_registry():
+    """Test integer card IDs, registry columns and slot-based objects."""
+    print("Testing card registry...")
+    import pickle
+    from card import CARD_REGISTRY
+    
+    ids = [card.card_id for card in CARD_POOL]
+    assert ids == list(range(len(CARD_POOL)))
+    assert CARD_REGISTRY.get(GIANT.card_id) is GIANT
+    assert CARD_REGISTRY.elixir_cost[GIANT.card_id] == 5
+    assert CARD_REGISTRY.damage[FIREBALL.card_id] == 325
+    
+    # Identical stats share an ID, so copies behave like the original
+    clone = Card("Giant", CardType.TROOP, 5, Rarity.RARE, TargetType.BUILDINGS,
+                 damage=120, hit_speed=1.5, range_=0.5)
+    assert clone.card_id == GIANT.card_id and clone == GIANT
+    assert pickle.loads(pickle.dumps(GIANT)) == GIANT
+    
+    position = Position(9, 14, Side.FRIENDLY)
+    assert Move(clone, position) == Move(GIANT, position)
+    assert len({Move(clone, position), Move(GIANT, position)}) == 1
+    
+    player = Player([KNIGHT, GIANT, FIREBALL, KNIGHT, GIANT, FIREBALL, KNIGHT, GIANT])
+    assert player.can_play_card(clone)
+    assert player.hand_ids() == (KNIGHT.card_id, GIANT.card_id, FIREBALL.card_id, KNIGHT.card_id)
+    
+    for obj in (GIANT, Move(GIANT, position), player):
+        assert not hasattr(obj, '__dict__')
+    
+    # Registered stats cannot drift from the registry's columns
+    try:
+        GIANT.damage = 1
+        assert False, "Card should be immutable"
+    except AttributeError:
+        pass
+    assert GIANT.damage == CARD_REGISTRY.damage[GIANT.card_id] == 120
+
+    # Fractional stats are kept, and a rejected card leaves the columns aligned
+    golem = Card("Registry Test Golem", CardType.TROOP, 8, Rarity.EPIC, TargetType.BUILDINGS,
+                 damage=100.5, hit_speed=2.5)
+    assert CARD_REGISTRY.damage[golem.card_id] == 100.5
+    count = len(CARD_REGISTRY)
+    try:
+        Card("Registry Test Broken", CardType.TROOP, 3, Rarity.COMMON, TargetType.GROUND,
+             damage="lots")
+        assert False, "Non-numeric damage accepted"
+    except ValueError:
+        pass
+    assert len(CARD_REGISTRY) == count
+    for column in (CARD_REGISTRY.elixir_cost, CARD_REGISTRY.damage, CARD_REGISTRY.range,
+                   CARD_REGISTRY.target_type):
+        assert len(column) == count
+    follower = Card("Registry Test Follower", CardType.SPELL, 2, Rarity.COMMON, TargetType.BOTH,
+                    damage=75)
+    assert CARD_REGISTRY.damage[follower.card_id] == 75
+    assert CARD_REGISTRY.get(follower.card_id) is follower
+    print(f"✓ {len(CARD_REGISTRY)} cards registered")
+
+
+def test_position_grid():
+    """Test interned, immutable positions with precomputed tower data."""
+    print("Testing position grid...")
+    board = Board()
+    
+    interned = Position.intern(9, 14, Side.FRIENDLY)
+    assert interned is Position.intern(9, 14, Side.FRIENDLY)
+    assert interned == Position(9, 14, Side.FRIENDLY)
+    assert Position.intern(4.5, 8, Side.FRIENDLY).x == 4.5  # Half-tiles are on the grid
+    assert Position.intern(4.25, 8, Side.FRIENDLY).tower_distances is None
+    
+    try:
+        interned.x = 3
+        assert False, "Position should be immutable"
+    except AttributeError:
+        pass
+    
+    # Deployment positions are shared, not rebuilt on every call
+    assert board.get_deployment_positions(Side.FRIENDLY) is board.get_deployment_positions(Side.FRIENDLY)
+    assert Move(GIANT, interned) in ClashRoyaleEngine(board).generate_moves(
+        Player([GIANT] * 8), Side.FRIENDLY)
+    
+    board.destroy_tower(Side.ENEMY, 'left')
+    for position in board.get_deployment_positions(Side.FRIENDLY):
+        plain = Position(position.x, position.y, position.side)
+        nearest = board.get_nearest_tower(plain, Side.ENEMY)
+        assert board.get_nearest_tower_distance(position, Side.ENEMY) == plain.distance_to(nearest)
+        assert board.is_valid_position(position) == board.is_valid_position(plain)
+    print("✓ Position grid interns positions")
+
+
+def test_top_n_selection():
+    """Test heap-based top-N selection and card-group pruning."""
+    print("Testing top-N selection...")
+    import types
+    board = Board()
+    player = Player([KNIGHT, GIANT, FIREBALL, KNIGHT] + CARD_POOL[4:8])
+    player.add_elixir(5)
+    opponent_cards = [GIANT, CARD_POOL[7]]
+    
+    # Reference: score everything, then a full stable sort
+    reference = ClashRoyaleEngine(board)
+    moves = reference.generate_moves(player, Side.FRIENDLY)
+    for move in moves:
+        move.score = reference.evaluate_move(move, Side.FRIENDLY, opponent_cards)
+    moves.sort(reverse=True)
+    expected = [(m.card.card_id, m.position, m.score) for m in moves]
+    
+    assert isinstance(reference.iter_moves(player, Side.FRIENDLY), types.GeneratorType)
+    assert list(reference.iter_moves(player, Side.FRIENDLY)) == reference.generate_moves(player, Side.FRIENDLY)
+    
+    tabled = ClashRoyaleEngine(board, use_tables=True)
+    for top_n in (1, 5, len(moves) + 3):
+        for engine in (reference, tabled):
+            best = engine.find_best_move(player, Side.FRIENDLY, opponent_cards, top_n=top_n)
+            assert [(m.card.card_id, m.position, m.score) for m in best] == expected[:top_n]
+    
+    tabled.find_best_move(player, Side.FRIENDLY, opponent_cards, top_n=1)
+    assert tabled.last_pruned > 0
+    print(f"✓ Top-1 query pruned {tabled.last_pruned} of {len(moves)} moves")
+
+
+def test_tile_placement():
+    """Test tile-level placement and coarse-to-fine refinement."""
+    print("Testing tile placement...")
+    board = Board()
+    engine = ClashRoyaleEngine(board)
+    player = Player(CARD_POOL[:8])
+    player.add_elixir(5)
+    
+    tiles = board.get_tile_positions(Side.FRIENDLY)
+    assert len(tiles) == (Board.WIDTH + 1) * (Board.MIDLINE + 1)
+    assert len(board.get_tile_positions(Side.FRIENDLY, 0.5)) > 3 * len(tiles)
+    
+    # Exhaustive tile search matches brute-force evaluation
+    best = engine.find_best_move(player, Side.FRIENDLY, [GIANT], placement='tiles')[0]
+    expected = max(
+        engine.evaluate_move(Move(card, position), Side.FRIENDLY, [GIANT])
+        for card in player.get_playable_cards() for position in tiles
+    )
+    assert best.score == expected
+    
+    refined = engine.find_best_move(player, Side.FRIENDLY, [GIANT], placement='refine')[0]
+    assert refined.score <= best.score
+    assert engine.last_positions_evaluated < len(tiles) * len(player.get_playable_cards())
+    zones = engine.find_best_move(player, Side.FRIENDLY, [GIANT])[0]
+    assert refined.score >= zones.score
+    print(f"✓ Tile search: {best}, refined: {refined}")
+
+
+def test_batch_analysis():
+    """Test many-state analysis against per-state calls."""
+    print("Testing batch analysis...")
+    engine = ClashRoyaleEngine()
+    states = []
+    for i in range(12):
+        player = Player(CARD_POOL[i % 3:i % 3 + 8], f"Player {i}")
+        player.add_elixir(i % 7)
+        side = Side.FRIENDLY if i % 2 == 0 else Side.ENEMY
+        states.append((player, side, [GIANT] if i % 3 == 0 else None))
+    
+    result = engine.analyze_many(states)
+    assert len(result) == len(states)
+    for i, state in enumerate(states):
+        assert result.analysis(i) == engine.analyze_position(*state)
+    
+    best = engine.find_best_moves_batch(states, top_n=1, workers=2, chunk_size=5)
+    for i, state in enumerate(states):
+        assert best.moves(i) == engine.find_best_move(*state)
+
+    # Spawned workers number custom cards differently; results are remapped
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from batch import _run_chunk
+    Card("Batch Test A", CardType.TROOP, 2, Rarity.COMMON, TargetType.GROUND, damage=90)
+    custom = Card("Batch Test B", CardType.TROOP, 2, Rarity.COMMON, TargetType.AIR, damage=80)
+    player = Player([custom] * 8, "Custom")
+    job = (Board(), [(player, Side.FRIENDLY, None)], 3, None)
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        spawned = pool.submit(_run_chunk, job).result()
+    assert spawned.analysis(0)['hand'] == [str(custom)] * 4
+    assert spawned.moves(0) == engine.find_best_move(player, Side.FRIENDLY, top_n=3)
+    print(f"✓ Batch analysis: {result}")
+
+
+def test_result_cache():
+    """Test the LRU result cache, canonical keys and invalidation."""
+    print("Testing result cache...")
+    engine = ClashRoyaleEngine(cache_size=2)
+    reference = ClashRoyaleEngine()
+    player = Player(CARD_POOL[:8])
+    player.add_elixir(5)
+    
+    first = engine.find_best_move(player, Side.FRIENDLY, [GIANT, FIREBALL], top_n=6)
+    assert engine.result_cache.misses == 1
+    
+    # Same hand in another slot order, opponent cards reordered: a hit that
+    # still matches an uncached search move for move
+    player.hand = list(reversed(player.hand))
+    cached = engine.find_best_move(player, Side.FRIENDLY, [FIREBALL, GIANT], top_n=6)
+    expected = reference.find_best_move(player, Side.FRIENDLY, [FIREBALL, GIANT], top_n=6)
+    assert engine.result_cache.hits == 1
+    assert [(m, m.score) for m in cached] == [(m, m.score) for m in expected]
+    assert sorted(m.score for m in cached) == sorted(m.score for m in first)
+    
+    # Tower changes select different entries; the oldest one is evicted
+    engine.board.destroy_tower(Side.ENEMY, 'left')
+    reference.board.destroy_tower(Side.ENEMY, 'left')
+    after = engine.find_best_move(player, Side.FRIENDLY, [FIREBALL, GIANT], top_n=6)
+    assert [m.score for m in after] == [
+        m.score for m in reference.find_best_move(player, Side.FRIENDLY, [GIANT, FIREBALL], top_n=6)
+    ]
+    engine.find_best_move(player, Side.FRIENDLY, top_n=6)
+    assert engine.result_cache.evictions == 1
+    
+    # Registering a new card clears the cache
+    Card("Cache Test Golem", CardType.TROOP, 8, Rarity.EPIC, TargetType.BUILDINGS, damage=250)
+    engine.find_best_move(player, Side.FRIENDLY, top_n=6)
+    assert engine.result_cache.invalidations == 1
+    assert len(engine.result_cache) == 1
+    print(f"✓ Cache: {engine.result_cache.stats()}")
+
+
+def test_analysis_server():
+    """Test the JSON-lines server, request coalescing and overload handling."""
+    print("Testing analysis server...")
+    import asyncio
+    import json
+    from server import AnalysisServer
+    
+    deck = [card.name for card in CARD_POOL[:8]]
+    engine = ClashRoyaleEngine()
+    expected = engine.find_best_move(Player(CARD_POOL[:8]), Side.FRIENDLY, [GIANT], top_n=2)
+    
+    async def scenario():
+        server = AnalysisServer(max_pending=32)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for i in range(20):
+            request = {"id": i, "deck": deck, "opponent_cards": ["Giant"], "top_n": 2}
+            writer.write(json.dumps(request).encode() + b"\n")
+        writer.write(b'{"id": "bad", "deck": ["Nope"]}\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(21)]
+        writer.close()
+        await server.close()
+        return server, responses
+    
+    server, responses = asyncio.run(scenario())
+    by_id = {response['id']: response for response in responses}
+    assert 'unknown card' in by_id['bad']['error']
+    for i in range(20):
+        moves = by_id[i]['moves']
+        assert [(m['card'], m['x'], m['y'], m['score']) for m in moves] == [
+            (m.card.name, m.position.x, m.position.y, m.score) for m in expected
+        ]
+    assert server.computations + server.coalesced == 20
+    assert server.coalesced > 0
+    
+    async def overload():
+        server = AnalysisServer(max_pending=1, queue_timeout=0.0)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for i in range(5):
+            request = {"id": i, "deck": deck, "elixir": i + 3}
+            writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(5)]
+        writer.close()
+        await server.close()
+        return server, responses
+    
+    server, responses = asyncio.run(overload())
+    assert server.rejected > 0
+    assert sum(1 for r in responses if r.get('error') == 'overloaded') == server.rejected
+    print(f"✓ Server stats: {server.stats()}")
+
+
+def test_match_simulator():
+    """Test the deterministic match simulator."""
+    print("Testing match simulator...")
+    from simulator import MatchSimulator, EnginePolicy, RandomPolicy, simulate_match
+    
+    friendly_deck = CARD_POOL[:8]
+    enemy_deck = CARD_POOL[2:]
+    first = simulate_match(friendly_deck, enemy_deck, RandomPolicy(), RandomPolicy(), seed=3)
+    again = simulate_match(friendly_deck, enemy_deck, RandomPolicy(), RandomPolicy(), seed=3)
+    assert first.ticks == again.ticks == 1800
+    assert first.tower_hp == again.tower_hp and first.crowns == again.crowns
+    assert first.cards_played[Side.FRIENDLY] > 0
+    
+    # A lone Giant walks over the bridge and damages the enemy tower
+    sim = MatchSimulator(friendly_deck, enemy_deck,
+                         lambda sim, side: None, lambda sim, side: None, duration=40.0)
+    sim.spawn(GIANT, Side.FRIENDLY, 4.0, 8.0)
+    sim.run()
+    assert sim.tower_hp(Side.ENEMY, 'left') < MatchSimulator.PRINCESS_TOWER_HP
+    
+    # Destroyed towers are removed from the shared board
+    board = Board()
+    sim = MatchSimulator(friendly_deck, enemy_deck, EnginePolicy(), EnginePolicy(),
+                         seed=1, board=board)
+    sim.store.hp[sim.towers[Side.ENEMY]['right']] = 1.0
+    mini_pekka = CARD_POOL[5]
+    sim.spawn(mini_pekka, Side.FRIENDLY, 14.0, 19.0)
+    sim.run()
+    assert not board.enemy_towers['right']
+    assert sim.crowns[Side.FRIENDLY] >= 1
+
+    # A king and a princess tower falling in the same tick
+    idle = lambda sim, side: None
+    sim = MatchSimulator(friendly_deck, enemy_deck, idle, idle)
+    sim.store.hp[sim.towers[Side.ENEMY]['king']] = -1.0
+    sim.store.hp[sim.towers[Side.ENEMY]['left']] = -1.0
+    sim.step()
+    assert sim.finished and sim.crowns[Side.FRIENDLY] == 3
+    assert not sim.towers[Side.ENEMY]
+    print(f"✓ Simulated: {first}")
+
+
+def test_unit_store():
+    """Test spatial queries of the unit store against brute force."""
+    print("Testing unit store...")
+    import random
+    from units import UnitStore, TROOP, BUILDING, TARGET_ALL, TARGET_STRUCTURES
+    
+    rng = random.Random(7)
+    store = UnitStore()
+    indices = []
+    for _ in range(60):
+        kind = rng.choice((TROOP, BUILDING))
+        indices.append(store.add(-1, rng.randint(0, 1), kind,
+                                 rng.uniform(0, Board.WIDTH), rng.uniform(0, Board.HEIGHT),
+                                 100.0, 1.0, 1.0, 5.5, 10.0, 1.0, 0.0, TARGET_ALL))
+    for index in indices[::3]:
+        store.remove(index)
+    for index in indices[1::3]:
+        store.move(index, rng.uniform(0, Board.WIDTH), rng.uniform(0, Board.HEIGHT))
+    assert len(store) == 40
+    
+    # Removed slots are reused
+    reused = store.add(-1, 0, TROOP, 1.0, 1.0, 100.0, 1.0, 1.0, 5.5, 10.0, 1.0, 0.0, TARGET_ALL)
+    assert reused in indices[::3]
+    
+    for _ in range(200):
+        x, y = rng.uniform(0, Board.WIDTH), rng.uniform(0, Board.HEIGHT)
+        side = rng.randint(0, 1)
+        radius_sq = rng.uniform(1, 80)
+        for mask in (TARGET_ALL, TARGET_STRUCTURES):
+            candidates = [
+                ((store.x[i] - x) ** 2 + (store.y[i] - y) ** 2, i) for i in store.live()
+                if store.side[i] == side and (mask >> store.kind[i]) & 1
+            ]
+            in_range = [c for c in candidates if c[0] <= radius_sq]
+            expected = min(in_range)[1] if in_range else -1
+            assert store.nearest(x, y, side, radius_sq, mask)[0] == expected
+        assert store.within(x, y, side, radius_sq) == sorted(
+            i for i in store.live() if store.side[i] == side
+            and (store.x[i] - x) ** 2 + (store.y[i] - y) ** 2 <= radius_sq
+        )
+    print(f"✓ Nearest and range queries match brute force: {store}")
+
+
+def test_eval_weights():
+    """Test that every evaluation path honours custom weights."""
+    print("Testing evaluation weights...")
+    from weights import EvalWeights, DEFAULT_WEIGHTS
+    from batch import np
+    
+    assert EvalWeights.from_vector(DEFAULT_WEIGHTS.vector()) == DEFAULT_WEIGHTS
+    weights = DEFAULT_WEIGHTS.replace(rush_base=26.0, bridge_troop=-1.5, counter_air=7.0,
+                                      center_lane=1.25, elixir_scale=0.8)
+    assert weights != DEFAULT_WEIGHTS and weights.rush_base == 26.0
+    
+    board = Board()
+    board.enemy_towers['right'] = False
+    scalar = ClashRoyaleEngine(board, weights=weights)
+    engines = [ClashRoyaleEngine(board, use_tables=True, weights=weights)]
+    if np is not None:
+        engines.append(ClashRoyaleEngine(board, vectorized=True, weights=weights))
+    player = Player(CARD_POOL[:8])
+    player.add_elixir(5)
+    opponent_cards = [GIANT, CARD_POOL[1], CARD_POOL[7]]
+    
+    default_move = ClashRoyaleEngine(board).generate_moves(player, Side.FRIENDLY)[0]
+    assert (scalar.evaluate_move(default_move, Side.FRIENDLY, opponent_cards) !=
+            ClashRoyaleEngine(board).evaluate_move(default_move, Side.FRIENDLY, opponent_cards))
+    for side in (Side.FRIENDLY, Side.ENEMY):
+        expected = scalar.find_best_move(player, side, opponent_cards, top_n=10)
+        for engine in engines:
+            actual = engine.find_best_move(player, side, opponent_cards, top_n=10)
+            assert [(m.card, m.position, m.score) for m in actual] == \
+                [(m.card, m.position, m.score) for m in expected]
+
+    # MCTS trees are grown by engines with the same weights
+    from mcts import MCTS, root_statistics
+    opponent = Player(CARD_POOL[2:])
+    result = scalar.mcts_best_move(player, opponent, Side.FRIENDLY, opponent_cards, iterations=80)
+    root = MCTS(scalar, seed=0).search(player, opponent, Side.FRIENDLY, opponent_cards, 80)
+    visits = {key: stats[1] for key, stats in root_statistics(root).items()}
+    keys = [None if m is None else (m.card.card_id, m.position.x, m.position.y)
+            for m, _, _ in result.move_stats]
+    assert dict(zip(keys, (n for _, n, _ in result.move_stats))) == visits
+    default_result = ClashRoyaleEngine(board).mcts_best_move(player, opponent, Side.FRIENDLY,
+                                                             opponent_cards, iterations=80)
+    assert default_result.move_stats != result.move_stats
+    print(f"✓ Custom weights agree across evaluation paths: {weights}")
+
+
+def test_tournament():
+    """Test SPRT decisions and the self-play tournament log."""
+    print("Testing self-play tournament...")
+    import os
+    import tempfile
+    from tournament import SPRT, Tournament, TournamentLog
+    from weights import DEFAULT_WEIGHTS
+    
+    sprt = SPRT(elo0=0, elo1=20)
+    while sprt.status() is None:
+        sprt.add(1.0 if sprt.games % 3 else 0.5)
+    assert sprt.status() == 'H1' and sprt.elo() > 0
+    sprt = SPRT(elo0=0, elo1=20)
+    while sprt.status() is None:
+        sprt.add(0.0 if sprt.games % 2 else 0.5)
+    assert sprt.status() == 'H0'
+    
+    weak = DEFAULT_WEIGHTS.replace(rush_base=-40.0, bridge_troop=-20.0, aggressive=-20.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tune.log')
+        result = Tournament(weak, sprt=SPRT(0, 50), max_games=40, log_path=path,
+                            duration=60.0).run()
+        runs = TournamentLog.read(path)
+    assert result.status == 'H0' and result.losses > result.wins
+    assert len(runs) == 1 and len(runs[0]['games']) == result.games
+    assert runs[0]['info']['candidate'] == weak.vector()
+    assert runs[0]['summary']['status'] == 'H0'
+    print(f"✓ Tournament stopped early: {result}")
+
+
+def test_counter_matrix():
+    """Test the counter matrix against the pairwise rules and its growth."""
+    print("Testing counter matrix...")
+    from counters import CounterMatrix
+    from card import CARD_REGISTRY
+    from batch import np
+    from weights import DEFAULT_WEIGHTS
+    
+    matrix = CounterMatrix()
+    assert len(matrix) == len(CARD_REGISTRY) >= len(CARD_POOL)
+    fireball, inferno = CARD_POOL[3], CARD_POOL[9]
+    assert matrix.row(fireball.card_id)[KNIGHT.card_id] == 3.0   # splash vs cheap
+    assert matrix.row(fireball.card_id)[GIANT.card_id] == 2.5    # damage vs tank
+    assert matrix.row(inferno.card_id)[GIANT.card_id] == 4.0     # building vs rusher
+    assert matrix.row(KNIGHT.card_id)[GIANT.card_id] == 0.0
+    
+    # Cards registered later get a row and a column on first use
+    dragon = Card("Test Dragon", CardType.TROOP, 4, Rarity.EPIC, TargetType.AIR,
+                  damage=160, area_damage=True)
+    assert matrix.row(CARD_POOL[1].card_id)[dragon.card_id] == 2.0
+    assert matrix.row(dragon.card_id)[KNIGHT.card_id] == 3.0
+    assert len(matrix) == len(CARD_REGISTRY)
+    
+    # Every evaluation path sums the same pair values
+    weights = DEFAULT_WEIGHTS.replace(counter_swarm=0.1, counter_tank=0.7, counter_air=1.3)
+    board = Board()
+    scalar = ClashRoyaleEngine(board, weights=weights)
+    engines = [ClashRoyaleEngine(board, use_tables=True, weights=weights)]
+    if np is not None:
+        engines.append(ClashRoyaleEngine(board, vectorized=True, weights=weights))
+    player = Player(CARD_POOL[:7] + [dragon])
+    player.add_elixir(5)
+    opponent_cards = [dragon, GIANT, KNIGHT, CARD_POOL[1], GIANT]
+    expected = scalar.find_best_move(player, Side.ENEMY, opponent_cards, top_n=8)
+    for engine in engines:
+        actual = engine.find_best_move(player, Side.ENEMY, opponent_cards, top_n=8)
+        assert [(m.card, m.position, m.score) for m in actual] == \
+            [(m.card, m.position, m.score) for m in expected]
+    print(f"✓ Counter bonuses match the rules: {matrix}")
+
+
+def test_opponent_model():
+    """Test opponent hand inference and scoring against its distribution."""
+    print("Testing opponent model...")
+    import random
+    from card import CARD_REGISTRY
+    from opponent import OpponentModel
+    from batch import np
+    
+    rng = random.Random(5)
+    deck = list(CARD_POOL[:8])
+    rng.shuffle(deck)
+    opponent = Player(deck)
+    model = OpponentModel(particles=128, seed=1)
+    
+    # One play leaves 7 unknown deck slots over 9 unseen pool cards
+    first = opponent.hand[1]
+    opponent.elixir = Player.MAX_ELIXIR
+    opponent.play_card(first)
+    model.observe(first)
+    assert abs(model.deck_distribution().probability(first) - 1.0) < 1e-9
+    assert abs(model.deck_distribution().probability(CARD_POOL[9]) - 7 / 9) < 1e-9
+    assert abs(sum(value for _, value in model.hand_distribution()) - 4.0) < 1e-9
+    
+    # After a full cycle the deck is known and the hand is tracked
+    for _ in range(16):
+        card = rng.choice(opponent.hand)
+        opponent.elixir = Player.MAX_ELIXIR
+        opponent.play_card(card)
+        model.observe(card)
+    assert model.resets == 0
+    assert model.deck_distribution().probability(CARD_POOL[9]) == 0.0
+    hand = model.hand_distribution()
+    assert sum(hand.probability(card) for card in opponent.hand) > 3.0
+    
+    # Replaying a card that just cycled out breaks the Player rules
+    known = OpponentModel(deck=deck, particles=32)
+    known.observe(deck[0])
+    known.observe(deck[0])
+    assert known.resets == 1
+
+    # Too few particles run out on valid plays; the history replay keeps
+    # every card seen so far in the deck
+    rng = random.Random(3)
+    cycler = Player(deck)
+    sparse = OpponentModel(particles=16, seed=3)
+    for _ in range(24):
+        card = rng.choice(cycler.hand)
+        cycler.elixir = Player.MAX_ELIXIR
+        cycler.play_card(card)
+        sparse.observe(card)
+        seen = sparse.deck_distribution()
+        for card_id in sparse.history:
+            assert abs(seen.probability(CARD_REGISTRY.get(card_id)) - 1.0) < 1e-9
+    assert sparse.resets > 0
+    assert sparse.next_card_index == cycler.next_card_index
+
+    # Every evaluation path scores the expected counters identically
+    board = Board()
+    scalar = ClashRoyaleEngine(board)
+    engines = [ClashRoyaleEngine(board, use_tables=True),
+               ClashRoyaleEngine(board, cache_size=16)]
+    if np is not None:
+        engines.append(ClashRoyaleEngine(board, vectorized=True))
+    player = Player(CARD_POOL[2:])
+    player.add_elixir(5)
+    expected = scalar.find_best_move(player, Side.FRIENDLY, hand, top_n=6)
+    for engine in engines + engines[1:2]:
+        actual = engine.find_best_move(player, Side.FRIENDLY, hand, top_n=6)
+        assert [(m.card, m.position, m.score) for m in actual] == \
+            [(m.card, m.position, m.score) for m in expected]
+
+    # The lookahead searches take the distribution as it is
+    rival = Player(deck)
+    analysis = scalar.analyze_position(player, Side.FRIENDLY, hand, opponent=rival, search_depth=2)
+    assert analysis['search']['best_move'] is not None
+    result = scalar.mcts_best_move(player, rival, Side.FRIENDLY, hand, iterations=60)
+    assert result.best_move is not None
+    print(f"✓ Inferred {hand} after {model.plays} plays")
+
+
+def test_make_unmake():
+    """Test that make/unmake on Player, Board and search states restores them."""
+    print("Testing make/unmake...")
+    import random
+    from search import SearchState
+    
+    rng = random.Random(11)
+    player = Player(CARD_POOL[:8])
+    reference = Player(CARD_POOL[:8])
+    start = (player.elixir, player.next_card_index, list(player.hand))
+    undo = []
+    for _ in range(40):
+        if rng.random() < 0.5 and player.get_playable_cards():
+            card = rng.choice(player.get_playable_cards())
+            undo.append(player.make_play(card))
+            assert reference.play_card(card)
+        else:
+            undo.append(player.make_elixir(1.3))
+            reference.add_elixir(1.3)
+        assert (player.elixir, player.next_card_index, player.hand) == \
+            (reference.elixir, reference.next_card_index, reference.hand)
+    assert player.make_play(CARD_POOL[9]) is None  # Not in hand
+    for record in reversed(undo):
+        player.unmake(record)
+    assert (player.elixir, player.next_card_index, player.hand) == start
+    
+    # Towers come back, and score tables switch back without a rebuild
+    board = Board()
+    engine = ClashRoyaleEngine(board, use_tables=True)
+    before = engine.find_best_move(reference, Side.FRIENDLY, top_n=5)
+    record = board.make_destroy_tower(Side.ENEMY, 'left')
+    assert board.tower_state(Side.ENEMY) == 0b101
+    engine.find_best_move(reference, Side.FRIENDLY, top_n=5)
+    builds = engine.score_tables.builds
+    board.unmake(record)
+    assert board.tower_state(Side.ENEMY) == 0b111
+    assert engine.find_best_move(reference, Side.FRIENDLY, top_n=5) == before
+    assert engine.score_tables.builds == builds
+    
+    state = SearchState({Side.FRIENDLY: Player(CARD_POOL[:8]), Side.ENEMY: Player(CARD_POOL[2:])},
+                        Side.FRIENDLY, {Side.FRIENDLY: None, Side.ENEMY: None})
+    snapshot = lambda: (state.to_move, dict(state.last_played), [
+        (p.elixir, p.next_card_index, list(p.hand)) for p in state.players.values()
+    ])
+    initial = snapshot()
+    records = [state.make(CARD_POOL[0], 2.0), state.make(None, 2.0), state.make(CARD_POOL[1], 2.0)]
+    assert state.to_move == Side.ENEMY and state.last_played[Side.FRIENDLY] == CARD_POOL[1]
+    for record in reversed(records):
+        state.unmake(record)
+    assert snapshot() == initial
+    print("✓ Player, Board and search state round-trip through make/unmake")
+
+
+def test_benchmark():
+    """Test the benchmark report and baseline comparison."""
+    print("Testing benchmark suite...")
+    import copy
+    import json
+    from benchmark import compare, make_pool, run_benchmarks
+    
+    pool = make_pool(20)
+    assert len(pool) == 20 and len(set(pool)) == 20 and pool[:10] == CARD_POOL
+    report = run_benchmarks(pool_sizes=(10,), pattern=r'^(generate_moves|evaluate_move)/',
+                            min_time=0.01)
+    report = json.loads(json.dumps(report))
+    assert sorted(report['cases']) == ['evaluate_move/pool=10', 'generate_moves/pool=10']
+    for stats in report['cases'].values():
+        assert stats['ops_per_sec'] > 0 and stats['p99_us'] >= stats['p50_us'] > 0
+        assert stats['peak_bytes'] > 0
+    assert compare(report, report) == []
+    
+    faster = copy.deepcopy(report)
+    faster['cases']['evaluate_move/pool=10']['p50_us'] /= 2
+    faster['cases']['generate_moves/pool=10']['peak_bytes'] = 0
+    regressions = compare(report, faster, threshold=0.25, min_bytes=0)
+    assert sorted(message.split(' ')[:2] for message in regressions) == [
+        ['evaluate_move/pool=10:', 'p50'], ['generate_moves/pool=10:', 'peak']
+    ]
+    assert compare(report, faster, threshold=1.5, min_bytes=10 ** 6) == []
+    print(f"✓ Benchmarks report and flag regressions: {regressions[0]}")
+
+
+def test_instrumentation():
+    """Test per-stage instrumentation counters and that disabling removes them."""
+    print("Testing engine instrumentation...")
+    player = Player(CARD_POOL[:8])
+    player.elixir = 10
+    opponents = [GIANT, FIREBALL]
+    engine = ClashRoyaleEngine()
+    expected = engine.find_best_move(player, Side.FRIENDLY, opponents, top_n=3)
+    moves = len(engine.generate_moves(player, Side.FRIENDLY))
+    
+    stats = engine.enable_instrumentation()
+    assert engine.find_best_move(player, Side.FRIENDLY, opponents, top_n=3) == expected
+    counters = stats.as_dict()
+    assert counters['stages']['find_best_move']['calls'] == 1
+    assert counters['stages']['evaluate_move']['calls'] == moves == counters['moves_generated']
+    for stage in ('evaluate_positioning', 'evaluate_card_type', 'evaluate_counters',
+                  'evaluate_strategy'):
+        assert counters['stages'][stage]['calls'] == moves
+    assert counters['stages']['find_best_move']['seconds'] >= \
+        counters['stages']['evaluate_move']['seconds'] > 0
+    
+    result = engine.search_best_move(player, Player(CARD_POOL[2:]), Side.FRIENDLY, depth=2)
+    assert stats.search_nodes == result.nodes
+    text = stats.prometheus()
+    assert 'clasher_engine_stage_calls_total{stage="evaluate_move"} %d' % moves in text
+    assert '# TYPE clasher_engine_moves_generated_total counter' in text
+    
+    assert engine.disable_instrumentation() is stats
+    assert not any(name in engine.__dict__ for name in stats.STAGES + ('iter_moves',))
+    engine.find_best_move(player, Side.FRIENDLY, opponents, top_n=3)
+    assert stats.as_dict()['stages']['find_best_move']['calls'] == 1
+    
+    tables = ClashRoyaleEngine(use_tables=True)
+    stats = tables.enable_instrumentation(['find_best_move', '_best_moves_from_tables'])
+    tables.find_best_move(player, Side.FRIENDLY, opponents, top_n=1)
+    assert stats.moves_pruned == tables.last_pruned > 0
+    assert stats.moves_generated == moves
+    print(f"✓ Instrumentation counted {moves} moves and {stats.moves_pruned} pruned")
+
+
+def test_score_breakdown():
+    """Test that score breakdowns add up to the move scores on every path."""
+    print("Testing score breakdown...")
+    from move import Move
+    player = Player(CARD_POOL[:8])
+    player.elixir = 10
+    opponents = [GIANT, FIREBALL]
+    engine = ClashRoyaleEngine()
+    expected = engine.find_best_move(player, Side.FRIENDLY, opponents, top_n=10)
+    
+    def total(move):
+        score = 0.0
+        for value in move.breakdown:
+            score += value
+        return score
+    
+    engines = [engine, ClashRoyaleEngine(use_tables=True), ClashRoyaleEngine(cache_size=8)]
+    try:
+        engines.append(ClashRoyaleEngine(vectorized=True))
+    except ImportError:
+        pass
+    for other in engines:
+        moves = other.find_best_move(player, Side.FRIENDLY, opponents, top_n=10, breakdown=True)
+        assert [(m.card, m.position, m.score) for m in moves] == \
+            [(m.card, m.position, m.score) for m in expected]
+        assert all(len(m.breakdown) == len(Move.COMPONENTS) and total(m) == m.score
+                   for m in moves)
+    assert expected[0].breakdown is None and expected[0].explain() is None
+    
+    move = engine.generate_moves(player, Side.FRIENDLY)[0]
+    score, parts = engine.evaluate_move_breakdown(move, Side.FRIENDLY)
+    assert score == engine.evaluate_move(move, Side.FRIENDLY) and parts[3] == 0.0
+    analysis = engine.analyze_position(player, Side.FRIENDLY, opponents, breakdown=True)
+    assert set(analysis['best_moves'][0]['breakdown']) == set(Move.COMPONENTS)
+    
+    try:
+        from batch import BatchEvaluator
+        moves = engine.generate_moves(player, Side.FRIENDLY)
+        components = engine.evaluate_moves_breakdown(moves, Side.FRIENDLY, opponents)
+    except ImportError:
+        print("✓ Breakdowns match (NumPy not installed, array form skipped)")
+        return
+    assert components.shape == (len(moves), len(Move.COMPONENTS))
+    assert BatchEvaluator.sum_components(components).tolist() == [
+        engine.evaluate_move(m, Side.FRIENDLY, opponents) for m in moves
+    ]
+    print(f"✓ Breakdowns add up to scores; array form is {components.shape}")
+
+
+def test_deck_optimizer():
+    """Test that branch and bound finds the same deck as exhaustive search."""
+    print("Testing deck optimizer...")
+    import itertools
+    from benchmark import make_pool
+    from deckbuilder import DeckOptimizer
+    
+    pool = make_pool(12)
+    optimizer = DeckOptimizer(card_pool=pool, elixir_weight=3.0, target_elixir=3.2)
+    result = optimizer.optimize()
+    best = max(optimizer.score(deck)[0] for deck in itertools.combinations(pool, 8))
+    assert result.optimal and abs(result.score - best) < 1e-9
+    assert len(set(result.deck)) == 8 and all(card in pool for card in result.deck)
+    assert result.average_elixir == result.player().get_average_elixir()
+    assert result.nodes < 495  # C(12, 8) complete decks
+    
+    large = DeckOptimizer(card_pool=make_pool(120)).optimize()
+    assert large.optimal and large.elapsed < 10.0
+    limited = DeckOptimizer(card_pool=make_pool(120)).optimize(node_limit=5)
+    assert not limited.optimal and len(limited.deck) == 8 and limited.score <= large.score
+    print(f"✓ Best deck from 120 cards in {large.nodes} nodes: {large}")
+
+
+def test_card_database():
+    """Test loading cards from JSON/CSV through the binary cache."""
+    print("Testing card database...")
+    import json
+    import os
+    import pickle
+    import tempfile
+    from carddb import CardDatabase, dump_cards
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in ('json', 'csv'):
+            path = os.path.join(tmp, f'cards.{extension}')
+            dump_cards(CARD_POOL, path)
+            first = CardDatabase(path)
+            assert first.compiled and os.path.exists(path + '.crdb')
+            database = CardDatabase(path)
+            assert not database.compiled
+            assert database.cards() == CARD_POOL and len(database) == len(CARD_POOL)
+            assert database.get('Giant') == GIANT and database.get('Golem') is None
+            assert database.names() == [card.name for card in CARD_POOL]
+            assert pickle.loads(pickle.dumps(database)).get('Knight') == KNIGHT
+        
+        # A balance patch loads side by side with the live cards
+        rows = json.load(open(os.path.join(tmp, 'cards.json')))
+        rows[0]['damage'] += 20
+        patch_path = os.path.join(tmp, 'patch.json')
+        with open(patch_path, 'w') as f:
+            json.dump(rows, f)
+        patch = CardDatabase(patch_path)
+        assert patch.get('Knight').damage == KNIGHT.damage + 20
+        assert patch.get('Knight') != KNIGHT and patch.get('Archers') == CARD_POOL[1]
+        
+        # Editing the source rebuilds the cache
+        rows[0]['elixir_cost'] = 2
+        with open(patch_path, 'w') as f:
+            json.dump(rows, f, indent=1)
+        patch = CardDatabase(patch_path)
+        assert patch.compiled and patch.get('Knight').elixir_cost == 2
+        
+        bad_path = os.path.join(tmp, 'bad.json')
+        with open(bad_path, 'w') as f:
+            json.dump([{'name': 'Nope', 'card_type': 'tank'}], f)
+        try:
+            CardDatabase(bad_path)
+            assert False, "Malformed card file accepted"
+        except ValueError as e:
+            assert 'card 1' in str(e)
+
+        # Numbers are parsed strictly and range-checked
+        good = {'name': 'Strict', 'card_type': 'troop', 'rarity': 'common',
+                'target_type': 'ground', 'elixir_cost': '3.0', 'damage': 1e3}
+        with open(bad_path, 'w') as f:
+            json.dump([good], f)
+        assert CardDatabase(bad_path).get('Strict').elixir_cost == 3
+        for field, value in (('elixir_cost', 4.7), ('elixir_cost', 300),
+                             ('damage', 2 ** 40), ('range', -1), ('hit_speed', 'fast')):
+            with open(bad_path, 'w') as f:
+                json.dump([dict(good, **{field: value})], f)
+            try:
+                CardDatabase(bad_path)
+                assert False, f"{field}={value!r} accepted"
+            except ValueError as e:
+                assert 'card 1' in str(e) and field in str(e)
+
+        # An unwritable cache location falls back to an in-memory cache
+        unwritable = os.path.join(tmp, 'missing', 'cards.crdb')
+        database = CardDatabase(os.path.join(tmp, 'cards.csv'), cache_path=unwritable)
+        assert database.compiled and not database.cached
+        assert database.cards() == CARD_POOL and database.get('Giant') == GIANT
+        assert not os.path.exists(os.path.dirname(unwritable))
+    print("✓ Card database loads from JSON/CSV and reuses its cache")
+
+
+def test_replay_pipeline():
+    """Test streaming replay annotation."""
+    print("Testing replay annotation...")
+    import io
+    import json
+    import os
+    import tempfile
+    from replay import ReplayAnnotator, read_events
+    
+    friendly = [card.name for card in CARD_POOL[:8]]
+    enemy = [card.name for card in CARD_POOL[2:10]]
+    events = [
+        {'type': 'match', 'match': 'a', 'friendly_deck': friendly, 'enemy_deck': enemy},
+        {'type': 'match', 'match': 'b', 'friendly_deck': enemy, 'enemy_deck': friendly},
+        {'type': 'play', 'match': 'a', 'side': 'friendly', 'card': 'Knight', 'x': 9, 'y': 8, 'time': 3.0, 'elixir': 7},
+        {'type': 'play', 'match': 'b', 'side': 'enemy', 'card': 'Archers', 'x': 3, 'y': 24, 'time': 3.5},
+        {'type': 'play', 'match': 'a', 'side': 'enemy', 'card': 'Giant', 'x': 9, 'y': 24, 'time': 4.0},
+        {'type': 'tower', 'match': 'a', 'side': 'enemy', 'tower': 'left', 'time': 6.0},
+        {'type': 'play', 'match': 'a', 'side': 'friendly', 'card': 'Wizard', 'x': 9, 'y': 8, 'time': 7.0},
+        {'type': 'end', 'match': 'a'},
+        {'type': 'play', 'match': 'a', 'side': 'friendly', 'card': 'Giant', 'x': 9, 'y': 8, 'time': 9.0},
+        {'type': 'play', 'match': 'b', 'side': 'enemy', 'card': 'Knight', 'x': 9, 'y': 24, 'time': 5.0, 'elixir': 'lots'},
+        {'type': 'play', 'match': 'b', 'side': 'enemy', 'card': 'Wizard', 'x': 9, 'y': 24, 'time': 30.0},
+        {'type': 'play', 'match': 'b', 'side': 'friendly', 'card': 'Giant', 'x': 9, 'y': 8, 'time': 1.0},
+        {'type': 'play', 'match': 'b', 'side': 'friendly', 'card': 'Fireball', 'x': 9, 'y': 8, 'time': 2.0},
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'replay.jsonl')
+        with open(path, 'w') as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+        assert list(read_events([path])) == events
+        
+        output = io.StringIO()
+        annotator = ReplayAnnotator(batch_size=2)
+        counts = annotator.run([path], output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert counts == {'events': 13, 'plays': 5, 'warnings': 1, 'errors': 4}
+        assert [result['type'] for result in results] == [event['type'] for event in events]
+        assert 'b' in annotator.matches and 'a' not in annotator.matches
+        
+        # Rejected plays are reported per event and leave the match unchanged
+        assert results[9]['error'] == "elixir must be a number, not 'lots'"
+        assert results[10]['error'] == "Wizard is not in hand"
+        rival = annotator.matches['b'].players[Side.ENEMY]
+        assert annotator.matches['b'].times[Side.ENEMY] == 3.5
+        assert abs(rival.elixir - (Player.STARTING_ELIXIR + 3.5 * Player.ELIXIR_RATE - 3)) < 1e-9
+        
+        # A logged play beats a regenerated estimate that cannot afford it
+        assert 'warning' not in results[11]
+        assert results[12]['warning'].startswith("estimated elixir 0.71 is below the cost of Fireball")
+        assert 'annotation' in results[12]
+        assert annotator.matches['b'].players[Side.FRIENDLY].elixir == 0
+        
+        # The best move never scores below the move played
+        annotated = [result['annotation'] for result in results if 'annotation' in result]
+        assert len(annotated) == 5
+        for annotation in annotated:
+            assert annotation['gap'] >= 0
+            assert abs(annotation['best']['score'] - annotation['played_score'] - annotation['gap']) < 1e-3
+        assert results[6]['error'] == "Wizard is not in hand"
+        assert 'unknown match' in results[8]['error']
+        
+        # Worker processes stream the same results in the same order
+        parallel = io.StringIO()
+        ReplayAnnotator(workers=2, batch_size=1, max_pending=2).run([path], parallel)
+        assert parallel.getvalue() == output.getvalue()
+        
+        # Unreadable lines become error records and the stream goes on
+        with open(path, 'a') as f:
+            f.write("{not json\n[1, 2]\n")
+            f.write(json.dumps(events[-1]) + "\n")
+        read = list(read_events([path]))
+        assert ':14:' in read[13]['error'] and read[14]['error'].endswith(':15: expected a JSON object')
+        assert read[15] == events[-1]
+        counts = ReplayAnnotator().run([path], io.StringIO())
+        assert counts == {'events': 16, 'plays': 5, 'warnings': 1, 'errors': 7}
+    print("✓ Replays stream through the engine with best-move annotations")
+
+
 def run_all_tests():
     """Run all tests."""
     print("=" * 70)
@@ -136,7 +1237,33 @@ def run_all_tests():
         test_move_generation,
         test_move_evaluation,
         test_best_move_finder,
-        test_engine_analysis
+        test_engine_analysis,
+        test_vectorized_matches_scalar,
+        test_score_tables,
+        test_lookahead_search,
+        test_iterative_deepening,
+        test_transposition_table,
+        test_mcts,
+        test_card_registry,
+        test_position_grid,
+        test_top_n_selection,
+        test_tile_placement,
+        test_batch_analysis,
+        test_analysis_server,
+        test_result_cache,
+        test_match_simulator,
+        test_unit_store,
+        test_eval_weights,
+        test_tournament,
+        test_counter_matrix,
+        test_opponent_model,
+        test_make_unmake,
+        test_benchmark,
+        test_instrumentation,
+        test_score_breakdown,
+        test_deck_optimizer,
+        test_card_database,
+        test_replay_pipeline
     ]
     
     passed = 0
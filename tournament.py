@@ -0,0 +1,432 @@
+"""
+Self-play tournaments for tuning evaluation weights.
+
+A ``Tournament`` plays a candidate weight vector against a baseline with
+``simulator.simulate_match``, both sides driven by ``EnginePolicy``. Games
+come in pairs with the same seed and decks, the candidate playing each side
+once, which cancels most of the deck and side advantage. Games run in a
+process pool and an ``SPRT`` (sequential probability ratio test) stops the
+tournament as soon as the results decide between "no better than elo0" and
+"at least elo1 better".
+
+Results are consumed in game order, so a tournament with a given seed
+reaches the same decision after the same number of games regardless of the
+number of workers.
+
+Every game is appended to a ``TournamentLog`` as soon as it is known::
+
+    R <run> {"candidate": [...], "baseline": [...], ...}
+    G <run> <game> <seed> W
+    E <run> {"status": "H1", "games": 412, ...}
+
+Run with ``python tournament.py --set rush_base=24 --workers 8 --log tune.log``.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from card import Card, CARD_POOL
+from board import Side
+from weights import DEFAULT_WEIGHTS, EvalWeights
+
+
+def _expected_score(elo: float) -> float:
+    """Expected score of a player rated ``elo`` points above its opponent."""
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+class SPRT:
+    """
+    Sequential probability ratio test on game results.
+
+    Uses the normal approximation to the generalized SPRT: the log
+    likelihood ratio of H1 (elo1) against H0 (elo0) is estimated from the
+    observed win/draw/loss counts and compared with the Wald bounds.
+    """
+
+    def __init__(self, elo0: float = 0.0, elo1: float = 10.0,
+                 alpha: float = 0.05, beta: float = 0.05):
+        """
+        Initialize the test.
+
+        Args:
+            elo0: Elo difference of the null hypothesis
+            elo1: Elo difference of the alternative hypothesis
+            alpha: Probability of accepting H1 when H0 is true
+            beta: Probability of accepting H0 when H1 is true
+        """
+        if elo1 <= elo0:
+            raise ValueError("elo1 must be greater than elo0")
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    @property
+    def games(self) -> int:
+        """Number of games recorded."""
+        return self.wins + self.draws + self.losses
+
+    def add(self, outcome: float):
+        """
+        Record one game.
+
+        Args:
+            outcome: 1 for a candidate win, 0.5 for a draw, 0 for a loss
+        """
+        if outcome == 1.0:
+            self.wins += 1
+        elif outcome == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def score(self) -> float:
+        """Mean score of the candidate (0.5 before any game)."""
+        if not self.games:
+            return 0.5
+        return (self.wins + 0.5 * self.draws) / self.games
+
+    def llr(self) -> float:
+        """Log likelihood ratio of H1 against H0."""
+        games = self.games
+        if not games:
+            return 0.0
+        score = self.score()
+        variance = (self.wins + 0.25 * self.draws) / games - score * score
+        if variance <= 0:
+            # All results identical: pretend one game went the other way
+            # so the estimate stays finite
+            variance = 1.0 / (4 * games)
+        s0 = _expected_score(self.elo0)
+        s1 = _expected_score(self.elo1)
+        return games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+    def status(self) -> Optional[str]:
+        """'H1' (candidate is better), 'H0' (it is not), or None if undecided."""
+        llr = self.llr()
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+    def elo(self) -> float:
+        """Elo difference estimated from the mean score."""
+        score = min(max(self.score(), 1e-3), 1 - 1e-3)
+        return -400.0 * math.log10(1.0 / score - 1.0)
+
+    def __repr__(self) -> str:
+        return (f"SPRT(+{self.wins} ={self.draws} -{self.losses}, "
+                f"llr {self.llr():.2f} in [{self.lower:.2f}, {self.upper:.2f}])")
+
+
+class TournamentLog:
+    """Append-only text log of tournament runs, one line per event."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the log.
+
+        Args:
+            path: File to append to (created if missing)
+        """
+        self.path = path
+
+    def start(self, info: dict) -> str:
+        """
+        Record the start of a run.
+
+        Args:
+            info: JSON-serializable run parameters
+
+        Returns:
+            ID of the new run
+        """
+        run = uuid.uuid4().hex[:8]
+        self._append(f"R {run} {json.dumps(info, separators=(',', ':'))}")
+        return run
+
+    def game(self, run: str, game: int, seed: int, outcome: float):
+        """
+        Record one game result.
+
+        Args:
+            run: Run ID
+            game: Game number within the run
+            seed: Match seed
+            outcome: Candidate's result (1, 0.5 or 0)
+        """
+        result = 'W' if outcome == 1.0 else 'L' if outcome == 0.0 else 'D'
+        self._append(f"G {run} {game} {seed} {result}")
+
+    def finish(self, run: str, summary: dict):
+        """
+        Record the end of a run.
+
+        Args:
+            run: Run ID
+            summary: JSON-serializable run summary
+        """
+        self._append(f"E {run} {json.dumps(summary, separators=(',', ':'))}")
+
+    def _append(self, line: str):
+        # One flushed write per line, so a crash loses at most the line
+        # being written
+        with open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    @staticmethod
+    def read(path: str) -> List[dict]:
+        """
+        Parse a log file.
+
+        Args:
+            path: Log file
+
+        Returns:
+            One dict per run, in start order, with keys 'run', 'info',
+            'games' (list of (game, seed, result letter)) and 'summary'
+            (None if the run did not finish)
+        """
+        runs: Dict[str, dict] = {}
+        with open(path) as f:
+            for line in f:
+                parts = line.rstrip('\n').split(' ', 2)
+                if len(parts) < 3:
+                    continue  # Truncated last line
+                kind, run, rest = parts
+                if kind == 'R':
+                    runs[run] = {'run': run, 'info': json.loads(rest),
+                                 'games': [], 'summary': None}
+                elif kind == 'G' and run in runs:
+                    game, seed, result = rest.split(' ')
+                    runs[run]['games'].append((int(game), int(seed), result))
+                elif kind == 'E' and run in runs:
+                    runs[run]['summary'] = json.loads(rest)
+        return list(runs.values())
+
+
+class TournamentResult:
+    """Outcome of a tournament."""
+
+    def __init__(self, status: str, sprt: SPRT, run: Optional[str], duration: float):
+        """
+        Initialize a result.
+
+        Args:
+            status: 'H1', 'H0', or 'max_games' if the test did not decide
+            sprt: Test holding the game counts
+            run: Log run ID (None without a log)
+            duration: Wall-clock seconds
+        """
+        self.status = status
+        self.wins = sprt.wins
+        self.draws = sprt.draws
+        self.losses = sprt.losses
+        self.games = sprt.games
+        self.llr = sprt.llr()
+        self.elo = sprt.elo()
+        self.run = run
+        self.duration = duration
+
+    def summary(self) -> dict:
+        """Get the result as a JSON-serializable dict."""
+        return {
+            'status': self.status, 'games': self.games, 'wins': self.wins,
+            'draws': self.draws, 'losses': self.losses,
+            'llr': round(self.llr, 4), 'elo': round(self.elo, 2),
+            'seconds': round(self.duration, 2)
+        }
+
+    def __repr__(self) -> str:
+        return (f"TournamentResult({self.status}, +{self.wins} ={self.draws} -{self.losses}, "
+                f"elo {self.elo:+.1f}, llr {self.llr:.2f})")
+
+
+def play_game(job) -> float:
+    """
+    Play one tournament game (process pool entry point).
+
+    Args:
+        job: (seed, candidate weights, baseline weights, friendly deck,
+            enemy deck, candidate side, min elixir, match options)
+
+    Returns:
+        Candidate's result: 1, 0.5 or 0
+    """
+    from simulator import EnginePolicy, simulate_match
+    seed, candidate, baseline, friendly_deck, enemy_deck, candidate_side, min_elixir, options = job
+    engine_options = {'use_tables': True, 'tt_bytes': 0, 'cache_size': 1024}
+    policies = {
+        candidate_side: EnginePolicy(min_elixir, weights=candidate, **engine_options),
+        (Side.ENEMY if candidate_side == Side.FRIENDLY else Side.FRIENDLY):
+            EnginePolicy(min_elixir, weights=baseline, **engine_options),
+    }
+    result = simulate_match(friendly_deck, enemy_deck, policies[Side.FRIENDLY],
+                            policies[Side.ENEMY], seed=seed, **options)
+    return result.outcome(candidate_side)
+
+
+class Tournament:
+    """
+    Candidate-vs-baseline self-play with SPRT early stopping.
+    """
+
+    def __init__(
+        self,
+        candidate: EvalWeights,
+        baseline: Optional[EvalWeights] = None,
+        decks: Optional[Sequence[Sequence[Card]]] = None,
+        sprt: Optional[SPRT] = None,
+        workers: int = 1,
+        max_games: int = 20000,
+        seed: int = 0,
+        log_path: Optional[str] = None,
+        min_elixir: float = 7.0,
+        **match_options
+    ):
+        """
+        Initialize a tournament.
+
+        Args:
+            candidate: Weights under test
+            baseline: Weights to compare against (defaults if None)
+            decks: Decks to draw from; each game pair uses two of them
+                (defaults to two decks from CARD_POOL)
+            sprt: Stopping rule (SPRT() if None)
+            workers: Number of processes (1 plays in-process)
+            max_games: Games after which an undecided tournament stops
+            seed: Seed of the first game pair; later pairs count up from it
+            log_path: Append-only log file (None disables logging)
+            min_elixir: EnginePolicy min_elixir for both players
+            **match_options: Extra MatchSimulator parameters (duration, tick, ...)
+        """
+        self.candidate = candidate
+        self.baseline = baseline if baseline is not None else DEFAULT_WEIGHTS
+        self.decks = [list(deck) for deck in (decks or (CARD_POOL[:8], CARD_POOL[2:]))]
+        self.sprt = sprt or SPRT()
+        self.workers = workers
+        self.max_games = max_games
+        self.seed = seed
+        self.log = TournamentLog(log_path) if log_path else None
+        self.min_elixir = min_elixir
+        self.match_options = match_options
+
+    def jobs(self):
+        """Yield game jobs in order: two games (one per side) per seed."""
+        rng = random.Random(self.seed)
+        pair = 0
+        while 2 * pair < self.max_games:
+            seed = self.seed + pair
+            friendly_deck = rng.choice(self.decks)
+            enemy_deck = rng.choice(self.decks)
+            for candidate_side in (Side.FRIENDLY, Side.ENEMY):
+                yield (seed, self.candidate, self.baseline, friendly_deck, enemy_deck,
+                       candidate_side, self.min_elixir, self.match_options)
+            pair += 1
+
+    def run(self) -> TournamentResult:
+        """
+        Play games until the SPRT decides or max_games is reached.
+
+        Returns:
+            Tournament result
+        """
+        started = time.perf_counter()
+        run = None
+        if self.log is not None:
+            run = self.log.start({
+                'candidate': self.candidate.vector(),
+                'baseline': self.baseline.vector(),
+                'elo0': self.sprt.elo0, 'elo1': self.sprt.elo1,
+                'alpha': self.sprt.alpha, 'beta': self.sprt.beta,
+                'seed': self.seed, 'workers': self.workers
+            })
+
+        status = None
+        jobs = self.jobs()
+        if self.workers <= 1:
+            for game, job in enumerate(jobs):
+                status = self._record(run, game, job[0], play_game(job))
+                if status:
+                    break
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                # Keep a bounded window of games in flight and consume them in
+                # submission order, so the stopping point is deterministic
+                window = deque()
+                game = 0
+                for job in jobs:
+                    window.append((job[0], pool.submit(play_game, job)))
+                    if len(window) < 2 * self.workers:
+                        continue
+                    seed, future = window.popleft()
+                    status = self._record(run, game, seed, future.result())
+                    game += 1
+                    if status:
+                        break
+                while window and not status:
+                    seed, future = window.popleft()
+                    status = self._record(run, game, seed, future.result())
+                    game += 1
+                for _, future in window:
+                    future.cancel()
+
+        result = TournamentResult(status or 'max_games', self.sprt, run,
+                                  time.perf_counter() - started)
+        if self.log is not None:
+            self.log.finish(run, result.summary())
+        return result
+
+    def _record(self, run: Optional[str], game: int, seed: int, outcome: float) -> Optional[str]:
+        """Log one result and update the test; returns the SPRT decision."""
+        self.sprt.add(outcome)
+        if self.log is not None:
+            self.log.game(run, game, seed, outcome)
+        return self.sprt.status()
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Tune evaluation weights by self-play")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="candidate weight to change (repeatable)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-games', type=int, default=20000)
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log', default='tournament.log')
+    args = parser.parse_args()
+
+    changes = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        changes[name] = float(value)
+    tournament = Tournament(
+        DEFAULT_WEIGHTS.replace(**changes),
+        sprt=SPRT(args.elo0, args.elo1, args.alpha, args.beta),
+        workers=args.workers, max_games=args.max_games,
+        seed=args.seed, log_path=args.log
+    )
+    print(tournament.run())
+
+
+if __name__ == "__main__":
+    main()
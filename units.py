@@ -0,0 +1,389 @@
+"""
+Struct-of-arrays unit storage with a uniform-grid spatial hash.
+
+``UnitStore`` keeps every unit (troops, buildings and crown towers) in
+parallel arrays indexed by a slot number, with card stats gathered from the
+CARD_REGISTRY arrays by card ID. Each side has its own grid of buckets over
+the arena, so nearest-target and splash queries only look at the few cells
+that overlap the query radius instead of at every unit.
+"""
+
+import math
+from array import array
+from typing import List, Tuple
+
+from board import Board
+from card import CardType, TargetType, CARD_REGISTRY
+
+
+# Unit kinds
+TROOP = 0
+BUILDING = 1
+TOWER = 2
+
+# Target masks (one bit per kind)
+TARGET_ALL = (1 << TROOP) | (1 << BUILDING) | (1 << TOWER)
+TARGET_STRUCTURES = (1 << BUILDING) | (1 << TOWER)
+TARGET_MOBILE = (1 << TROOP) | (1 << BUILDING)
+
+_BUILDING_TYPE = CARD_REGISTRY.CARD_TYPES.index(CardType.BUILDING)
+_UNIT_TARGETS = (
+    CARD_REGISTRY.TARGET_TYPES.index(TargetType.GROUND),
+    CARD_REGISTRY.TARGET_TYPES.index(TargetType.BOTH),
+)
+
+
+class UnitStore:
+    """
+    Parallel arrays of unit state plus a per-side spatial hash.
+
+    Sides are stored as 0 (friendly) and 1 (enemy). Slots of removed units
+    are reused, so indices are only stable while a unit is alive.
+    """
+
+    # Edge length of a spatial hash cell, in tiles (about the sight range,
+    # so a sight query scans a 3 x 3 block of cells)
+    CELL_SIZE = 3.0
+
+    # Sides with at most this many units are scanned without the grid
+    SCAN_LIMIT = 12
+
+    def __init__(self, width: float = Board.WIDTH, height: float = Board.HEIGHT):
+        """
+        Initialize an empty store.
+
+        Args:
+            width: Arena width covered by the spatial hash
+            height: Arena height covered by the spatial hash
+        """
+        self.columns = int(width // self.CELL_SIZE) + 1
+        self.rows = int(height // self.CELL_SIZE) + 1
+        self.cells: Tuple[List[List[int]], List[List[int]]] = (
+            [[] for _ in range(self.columns * self.rows)],
+            [[] for _ in range(self.columns * self.rows)],
+        )
+        self.card_id = array('i')
+        self.side = array('b')
+        self.kind = array('b')
+        self.target_mask = array('b')
+        self.alive = array('b')
+        self.cell = array('i')
+        # Unique ID of the unit in each slot, and the slot and ID of its
+        # current target (-1 if none); IDs tell a reused slot apart. The
+        # simulator's tick loop reads and updates the lock on these arrays
+        self.uid = array('i')
+        self.target = array('i')
+        self.target_uid = array('i')
+        self.x = array('d')
+        self.y = array('d')
+        self.hp = array('d')
+        self.speed = array('d')
+        self.range_sq = array('d')
+        self.sight_sq = array('d')
+        self.damage = array('d')
+        self.hit_speed = array('d')
+        self.splash_sq = array('d')
+        self.cooldown = array('d')
+        self.lifetime = array('d')
+        self.lane_x = array('d')
+        # Game time before which a unit with nothing in sight won't search again
+        self.next_search = array('d')
+        # Cached bucket neighborhoods per side and reach per squared radius
+        self._neighborhoods: Tuple[dict, dict] = ({}, {})
+        self._reach: dict = {}
+        # Live units of each side, scanned directly while there are few
+        self.members: Tuple[List[int], List[int]] = ([], [])
+        # Live troops and buildings per side (what towers can shoot at)
+        self.mobile = [0, 0]
+        self._free: List[int] = []
+        self._next_uid = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        """Number of slots (alive or free)."""
+        return len(self.alive)
+
+    def _cell_of(self, x: float, y: float) -> int:
+        """Spatial hash cell containing a point (clamped to the arena)."""
+        column = int(x / self.CELL_SIZE)
+        row = int(y / self.CELL_SIZE)
+        if column < 0:
+            column = 0
+        elif column >= self.columns:
+            column = self.columns - 1
+        if row < 0:
+            row = 0
+        elif row >= self.rows:
+            row = self.rows - 1
+        return row * self.columns + column
+
+    def add(
+        self,
+        card_id: int,
+        side: int,
+        kind: int,
+        x: float,
+        y: float,
+        hp: float,
+        speed: float,
+        attack_range: float,
+        sight: float,
+        damage: float,
+        hit_speed: float,
+        splash_radius: float,
+        target_mask: int,
+        cooldown: float = 0.0,
+        lifetime: float = math.inf,
+        lane_x: float = 0.0
+    ) -> int:
+        """
+        Add a unit with explicit stats.
+
+        Args:
+            card_id: Registry ID of the unit's card (-1 for towers)
+            side: 0 for friendly, 1 for enemy
+            kind: TROOP, BUILDING or TOWER
+            x: X coordinate
+            y: Y coordinate
+            hp: Hitpoints
+            speed: Movement speed in tiles per second
+            attack_range: Attack range in tiles
+            sight: Distance at which targets are acquired
+            damage: Damage per hit
+            hit_speed: Seconds between hits
+            splash_radius: Splash radius of each hit (0 for single target)
+            target_mask: Bitmask of kinds the unit may attack
+            cooldown: Seconds until the first hit
+            lifetime: Seconds until the unit expires
+            lane_x: X coordinate of the bridge the unit walks over
+
+        Returns:
+            Slot index of the unit
+        """
+        cell = self._cell_of(x, y)
+        uid = self._next_uid
+        self._next_uid += 1
+        values = (
+            (self.card_id, card_id), (self.side, side), (self.kind, kind),
+            (self.target_mask, target_mask), (self.alive, 1), (self.cell, cell),
+            (self.uid, uid), (self.target, -1), (self.target_uid, -1),
+            (self.x, x), (self.y, y), (self.hp, hp), (self.speed, speed),
+            (self.range_sq, attack_range * attack_range), (self.sight_sq, sight * sight),
+            (self.damage, damage), (self.hit_speed, hit_speed),
+            (self.splash_sq, splash_radius * splash_radius),
+            (self.cooldown, cooldown), (self.lifetime, lifetime), (self.lane_x, lane_x),
+            (self.next_search, 0.0),
+        )
+        if self._free:
+            index = self._free.pop()
+            for column, value in values:
+                column[index] = value
+        else:
+            index = len(self.alive)
+            for column, value in values:
+                column.append(value)
+        self.cells[side][cell].append(index)
+        self.members[side].append(index)
+        if kind != TOWER:
+            self.mobile[side] += 1
+        self.count += 1
+        return index
+
+    def add_card(
+        self,
+        card_id: int,
+        side: int,
+        x: float,
+        y: float,
+        hp_per_elixir: float,
+        building_hp_per_elixir: float,
+        speed: float,
+        melee_range: float,
+        sight: float,
+        cooldown: float,
+        building_lifetime: float,
+        lane_x: float
+    ) -> int:
+        """
+        Add a troop or building using the card's stats from the registry.
+
+        Args:
+            card_id: Registry ID of the card played
+            side: 0 for friendly, 1 for enemy
+            x: X coordinate
+            y: Y coordinate
+            hp_per_elixir: Troop hitpoints per elixir of card cost
+            building_hp_per_elixir: Building hitpoints per elixir of card cost
+            speed: Troop movement speed
+            melee_range: Minimum attack range
+            sight: Minimum sight range
+            cooldown: Deploy time before the first hit
+            building_lifetime: Seconds a building lasts
+            lane_x: X coordinate of the bridge the unit walks over
+
+        Returns:
+            Slot index of the unit
+        """
+        registry = CARD_REGISTRY
+        building = registry.card_type[card_id] == _BUILDING_TYPE
+        cost = registry.elixir_cost[card_id]
+        attack_range = max(registry.range[card_id], melee_range)
+        hit_speed = registry.hit_speed[card_id]
+        splash = registry.splash_radius[card_id] if registry.area_damage[card_id] else 0.0
+        # Every unit is a ground unit, so AIR-only attackers can only hit
+        # buildings and towers
+        targets = TARGET_ALL if registry.target_type[card_id] in _UNIT_TARGETS else TARGET_STRUCTURES
+        return self.add(
+            card_id, side, BUILDING if building else TROOP, x, y,
+            float(cost * (building_hp_per_elixir if building else hp_per_elixir)),
+            0.0 if building else speed,
+            attack_range, max(attack_range, sight),
+            float(registry.damage[card_id]),
+            hit_speed if hit_speed > 0 else 1.0,
+            splash, targets, cooldown,
+            building_lifetime if building else math.inf,
+            lane_x
+        )
+
+    def remove(self, index: int):
+        """
+        Remove a unit and free its slot.
+
+        Args:
+            index: Slot index of a live unit
+        """
+        if not self.alive[index]:
+            return
+        self.alive[index] = 0
+        side = self.side[index]
+        self.cells[side][self.cell[index]].remove(index)
+        self.members[side].remove(index)
+        if self.kind[index] != TOWER:
+            self.mobile[side] -= 1
+        self._free.append(index)
+        self.count -= 1
+
+    def move(self, index: int, x: float, y: float):
+        """
+        Move a unit, updating its spatial hash cell.
+
+        Args:
+            index: Slot index of a live unit
+            x: New x coordinate
+            y: New y coordinate
+        """
+        self.x[index] = x
+        self.y[index] = y
+        cell = self._cell_of(x, y)
+        old = self.cell[index]
+        if cell != old:
+            bucket = self.cells[self.side[index]]
+            bucket[old].remove(index)
+            bucket[cell].append(index)
+            self.cell[index] = cell
+
+    def _neighborhood(self, side: int, x: float, y: float, radius_sq: float) -> List[List[int]]:
+        """
+        Buckets of a side that may hold units within a radius of a point.
+
+        The cells within ceil(radius / CELL_SIZE) of the point's cell are
+        cached per (cell, reach), so a query is a dictionary lookup plus a
+        scan of a few buckets.
+        """
+        reach = self._reach.get(radius_sq)
+        if reach is None:
+            reach = self._reach[radius_sq] = math.ceil(math.sqrt(radius_sq) / self.CELL_SIZE)
+        key = (self._cell_of(x, y), reach)
+        hood = self._neighborhoods[side].get(key)
+        if hood is None:
+            columns = self.columns
+            cell = key[0]
+            column, row = cell % columns, cell // columns
+            cells = self.cells[side]
+            hood = [
+                cells[r * columns + c]
+                for r in range(max(row - reach, 0), min(row + reach, self.rows - 1) + 1)
+                for c in range(max(column - reach, 0), min(column + reach, columns - 1) + 1)
+            ]
+            self._neighborhoods[side][key] = hood
+        return hood
+
+    def nearest(self, x: float, y: float, side: int, radius_sq: float, mask: int) -> Tuple[int, float]:
+        """
+        Find the nearest live unit of a side within a radius.
+
+        Ties go to the lower slot index, so results are deterministic.
+
+        Args:
+            x: Query x coordinate
+            y: Query y coordinate
+            side: Side whose units to search
+            radius_sq: Squared search radius
+            mask: Bitmask of kinds to consider
+
+        Returns:
+            Tuple of (slot index, squared distance), or (-1, inf) if none
+        """
+        members = self.members[side]
+        if len(members) <= self.SCAN_LIMIT:
+            buckets = (members,)
+        else:
+            buckets = self._neighborhood(side, x, y, radius_sq)
+        xs, ys, hp, kind = self.x, self.y, self.hp, self.kind
+        best = -1
+        best_sq = radius_sq
+        for bucket in buckets:
+            for index in bucket:
+                dx = xs[index] - x
+                dy = ys[index] - y
+                dist_sq = dx * dx + dy * dy
+                # Distance first: most candidates are too far to matter
+                if dist_sq > best_sq or (dist_sq == best_sq and 0 <= best < index):
+                    continue
+                if hp[index] > 0 and (mask >> kind[index]) & 1:
+                    best, best_sq = index, dist_sq
+        if best < 0:
+            return best, math.inf
+        return best, best_sq
+
+    def within(self, x: float, y: float, side: int, radius_sq: float) -> List[int]:
+        """
+        Find every live unit of a side within a radius.
+
+        Args:
+            x: Query x coordinate
+            y: Query y coordinate
+            side: Side whose units to search
+            radius_sq: Squared search radius
+
+        Returns:
+            Slot indices in increasing order
+        """
+        found = []
+        members = self.members[side]
+        if len(members) <= self.SCAN_LIMIT:
+            buckets = (members,)
+        else:
+            buckets = self._neighborhood(side, x, y, radius_sq)
+        xs, ys, hp = self.x, self.y, self.hp
+        for bucket in buckets:
+            for index in bucket:
+                if hp[index] > 0:
+                    dx = xs[index] - x
+                    dy = ys[index] - y
+                    if dx * dx + dy * dy <= radius_sq:
+                        found.append(index)
+        found.sort()
+        return found
+
+    def live(self) -> List[int]:
+        """Slot indices of every live unit, in increasing order."""
+        alive = self.alive
+        return [index for index in range(len(alive)) if alive[index]]
+
+    def __repr__(self) -> str:
+        return f"UnitStore({self.count} units)"
@@ -0,0 +1,131 @@
+"""
+Evaluation weights.
+
+Every constant the engine's evaluation adds to a move score lives in an
+``EvalWeights`` vector, so that weights can be tuned (see ``tournament.py``)
+without touching the evaluation code. Thresholds that decide *whether* a
+term applies (damage > 200, the bridge rows, lane boundaries, ...) are part
+of the feature definitions and stay fixed.
+
+The defaults reproduce the original hand-written evaluation exactly.
+"""
+
+from typing import Iterator, List, Sequence
+
+
+class EvalWeights:
+    """
+    Named, immutable weight vector for ``ClashRoyaleEngine`` evaluation.
+
+    Weights are read as attributes (``weights.rush_base``) and convert to
+    and from a flat list in ``NAMES`` order for tuning.
+    """
+
+    # Name and default value of every weight, in vector order
+    DEFAULTS = (
+        # evaluate_move: tempo term (elixir_base - cost) * elixir_scale
+        ('elixir_base', 10.0),
+        ('elixir_scale', 0.5),
+        # _evaluate_positioning
+        ('rush_base', 20.0),
+        ('rush_falloff', 0.5),
+        ('building_distance', 0.3),
+        ('spell_base', 5.0),
+        ('bridge_troop', 3.0),
+        # _evaluate_card_type
+        ('high_damage', 3.0),
+        ('area_damage', 2.5),
+        ('long_range', 2.0),
+        ('building_value', 4.0),
+        # _evaluate_counters (per known opponent card)
+        ('counter_swarm', 3.0),
+        ('counter_building', 4.0),
+        ('counter_tank', 2.5),
+        ('counter_air', 2.0),
+        # _evaluate_strategy
+        ('side_lane', 1.0),
+        ('center_lane', 0.5),
+        ('aggressive', 2.0),
+    )
+    NAMES = tuple(name for name, _ in DEFAULTS)
+
+    __slots__ = NAMES
+
+    def __init__(self, **values: float):
+        """
+        Initialize weights, starting from the defaults.
+
+        Args:
+            **values: Weights to override, by name
+
+        Raises:
+            ValueError: If a name is not a known weight
+        """
+        unknown = set(values) - set(self.NAMES)
+        if unknown:
+            raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+        for name, default in self.DEFAULTS:
+            object.__setattr__(self, name, values.get(name, default))
+
+    @classmethod
+    def from_vector(cls, vector: Sequence[float]) -> 'EvalWeights':
+        """
+        Build weights from a flat vector in NAMES order.
+
+        Args:
+            vector: One value per weight
+
+        Returns:
+            Weights with those values
+        """
+        if len(vector) != len(cls.NAMES):
+            raise ValueError(f"Expected {len(cls.NAMES)} weights, got {len(vector)}")
+        return cls(**dict(zip(cls.NAMES, vector)))
+
+    def vector(self) -> List[float]:
+        """Get the weights as a flat list in NAMES order."""
+        return [getattr(self, name) for name in self.NAMES]
+
+    def replace(self, **changes: float) -> 'EvalWeights':
+        """
+        Get a copy with some weights changed.
+
+        Args:
+            **changes: New values, by name
+
+        Returns:
+            New weights
+        """
+        values = dict(zip(self.NAMES, self.vector()))
+        values.update(changes)
+        return EvalWeights(**values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EvalWeights is immutable; use replace()")
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.vector())
+
+    def __len__(self) -> int:
+        return len(self.NAMES)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EvalWeights):
+            return False
+        return self.vector() == other.vector()
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.vector()))
+
+    def __reduce__(self):
+        return (EvalWeights.from_vector, (self.vector(),))
+
+    def __repr__(self) -> str:
+        changed = [
+            f"{name}={value!r}" for (name, default), value in zip(self.DEFAULTS, self.vector())
+            if value != default
+        ]
+        return f"EvalWeights({', '.join(changed)})"
+
+
+DEFAULT_WEIGHTS = EvalWeights()
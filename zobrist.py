@@ -0,0 +1,294 @@
+"""
+Zobrist-style 64-bit hashing of game state and a transposition table.
+
+A state hash is the XOR of one random 64-bit key per state feature: each
+hand slot's card, the elixir bucket, the deck cycle position and the tower
+state of both sides, the side to move and the last card each side played.
+Because XOR is its own inverse, playing a card only needs a handful of XORs
+to update the hash instead of rehashing the whole state.
+
+Elixir is hashed in buckets of 0.1 while the search's leaf evaluation uses
+the exact elixir, so two states in the same bucket share a key. Within one
+search the elixir values reached are the same for every path, but entries
+reused by a later search from a slightly different elixir are approximate.
+"""
+
+import hashlib
+from array import array
+from typing import Dict, Optional, Tuple
+
+from card import Card, CARD_REGISTRY
+from board import Board, Position, Side
+from move import Move
+from player import Player
+
+
+class ZobristKeys:
+    """
+    Deterministic 64-bit keys for every hashed state feature.
+
+    Keys are derived from a hash of the feature description, so they are
+    identical across processes and runs without storing a random table.
+    """
+
+    # Elixir is hashed in buckets of 1 / ELIXIR_BUCKETS
+    ELIXIR_BUCKETS = 10
+
+    def __init__(self, seed: int = 0):
+        """
+        Initialize the key set.
+
+        Args:
+            seed: Salt mixed into every key (different seeds, different keys)
+        """
+        self.seed = seed
+        self._cache: Dict[tuple, int] = {}
+
+    def key(self, *feature) -> int:
+        """
+        Get the 64-bit key of a feature tuple.
+
+        Args:
+            feature: Hashable description of the feature
+
+        Returns:
+            64-bit key
+        """
+        value = self._cache.get(feature)
+        if value is None:
+            digest = hashlib.blake2b(
+                repr((self.seed,) + feature).encode(), digest_size=8
+            ).digest()
+            value = int.from_bytes(digest, 'little')
+            self._cache[feature] = value
+        return value
+
+    def hand_key(self, side: Side, slot: int, card: Card) -> int:
+        """Key of a card sitting in a hand slot."""
+        return self.key('hand', side.value, slot, card.card_id)
+
+    def deck_key(self, side: Side, slot: int, card: Card) -> int:
+        """Key of a card at a deck position."""
+        return self.key('deck', side.value, slot, card.card_id)
+
+    def elixir_key(self, side: Side, elixir: float) -> int:
+        """Key of a side's elixir bucket."""
+        return self.key('elixir', side.value, int(elixir * self.ELIXIR_BUCKETS))
+
+    def cycle_key(self, side: Side, next_card_index: int) -> int:
+        """Key of a side's deck cycle position."""
+        return self.key('cycle', side.value, next_card_index % 8)
+
+    def tower_key(self, side: Side, tower_state: int) -> int:
+        """Key of a side's standing-tower bitmask."""
+        return self.key('towers', side.value, tower_state)
+
+    def last_played_key(self, side: Side, card: Optional[Card]) -> int:
+        """Key of the last card a side played (0 if none)."""
+        if card is None:
+            return 0
+        return self.key('last', side.value, card.card_id)
+
+    def to_move_key(self, side: Side) -> int:
+        """Key XORed in when the given side is to move."""
+        return self.key('to_move', side.value)
+
+    def player_hash(self, side: Side, player: Player) -> int:
+        """
+        Hash everything about one player.
+
+        Args:
+            side: Side the player is on
+            player: Player to hash
+
+        Returns:
+            64-bit hash of deck, hand, elixir bucket and cycle position
+        """
+        h = self.elixir_key(side, player.elixir) ^ self.cycle_key(side, player.next_card_index)
+        for slot, card in enumerate(player.hand):
+            h ^= self.hand_key(side, slot, card)
+        for slot, card in enumerate(player.deck):
+            h ^= self.deck_key(side, slot, card)
+        return h
+
+    def board_hash(self, board: Board) -> int:
+        """Hash the tower state of both sides."""
+        return (self.tower_key(Side.FRIENDLY, board.tower_state(Side.FRIENDLY)) ^
+                self.tower_key(Side.ENEMY, board.tower_state(Side.ENEMY)))
+
+    def state_hash(
+        self,
+        players: Dict[Side, Player],
+        board: Board,
+        to_move: Side,
+        last_played: Optional[Dict[Side, Optional[Card]]] = None
+    ) -> int:
+        """
+        Hash a full game state from scratch.
+
+        Args:
+            players: Player for each side
+            board: Board with tower state
+            to_move: Side to move
+            last_played: Last card each side played (if tracked)
+
+        Returns:
+            64-bit state hash
+        """
+        h = self.board_hash(board) ^ self.to_move_key(to_move)
+        for side, player in players.items():
+            h ^= self.player_hash(side, player)
+        if last_played:
+            for side, card in last_played.items():
+                h ^= self.last_played_key(side, card)
+        return h
+
+    def play_delta(self, side: Side, player: Player, card: Card) -> int:
+        """
+        XOR delta for a player playing a card, computed before the play.
+
+        Covers the hand slot that changes and the cycle position; elixir is
+        updated separately because it also changes as time passes.
+
+        Args:
+            side: Side of the player
+            player: Player about to play (not yet mutated)
+            card: Card being played
+
+        Returns:
+            Value to XOR into the state hash
+        """
+        slot = player.hand.index(card)
+        incoming = player.deck[player.next_card_index % 8]
+        return (self.hand_key(side, slot, card) ^
+                self.hand_key(side, slot, incoming) ^
+                self.cycle_key(side, player.next_card_index) ^
+                self.cycle_key(side, player.next_card_index + 1))
+
+
+# Shared key set used by the engine
+ZOBRIST = ZobristKeys()
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results with depth-preferred replacement.
+
+    Entries are stored in parallel arrays indexed by ``key % size``. A slot is
+    overwritten when it is empty, holds the same position, was written by an
+    older search, or was searched to a depth no greater than the new entry.
+
+    The best move of an entry is stored as its card ID, coordinates, side and
+    static score rather than as a Move object, so every slot costs exactly
+    ENTRY_BYTES and the memory cap holds. Probes rebuild an equal Move.
+    Hashed elixir is bucketed (see ZobristKeys), so values reused across
+    searches are approximate.
+    """
+
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+
+    # Bytes per slot across the parallel arrays: key, depth, value, flag,
+    # generation, then the move's card ID, x, y, side and score
+    ENTRY_BYTES = 8 + 2 + 8 + 1 + 2 + 4 + 8 + 8 + 1 + 8
+    _SIDES = tuple(Side)
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize an empty table.
+
+        Args:
+            max_bytes: Memory cap; the number of slots is derived from it
+        """
+        self.size = max(1, max_bytes // self.ENTRY_BYTES)
+        self.keys = array('Q', bytes(8 * self.size))
+        self.depths = array('h', [-1]) * self.size
+        self.values = array('d', bytes(8 * self.size))
+        self.flags = array('b', bytes(self.size))
+        self.generations = array('H', bytes(2 * self.size))
+        # Card ID -1 marks a wait (no move)
+        self.move_cards = array('i', [-1]) * self.size
+        self.move_x = array('d', bytes(8 * self.size))
+        self.move_y = array('d', bytes(8 * self.size))
+        self.move_sides = array('b', bytes(self.size))
+        self.move_scores = array('d', bytes(8 * self.size))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Start a new search so older entries become replaceable."""
+        self.generation = (self.generation + 1) & 0xFFFF
+
+    def clear(self):
+        """Remove every entry."""
+        self.depths = array('h', [-1]) * self.size
+        self.move_cards = array('i', [-1]) * self.size
+
+    def probe(self, key: int) -> Optional[Tuple[int, float, int, object]]:
+        """
+        Look up a position.
+
+        Args:
+            key: 64-bit state hash
+
+        Returns:
+            Tuple of (depth, value, flag, best move) or None if absent
+        """
+        self.probes += 1
+        index = key % self.size
+        if self.depths[index] < 0 or self.keys[index] != key:
+            return None
+        self.hits += 1
+        return self.depths[index], self.values[index], self.flags[index], self._move(index)
+
+    def _move(self, index: int) -> Optional[Move]:
+        """Rebuild the best move stored in a slot."""
+        card_id = self.move_cards[index]
+        if card_id < 0:
+            return None
+        position = Position.intern(self.move_x[index], self.move_y[index],
+                                   self._SIDES[self.move_sides[index]])
+        return Move(CARD_REGISTRY.get(card_id), position, self.move_scores[index])
+
+    def store(self, key: int, depth: int, value: float, flag: int, move):
+        """
+        Store a search result, subject to depth-preferred replacement.
+
+        Args:
+            key: 64-bit state hash
+            depth: Remaining depth the value was searched to
+            value: Search value from the side to move's perspective
+            flag: EXACT, LOWER_BOUND or UPPER_BOUND
+            move: Best move found (None for waiting)
+        """
+        index = key % self.size
+        old_depth = self.depths[index]
+        if (old_depth >= 0 and
+                self.keys[index] != key and
+                self.generations[index] == self.generation and
+                old_depth > depth):
+            return
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.values[index] = value
+        self.flags[index] = flag
+        self.generations[index] = self.generation
+        if move is None:
+            self.move_cards[index] = -1
+        else:
+            position = move.position
+            self.move_cards[index] = move.card.card_id
+            self.move_x[index] = position.x
+            self.move_y[index] = position.y
+            self.move_sides[index] = self._SIDES.index(position.side)
+            self.move_scores[index] = move.score
+        self.stores += 1
+
+    def __len__(self) -> int:
+        return sum(1 for depth in self.depths if depth >= 0)
+
+    def __repr__(self) -> str:
+        return f"TranspositionTable({self.size} slots, {self.hits}/{self.probes} hits)"